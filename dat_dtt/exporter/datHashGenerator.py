@@ -1,7 +1,7 @@
 # Stolen and adapted from RaiderB https://github.com/ArthurHeitmann/NierDocs/blob/master/tools/datRepacker/datRepacker.py
 # Also inspired by https://github.com/xxk-i/DATrepacker/blob/master/dat.py
 from typing import List
-from ...utils.ioUtils import write_uInt32, write_Int16
+import struct
 import zlib
 import os
 
@@ -26,21 +26,19 @@ class HashData:
     def getStructSize(self):
         return 16 + 2*len(self.bucketOffsets) + 4*len(self.hashes) + 2*len(self.fileIndices)
 
-    def write(self, file):
+    def pack(self) -> bytes:
         bucketsSize = len(self.bucketOffsets) * 2
         hashesSize = len(self.hashes) * 4
 
-        write_uInt32(file, self.preHashShift)
-        write_uInt32(file, 16)
-        write_uInt32(file, 16 + bucketsSize)
-        write_uInt32(file, 16 + bucketsSize + hashesSize)
+        return b"".join([
+            struct.pack("<4I", self.preHashShift, 16, 16 + bucketsSize, 16 + bucketsSize + hashesSize),
+            struct.pack("<%dh" % len(self.bucketOffsets), *self.bucketOffsets),
+            struct.pack("<%dI" % len(self.hashes), *self.hashes),
+            struct.pack("<%dh" % len(self.fileIndices), *self.fileIndices),
+        ])
 
-        for bucketOffset in self.bucketOffsets:
-            write_Int16(file, bucketOffset)
-        for hash in self.hashes:
-            write_uInt32(file, hash)
-        for fileIndex in self.fileIndices:
-            write_Int16(file, fileIndex)
+    def write(self, file):
+        file.write(self.pack())
 
     def calculateShift(self, fileNumber: int) -> int:
         for i in range(31):
@@ -8,7 +8,7 @@ from bpy_extras.io_utils import ExportHelper, ImportHelper
 from ...consts import DAT_EXTENSIONS
 from ...utils.ioUtils import read_uint32
 
-from ...utils.util import importContentsFileFromFolder, readFileOrderMetadata, readJsonDatInfo, saveDatInfo, triangulate_meshes, centre_origins, ShowMessageBox
+from ...utils.util import importContentsFileFromFolder, readFileOrderMetadata, readJsonDatInfo, saveDatInfo, ShowMessageBox
 
 
 class ExportAllSteps(bpy.types.PropertyGroup):
@@ -229,13 +229,9 @@ class ExportAll(bpy.types.Operator):
         from ...wmb.exporter import wmb_exporter
         if exportSteps.useWmbStep:
             print("Exporting WMB")
-            if exportSteps.triangulateMeshes:
-                triangulate_meshes("WMB")
-            if exportSteps.centerOrigins:
-                centre_origins("WMB")
-            if exportSteps.deleteLoose:
-                bpy.ops.b2n.deleteloosegeometryall()
-            wmb_exporter.main(wmbFilePath, True)
+            # prepared on export copies, the scene stays as it is
+            wmb_exporter.main(wmbFilePath, True, triangulate=exportSteps.triangulateMeshes,
+                centreOrigins=exportSteps.centerOrigins, deleteLoose=exportSteps.deleteLoose)
             exportedFilesCount += 1
         from ...wta_wtp.exporter import export_wta, export_wtp
         if exportSteps.useWtaStep:
@@ -1,115 +1,105 @@
 import math
+import os
 from typing import List
 
 from .datHashGenerator import HashData
 
-from ...utils.ioUtils import write_string, write_Int32, write_buffer
+from ...utils.ioUtils import BinaryWriter
 from ...utils.util import *
 
 
 def to_string(bs, encoding = 'utf8'):
 	return bs.split(b'\x00')[0].decode(encoding)
 
+COPY_CHUNK_SIZE = 1024 * 1024
+
+def write_all(dat_file, data):
+    """dat_file is unbuffered, a raw write may take only part of the data."""
+    data = memoryview(data)
+    while len(data) > 0:
+        written = dat_file.write(data)
+        if not written:
+            raise IOError(f"could not write to {dat_file.name}")
+        data = data[written:]
+
+def copy_file(path: str, dat_file, size: int):
+    """Stream `size` bytes of `path` to the current position of dat_file (unbuffered),
+    so multi-hundred-MB WTPs never sit in memory."""
+    copied = 0
+    with open(path, 'rb', buffering=0) as src:
+        try:
+            while copied < size:
+                # in-kernel copy, or even a reflink if the filesystem can
+                count = os.copy_file_range(src.fileno(), dat_file.fileno(), size - copied)
+                if count == 0:
+                    break
+                copied += count
+        except (AttributeError, OSError): # not Linux, or a filesystem pair that won't, both fds are where we left them
+            pass
+        while copied < size:
+            chunk = src.read(min(COPY_CHUNK_SIZE, size - copied))
+            if not chunk:
+                break
+            write_all(dat_file, chunk)
+            copied += len(chunk)
+    if copied < size:
+        raise IOError(f"{path} got shorter while packing it")
+
 def main(export_filepath: str, file_list: List[str]):
     file_list.sort(key=lambda x: os.path.basename(x).lower())
     files = file_list
     fileNumber = len(files)
     hashData = HashData(files)
 
-    fileExtensionsSize = 0
     fileExtensions = []
     for fp in files:
         fileExt = fp.split('.')[-1]
         fileExt += '\x00' * (3 - len(fileExt))
-        fileExtensionsSize += len(fileExt) + 1
-        fileExtensions.append(fileExt)
+        fileExtensions.append(fileExt.encode('utf-8') + b'\x00')
+    fileExtensionsSize = sum(len(x) for x in fileExtensions)
 
-    nameLength = 0                              
-    for fp in files:
-        fileName = os.path.basename(fp)
-        if len(fileName)+1 > nameLength:
-            nameLength = len(fileName)+1
+    fileNames = [os.path.basename(fp).encode('utf-8') for fp in files]
+    nameLength = max((len(x) + 1 for x in fileNames), default=0)
     namesSize = nameLength * fileNumber
     namesPadding = 4 - (namesSize % 4)
 
-    fileNames = []                             
-    for fp in files:
-        fileName = os.path.basename(fp)
-        fileNames.append(fileName)
-
     hashMapSize = hashData.getStructSize()
 
     # Header
-    fileID = 'DAT'
-    fileNumber = fileNumber
+    fileID = b'DAT'
     fileOffsetsOffset = 32
     fileExtensionsOffset = fileOffsetsOffset + (fileNumber * 4)
     fileNamesOffset = fileExtensionsOffset + fileExtensionsSize
     fileSizesOffset = fileNamesOffset + (fileNumber * nameLength) + 4 + namesPadding
     hashMapOffset = fileSizesOffset + (fileNumber * 4)
 
-    #fileOffsets
+    # fileSizes, fileOffsets
+    fileSizes = [os.path.getsize(fp) for fp in files]
     fileOffsets = []
     currentOffset = hashMapOffset + hashMapSize
-    for fp in files:
+    for size in fileSizes:
         currentOffset = math.ceil(currentOffset / 16) * 16
         fileOffsets.append(currentOffset)
-        currentOffset += os.path.getsize(fp)
-
-    # fileSizes
-    fileSizes = []
-    for fp in files:
-        fileSizes.append(os.path.getsize(fp))
+        currentOffset += size
 
     # WRITE
-        # Header
-    dat_file = open(export_filepath, 'wb')
-    write_string(dat_file, fileID)
-    write_Int32(dat_file, fileNumber)
-    write_Int32(dat_file, fileOffsetsOffset)
-    write_Int32(dat_file, fileExtensionsOffset)
-    write_Int32(dat_file, fileNamesOffset)
-    write_Int32(dat_file, fileSizesOffset)
-    write_Int32(dat_file, hashMapOffset)
-    write_buffer(dat_file, 4)
-
-        # fileOffsets
-    dat_file.seek(fileOffsetsOffset)
-    for value in fileOffsets:
-        write_Int32(dat_file, value)
-
-        # fileExtensions
-    dat_file.seek(fileExtensionsOffset)
-    for value in fileExtensions:
-        write_string(dat_file, value)
-
-        # nameLength
-    dat_file.seek(fileNamesOffset)
-    write_Int32(dat_file, nameLength)
-
-        # fileNames
-    dat_file.seek(fileNamesOffset + 4)
-    for value in fileNames:
-        write_string(dat_file, value)
-        if len(value) < nameLength:
-            write_buffer(dat_file, nameLength - len(value) - 1)
-
-        # fileSizes
-    dat_file.seek(fileSizesOffset)
-    for value in fileSizes:
-        write_Int32(dat_file, value)
-
-        # hashMap
-    dat_file.seek(hashMapOffset)
-    hashData.write(dat_file)
-
-        # Files
-    for i, fp in enumerate(files):
-        dat_file.seek(fileOffsets[i])
-        fileData = open(fp, 'rb')
-        fileContent = fileData.read()
-        dat_file.write(fileContent)
-        fileData.close()
-
-    dat_file.close()
+        # Everything in front of the first file is small, pack it in one go
+    header = BinaryWriter(hashMapOffset + hashMapSize)
+    header.pack_into("<4s6i", 0, fileID, fileNumber, fileOffsetsOffset, fileExtensionsOffset, fileNamesOffset, fileSizesOffset, hashMapOffset)
+    header.array("i", fileOffsetsOffset, fileOffsets)
+    header.write_at(fileExtensionsOffset, b"".join(fileExtensions))
+    header.pack_into("<i", fileNamesOffset, nameLength)
+    header.write_at(fileNamesOffset + 4, b"".join(x.ljust(nameLength, b'\x00') for x in fileNames))
+    header.array("i", fileSizesOffset, fileSizes)
+    header.write_at(hashMapOffset, hashData.pack())
+
+        # Files, streamed into place
+    with open(export_filepath, 'wb', buffering=0) as dat_file:
+        write_all(dat_file, header.buffer)
+        for fp, offset, size in zip(files, fileOffsets, fileSizes):
+            if size == 0:
+                continue # the next file's padding covers the alignment
+            write_all(dat_file, bytes(offset - dat_file.tell()))
+            copy_file(fp, dat_file, size)
+
     print('DAT/DTT Export Complete. :>')
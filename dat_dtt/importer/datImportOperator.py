@@ -11,8 +11,29 @@ from ...consts import DAT_EXTENSIONS
 from ...utils.visibilitySwitcher import enableVisibilitySelector
 from ...utils.util import setExportFieldsFromImportFile, ShowMessageBox
 
-def ImportData(only_extract, filepath, transform=None):
+def ImportData(only_extract, filepath, transform=None, extract=True):
+    """
+    extract=False mounts the DAT/DTT instead of unpacking them, the importers
+    then read their files straight out of the archives (see dat_unpacker.open_file).
+    """
     print("Importing data...")
+    from . import dat_unpacker
+    mountedDirs = []
+    def unpack(filepath, extract_path):
+        if extract or only_extract:
+            return dat_unpacker.main(filepath, extract_path, filepath)
+        # read members straight out of the archive, see dat_unpacker.mount
+        archive = dat_unpacker.mount(filepath, extract_path)
+        mountedDirs.append(extract_path)
+        return archive.names[-1] if archive else False
+
+    try:
+        return importData(only_extract, filepath, transform, extract, unpack)
+    finally:
+        for dir in mountedDirs:
+            dat_unpacker.unmount(dir)
+
+def importData(only_extract, filepath, transform, extract, unpack):
     extension = os.path.splitext(filepath)[1]
     
     # This is a much better naming scheme
@@ -32,10 +53,10 @@ def ImportData(only_extract, filepath, transform=None):
     from . import dat_unpacker
     print("DAT Path: " + dat_filepath)
     if os.path.isfile(dat_filepath):
-        dat_filename = dat_unpacker.main(dat_filepath, extract_dat, dat_filepath)
+        dat_filename = unpack(dat_filepath, extract_dat)
     print("DTT Path: " + dtt_filepath)
     if os.path.isfile(dtt_filepath):
-        dtt_filename = dat_unpacker.main(dtt_filepath, extract_dtt, dtt_filepath)
+        dtt_filename = unpack(dtt_filepath, extract_dtt)
     
     if (dat_filename == "" and dtt_filename == ""):
         print("I have no idea how you managed to select a DAT or DTT if you had neither")
@@ -54,23 +75,23 @@ def ImportData(only_extract, filepath, transform=None):
         # I dunno what this does but in the forefathers I trust
         dtt_filename = dat_filename[:10]
         
-    wmb_files = [x for x in os.listdir(extract_dat) if os.path.splitext(x)[1] == ".wmb"]
+    wmb_files = [x for x in dat_unpacker.listdir(extract_dat) if os.path.splitext(x)[1] == ".wmb"]
     if (len(wmb_files) == 0):
         # Last chance to show yourself
         print("Attempting to find WMB in DTT (fruitless)")
-        if os.path.exists(extract_dtt):
-            wmb_files = [x for x in os.listdir(extract_dtt) if os.path.splitext(x)[1] == ".wmb"]
+        wmb_files = [x for x in dat_unpacker.listdir(extract_dtt) if os.path.splitext(x)[1] == ".wmb"]
+        if wmb_files:
             wmb_ext = ".dtt"
 
-    scr_files = [x for x in os.listdir(extract_dat) if os.path.splitext(x)[1] == ".scr"]
+    scr_files = [x for x in dat_unpacker.listdir(extract_dat) if os.path.splitext(x)[1] == ".scr"]
 
     if (len(wmb_files) > 0):
         wmb_mode = True
     elif (len(scr_files) == 0):
         # Last chance to show yourself
         print("Attempting to find SCR in DTT (fruitless)")
-        if os.path.exists(extract_dtt):
-            scr_files = [x for x in os.listdir(extract_dtt) if os.path.splitext(x)[1] == ".scr"]
+        scr_files = [x for x in dat_unpacker.listdir(extract_dtt) if os.path.splitext(x)[1] == ".scr"]
+        if scr_files:
             scr_ext = ".dtt"
 
     if (len(scr_files) > 0):
@@ -81,12 +102,13 @@ def ImportData(only_extract, filepath, transform=None):
 
     # Phase Loader
     phase_path = os.path.join(extract_dat, filename_without_extension + "_sub.bxm")
-    if os.path.exists(phase_path):
+    if dat_unpacker.exists(phase_path):
         print("Loading " + phase_path)
-        from ...bxm.common.bxm import bxmToXml
+        from ...bxm.common.bxm import bxmToXmlFromFile
         import xml.etree.ElementTree as ET
         
-        bxmroot = bxmToXml(phase_path)
+        with dat_unpacker.open_file(phase_path) as phaseFile:
+            bxmroot = bxmToXmlFromFile(phaseFile)
         rooms = bxmroot.find(".//RoomNo").text.split()
         base_data_001 = os.path.dirname(os.path.dirname(extract_dir))
         print(base_data_001)
@@ -98,13 +120,13 @@ def ImportData(only_extract, filepath, transform=None):
         for room in rooms:
             stage_folder = "st" + room[1]  # Chapter number is second character (e.g. ra00: sta)
             print("Loading room: " + stage_folder + "\\" + room + ".dat")
-            ImportData(False, os.path.join(base_data_001, stage_folder, room + ".dat"))
+            ImportData(False, os.path.join(base_data_001, stage_folder, room + ".dat"), extract=extract)
             
     
     # WTA/WTP
     wtaPath = os.path.join(extract_dir, filename_without_extension + '.dat', filename_without_extension + '.wta')
     wtpPath = os.path.join(extract_dir, filename_without_extension + '.dtt', filename_without_extension + '.wtp')
-    if os.path.isfile(wtaPath) and os.path.isfile(wtpPath):
+    if dat_unpacker.exists(wtaPath) and dat_unpacker.exists(wtpPath):
         texturesExtractDir = os.path.join(extract_dir, filename_without_extension + '.dtt', "textures")
         from ...wta_wtp.importer import wtpImportOperator
         wtpImportOperator.extractFromWta(wtaPath, wtpPath, texturesExtractDir)
@@ -123,6 +145,10 @@ def ImportData(only_extract, filepath, transform=None):
             scr_files = [filename_without_extension + ".scr"]
         scr_filepath = os.path.join(extract_dir, filename_without_extension + scr_ext, scr_files[0])
         print("SCR Path: " + scr_filepath)
+        # the SCR importer works on paths next to the SCR, it gets real files
+        dat_unpacker.materialize(scr_filepath)
+        if dat_unpacker.exists(scr_filepath[:-3] + "ly2"):
+            dat_unpacker.materialize(scr_filepath[:-3] + "ly2")
         from ...scr.importer import scr_importer
         scr_importer.ImportSCR.main(scr_filepath, False)
     if wmb_mode:
@@ -139,6 +165,18 @@ def ImportData(only_extract, filepath, transform=None):
     return {'FINISHED'}
     
 
+def extractFolder(folder, ext):
+    """Unpack the archives of a bulk import (and their DAT/DTT siblings) in parallel up front,
+    the imports after that find them up to date and skip the extraction."""
+    from . import dat_unpacker
+    archives = []
+    for filename in sorted(os.listdir(folder)):
+        if filename[-4:] == ext:
+            for sibling in (filename[:-4] + '.dat', filename[:-4] + '.dtt'):
+                if os.path.isfile(os.path.join(folder, sibling)) and os.path.join(folder, sibling) not in archives:
+                    archives.append(os.path.join(folder, sibling))
+    dat_unpacker.bulk_extract(folder, os.path.join(folder, 'nier2blender_extracted'), archives=archives)
+
 # Legacy Function
 def importDtt(only_extract, filepath, transform=None):
     head = os.path.split(filepath)[0]
@@ -229,26 +267,30 @@ class ImportNierDtt(bpy.types.Operator, ImportHelper):
     reset_blend: bpy.props.BoolProperty(name="Reset Blender Scene on Import", default=True)
     bulk_import: bpy.props.BoolProperty(name="Bulk Import All DTT/DATs In Folder (Experimental)", default=False)
     only_extract: bpy.props.BoolProperty(name="Only Extract DTT/DAT Contents. (Experimental)", default=False)
+    extract_files: bpy.props.BoolProperty(name="Extract Files To Disk", description="Unpack the DAT/DTT into nier2blender_extracted. Disable to read the model straight out of the archive, which is faster for phases with lots of rooms, but leaves nothing to edit and re-export", default=True)
 
     def execute(self, context):
         print("Unpacking", self.filepath)
         from ...wmb.importer import wmb_importer
         if self.reset_blend and not self.only_extract:
             wmb_importer.reset_blend()
-        if self.bulk_import:
-            folder = os.path.split(self.filepath)[0]
-            for filename in os.listdir(folder):
-                if filename[-4:] == '.dtt':
-                    try:
-                        filepath = os.path.join(folder, filename)
-                        print("\nImporting", filepath)
-                        ImportData(self.only_extract, filepath)
-                    except:
-                        print('ERROR: FAILED TO IMPORT', filename)
-            return {'FINISHED'}
+        with wmb_importer.import_session(): # one name registry for the whole import
+            if self.bulk_import:
+                folder = os.path.split(self.filepath)[0]
+                if self.extract_files or self.only_extract:
+                    extractFolder(folder, '.dtt')
+                for filename in os.listdir(folder):
+                    if filename[-4:] == '.dtt':
+                        try:
+                            filepath = os.path.join(folder, filename)
+                            print("\nImporting", filepath)
+                            ImportData(self.only_extract, filepath, extract=self.extract_files)
+                        except:
+                            print('ERROR: FAILED TO IMPORT', filename)
+                return {'FINISHED'}
 
-        else:
-            return ImportData(self.only_extract, self.filepath)
+            else:
+                return ImportData(self.only_extract, self.filepath, extract=self.extract_files)
         
 
 
@@ -263,6 +305,7 @@ class ImportNierDat(bpy.types.Operator, ImportHelper):
     reset_blend: bpy.props.BoolProperty(name="Reset Blender Scene on Import", default=True)
     bulk_import: bpy.props.BoolProperty(name="Bulk Import All DTT/DATs In Folder", default=False)
     only_extract: bpy.props.BoolProperty(name="Only Extract DTT/DAT Contents", default=False)
+    extract_files: bpy.props.BoolProperty(name="Extract Files To Disk", description="Unpack the DAT/DTT into nier2blender_extracted. Disable to read the model straight out of the archive, which is faster for phases with lots of rooms, but leaves nothing to edit and re-export", default=True)
 
     def doImport(self, onlyExtract, filepath):
         head = os.path.split(filepath)[0]
@@ -287,17 +330,20 @@ class ImportNierDat(bpy.types.Operator, ImportHelper):
         from ...wmb.importer import wmb_importer
         if self.reset_blend and not self.only_extract:
             wmb_importer.reset_blend()
-        firstModel = ImportData(self.only_extract, self.filepath)
-        if self.bulk_import:
-            folder = os.path.split(self.filepath)[0]
-            for filename in os.listdir(folder):
-                if filename[-4:] == '.dat':
-                    try:
-                        filepath = os.path.join(folder, filename)
-                        if filepath != self.filepath: # Already got that one
-                            ImportData(self.only_extract, filepath)
-                    except:
-                        print('ERROR: FAILED TO IMPORT', filename)
-            return {'FINISHED'}
-        return firstModel
+        with wmb_importer.import_session(): # one name registry for the whole import
+            if self.bulk_import and (self.extract_files or self.only_extract):
+                extractFolder(os.path.split(self.filepath)[0], '.dat')
+            firstModel = ImportData(self.only_extract, self.filepath, extract=self.extract_files)
+            if self.bulk_import:
+                folder = os.path.split(self.filepath)[0]
+                for filename in os.listdir(folder):
+                    if filename[-4:] == '.dat':
+                        try:
+                            filepath = os.path.join(folder, filename)
+                            if filepath != self.filepath: # Already got that one
+                                ImportData(self.only_extract, filepath, extract=self.extract_files)
+                        except:
+                            print('ERROR: FAILED TO IMPORT', filename)
+                return {'FINISHED'}
+            return firstModel
 
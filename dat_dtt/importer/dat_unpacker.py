@@ -1,14 +1,33 @@
 #encoding = utf-8
+from __future__ import annotations
+import hashlib
+import json
 import os
 import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
 
-from ...utils.util import saveDatInfo
-from ...utils.ioUtils import read_int32, read_uint32, read_uint16
+if not __package__:
+    # Run as a plain script (see the bottom of the file). Point the relative
+    # imports below at the add-on folder without running its bpy-only __init__.
+    import types
+    _addon = types.ModuleType("_mgr2blender")
+    _addon.__path__ = [os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))]
+    sys.modules["_mgr2blender"] = _addon
+    __package__ = "_mgr2blender.dat_dtt.importer"
+
+# nothing in here may pull in bpy
+from ...consts import DAT_EXTENSIONS
+from ...utils.datInfo import saveDatInfo
+from ...utils.ioUtils import read_int32, BinaryView
 
 
 def create_dir(dirpath):
-    if not os.path.exists(dirpath):
-        os.makedirs(dirpath)
+    os.makedirs(dirpath, exist_ok=True) # archives get unpacked in parallel, see bulk_extract
+
+def to_string(bs, encoding = 'utf8'):
+    return bs.split(b'\x00')[0].decode(encoding)
 
 def read_header(fp):
     Magic = fp.read(4)
@@ -34,35 +53,195 @@ def read_header(fp):
         print('[-] wrong magic number detected')
         return False
 
-def get_fileinfo(fp, index, FileTableOffset, ExtensionTableOffset, NameTableOffset, SizeTableOffset):
-    fp.seek(FileTableOffset + index * 4)
-    FileOffset = read_int32(fp)
-    fp.seek(ExtensionTableOffset + index * 4)
-    Extension = fp.read(4).decode('utf-8')
-    fp.seek(SizeTableOffset + index * 4)
-    Size = read_int32(fp)
-    fp.seek(NameTableOffset)
-    FilenameAlignment = read_int32(fp)
-    i = 0
-    while i < index:
-        if list(fp.read(FilenameAlignment))[FilenameAlignment-1] == 0:
-            i += 1
-    Filename = fp.read(256).split(b'\x00')[0].decode('ascii')
-#     print(
-# '''
-# FileIndex: %d
-# Filename: %s
-# FileOffset: %08x
-# Size: %08x
-# Extension: %s'''%
-# (index,Filename,FileOffset,Size,Extension)
-#         )
-    return index,Filename,FileOffset,Size,Extension
+class DatArchive:
+    """
+    Header, offset/size/extension tables, name table and the CRC32 hash map
+    of a DAT/DTT, parsed once. archive[name] goes through the stored hash
+    buckets (same layout as datHashGenerator.HashData writes), so looking up
+    a member is O(1) no matter how many hundred of them the DTT has.
+    """
+    path: str
+    view: BinaryView
+    fileCount: int
+    offsets: Tuple[int]
+    sizes: Tuple[int]
+    extensions: List[str]
+    names: List[str]
+    preHashShift: int
+    bucketOffsets: Tuple[int]
+    hashes: Tuple[int]
+    fileIndices: Tuple[int]
+
+    def __init__(self, view: BinaryView, path: str = ""):
+        self.view = view
+        self.path = path
+        if len(view) < 28 or view.slice(0, 4) != b"DAT\x00":
+            raise ValueError("%s is not a DAT/DTT (wrong magic number)" % (path or "buffer"))
+        (self.fileCount, fileTableOffset, extensionTableOffset,
+            nameTableOffset, sizeTableOffset, hashMapOffset) = view.unpack_from("<6i", 4)
+
+        count = self.fileCount
+        self.offsets = view.array("i", fileTableOffset, count)
+        self.sizes = view.array("i", sizeTableOffset, count)
+        self.extensions = [to_string(view.slice(extensionTableOffset + i * 4, 4).tobytes()) for i in range(count)]
+        # fixed stride entries, the stride sits in front of them
+        nameLength = view.int32(nameTableOffset) if count else 0
+        names = view.slice(nameTableOffset + 4, nameLength * count).tobytes()
+        self.names = [to_string(names[i * nameLength : (i + 1) * nameLength]) for i in range(count)]
+
+        self.preHashShift = 31
+        self.bucketOffsets = ()
+        self.hashes = ()
+        self.fileIndices = ()
+        if hashMapOffset and count:
+            self.preHashShift, bucketOffsetsOffset, hashesOffset, fileIndicesOffset = view.unpack_from("<4I", hashMapOffset)
+            self.bucketOffsets = view.array("h", hashMapOffset + bucketOffsetsOffset, (hashesOffset - bucketOffsetsOffset) // 2)
+            self.hashes = view.array("I", hashMapOffset + hashesOffset, count)
+            self.fileIndices = view.array("H", hashMapOffset + fileIndicesOffset, count)
+        self._nameLookup = None
+
+    @classmethod
+    def open(cls, path: str) -> DatArchive:
+        view = BinaryView.from_path(path)
+        try:
+            return cls(view, path)
+        except:
+            view.close()
+            raise
+
+    def close(self):
+        self.view.close()
+
+    def __enter__(self) -> DatArchive:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.fileCount
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return self.index(name) is not None
+
+    def __getitem__(self, name: str) -> Tuple[int, str, int, int, str]:
+        index = self.index(name)
+        if index is None:
+            raise KeyError(name)
+        return self.member(index)
+
+    def index(self, name: str) -> int:
+        """Member index of `name` (case insensitive like the game), or None."""
+        if not self.bucketOffsets:
+            # no (or an empty) hash map, fall back to a plain dict
+            if self._nameLookup is None:
+                self._nameLookup = {x.lower(): i for i, x in reversed(list(enumerate(self.names)))}
+            return self._nameLookup.get(name.lower())
+        try:
+            nameHash = zlib.crc32(name.lower().encode('ascii')) & 0x7fffffff
+        except UnicodeEncodeError: # DAT names are ascii
+            return None
+        bucket = nameHash >> self.preHashShift
+        if bucket >= len(self.bucketOffsets) or self.bucketOffsets[bucket] < 0:
+            return None
+        for i in range(self.bucketOffsets[bucket], self.fileCount):
+            if self.hashes[i] >> self.preHashShift != bucket:
+                break
+            fileIndex = self.fileIndices[i]
+            if self.hashes[i] == nameHash and fileIndex < self.fileCount and self.names[fileIndex].lower() == name.lower():
+                return fileIndex
+        return None
+
+    def member(self, index: int) -> Tuple[int, str, int, int, str]:
+        """Same tuple get_fileinfo used to build: index, name, offset, size, extension."""
+        return index, self.names[index], self.offsets[index], self.sizes[index], self.extensions[index]
+
+    def data(self, name: str) -> memoryview:
+        """Bytes of a member, sliced straight out of the mmap."""
+        index, _, offset, size, _ = self[name]
+        return self.view.slice(offset, size)
+
+    def open_member(self, name: str) -> BinaryView:
+        """Read-only file-like view of a member, read/seek/tell are relative to it."""
+        index, _, offset, size, _ = self[name]
+        return self.view.view(offset, size)
+
+    def extract(self, index: int, extract_dir: str):
+        extract_file(self.view, self.names[index], self.offsets[index], self.sizes[index], extract_dir)
+
+
+# Mounted archives, keyed by the folder they would have been extracted to.
+# Importers ask for "nier2blender_extracted/xx.dat/xx.wmb" as usual and get
+# the member out of the archive, nothing has to be written to disk first.
+_mountedArchives: Dict[str, DatArchive] = {}
+
+def mount(filename, extract_dir) -> DatArchive:
+    extract_dir = os.path.normpath(extract_dir)
+    if extract_dir in _mountedArchives:
+        _mountedArchives.pop(extract_dir).close()
+    try:
+        archive = DatArchive.open(filename)
+    except ValueError:
+        print('[-] wrong magic number detected')
+        return None
+    _mountedArchives[extract_dir] = archive
+    print(f"[+] {len(archive)} files mounted from {filename}")
+    return archive
+
+def unmount(extract_dir=None):
+    """Close one mounted archive, or all of them."""
+    dirs = list(_mountedArchives) if extract_dir is None else [os.path.normpath(extract_dir)]
+    for dir in dirs:
+        archive = _mountedArchives.pop(dir, None)
+        if archive is not None:
+            archive.close()
+
+def find_member(path) -> Tuple[DatArchive, str]:
+    dir, name = os.path.split(os.path.normpath(path))
+    archive = _mountedArchives.get(dir)
+    if archive is not None and name in archive:
+        return archive, name
+    return None
+
+def exists(path) -> bool:
+    return find_member(path) is not None or os.path.isfile(path)
+
+def listdir(dirpath) -> List[str]:
+    """Member names of a mounted archive plus whatever is on disk in that folder."""
+    names = []
+    archive = _mountedArchives.get(os.path.normpath(dirpath))
+    if archive is not None:
+        names.extend(archive.names)
+    if os.path.isdir(dirpath):
+        names.extend(x for x in os.listdir(dirpath) if x not in names)
+    return names
+
+def open_file(path) -> BinaryView:
+    """A mounted member if there is one (the archive is the newer copy), else the file on disk."""
+    member = find_member(path)
+    if member is not None:
+        archive, name = member
+        return archive.open_member(name)
+    return BinaryView.from_path(path)
+
+def materialize(path) -> str:
+    """Write a mounted member to disk, for the code that really needs a path."""
+    member = find_member(path)
+    if member is not None:
+        archive, name = member
+        archive.extract(archive.index(name), os.path.dirname(path))
+    return path
 
 def extract_file(fp, filename, FileOffset, Size, extract_dir):
     create_dir(extract_dir)
-    fp.seek(FileOffset)
-    FileContent = fp.read(Size)
+    if isinstance(fp, BinaryView):
+        FileContent = fp.slice(FileOffset, Size) # straight from the mmap
+    else:
+        fp.seek(FileOffset)
+        FileContent = fp.read(Size)
     with open(extract_dir + '/'+filename,'wb') as outfile:
         # print("extracting file %s to %s/%s"%(filename,extract_dir,filename))
         outfile.write(FileContent)
@@ -84,98 +263,175 @@ def extract_file(fp, filename, FileOffset, Size, extract_dir):
 def get_all_files(path):
     pass
 
-def extract_hashes(fp, extract_dir, FileCount, hashMapOffset, fileNamesOffset, filename):
+def extract_hashes(archive: DatArchive, extract_dir, filename):
     create_dir(extract_dir)
+    # the hash map itself is already parsed in the archive, only the names go to json
+    saveDatInfo(extract_dir + '/dat_info.json', archive.names, filename)
 
-    # file_order.metadata
-    # Filename Size
-    fp.seek(fileNamesOffset)
-    fileNameSize = read_int32(fp)
-
-    # Filenames
-    fileNames = []
-    for i in range(FileCount):
-        fileNames.append(fp.read(fileNameSize))
-
-    # Write filenames to json
-    saveDatInfo(
-        extract_dir + '/dat_info.json',
-        [file.decode('utf-8').rstrip('\x00') for file in fileNames],
-        filename
-    )
+MANIFEST_VERSION = 1
 
-    # hash_data.metadata
-    # Header
-    fp.seek(hashMapOffset)
-    preHashShift = read_uint32(fp)
-    bucketOffsetsOffset = read_uint32(fp)
-    hashesOffset = read_uint32(fp)
-    fileIndicesOffset = read_uint32(fp)
-
-    # Bucket Offsets
-    fp.seek(hashMapOffset + bucketOffsetsOffset)
-    bucketOffsets = []
-    while fp.tell() < (hashMapOffset + hashesOffset):
-        bucketOffsets.append(read_uint16(fp))
-
-    # Hashes
-    fp.seek(hashMapOffset + hashesOffset)
-    hashes = []
-    for i in range(FileCount):
-        hashes.append(fp.read(4))
-
-    # File Indices
-    fp.seek(hashMapOffset + fileIndicesOffset)
-    fileIndices = []
-    for i in range(FileCount):
-        fileIndices.append(read_uint16(fp))
-
-def main(filename, extract_dir, ROOT_DIR):
-    with open(filename,"rb") as fp:
-        headers = read_header(fp)
-        if headers:
-            FileCount, FileTableOffset, ExtensionTableOffset,NameTableOffset,SizeTableOffset,hashMapOffset = headers
-
-            extractedFiles = 0
-            for i in range(FileCount):
-                extract_dir_sub = ''
-                index,Filename,FileOffset,Size,Extension = get_fileinfo(fp, i, FileTableOffset,ExtensionTableOffset, NameTableOffset,SizeTableOffset)
-                if extract_dir != '':
-                    extract_dir_sub = os.path.join(extract_dir, filename.replace(ROOT_DIR ,''))
-                    extract_file(fp, Filename, FileOffset, Size, extract_dir_sub)
-                    extractedFiles += 1
-            
-            extract_hashes(fp, extract_dir, FileCount, hashMapOffset, NameTableOffset, os.path.basename(filename))
-            print(f"[+] {extractedFiles} files extracted from {filename}")
+def manifest_path(extract_dir) -> str:
+    """The manifest sits next to the extracted folder, so it never ends up packed into the DAT."""
+    return os.path.normpath(extract_dir) + ".manifest.json"
+
+def load_manifest(extract_dir) -> Dict:
+    try:
+        with open(manifest_path(extract_dir), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def extracted_unchanged(path, entry) -> bool:
+    """Is the extracted file still the one we wrote? (Catches edits and deletions.)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+def extract_archive(archive: DatArchive, filename, extract_dir, force=False) -> Tuple[int, int]:
+    """
+    Extract every member, unless the manifest from the last extraction says
+    the archive and the extracted files are still the same. If the archive
+    did change, only members whose CRC changed get rewritten.
+    Returns (extracted, skipped).
+    """
+    create_dir(extract_dir) # the manifest goes next to it, even if there's nothing to extract
+    source = os.stat(filename)
+    manifest = None if force else load_manifest(extract_dir)
+    if manifest is not None and manifest["source"]["size"] == source.st_size \
+        and manifest["source"]["mtime_ns"] == source.st_mtime_ns \
+        and len(manifest["members"]) == len(set(archive.names)) \
+        and all(extracted_unchanged(os.path.join(extract_dir, name), entry) for name, entry in manifest["members"].items()):
+        return 0, len(archive)
+
+    oldMembers = manifest["members"] if manifest is not None else {}
+    members = {}
+    extracted = skipped = 0
+    for i, name in enumerate(archive.names):
+        data = archive.view.slice(archive.offsets[i], archive.sizes[i])
+        memberCrc = zlib.crc32(data)
+        path = os.path.join(extract_dir, name)
+        old = oldMembers.get(name)
+        if old is not None and old["crc32"] == memberCrc and extracted_unchanged(path, old):
+            skipped += 1
+        else:
+            archive.extract(i, extract_dir)
+            extracted += 1
+        members[name] = {
+            "offset": archive.offsets[i],
+            "size": archive.sizes[i],
+            "crc32": memberCrc,
+            "mtime_ns": os.stat(path).st_mtime_ns
+        }
+
+    with open(manifest_path(extract_dir), "w") as f:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "source": {
+                "path": os.path.abspath(filename),
+                "size": source.st_size,
+                "mtime_ns": source.st_mtime_ns,
+                "hash": hashlib.blake2b(archive.view.slice(0, len(archive.view))).hexdigest()
+            },
+            "members": members
+        }, f, indent=4)
+    return extracted, skipped
+
+def main(filename, extract_dir, ROOT_DIR, force=False):
+    try:
+        archive = DatArchive.open(filename)
+    except ValueError:
+        print('[-] wrong magic number detected')
+        return False
+    with archive:
+        extractedFiles = skippedFiles = 0
+        if extract_dir != '':
+            extract_dir_sub = os.path.join(extract_dir, filename.replace(ROOT_DIR ,''))
+            extractedFiles, skippedFiles = extract_archive(archive, filename, extract_dir_sub, force)
+
+        extract_hashes(archive, extract_dir, os.path.basename(filename))
+        if skippedFiles:
+            print(f"[+] {extractedFiles} files extracted from {filename}, {skippedFiles} unchanged since the last extraction")
         else:
-            FileCount = 0
-    if (FileCount):
-        return Filename
+            print(f"[+] {extractedFiles} files extracted from {filename}")
+        if len(archive):
+            return archive.names[-1]
     return False
 
 
+def extract_to(filename, extract_dir, force=False) -> Tuple[int, int]:
+    """main() without the chatter, raises instead of returning False."""
+    with DatArchive.open(filename) as archive:
+        result = extract_archive(archive, filename, extract_dir, force)
+        extract_hashes(archive, extract_dir, os.path.basename(filename))
+    return result
+
+def find_archives(root) -> List[str]:
+    if os.path.isfile(root):
+        return [root]
+    archives = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [x for x in dirnames if x != 'nier2blender_extracted'] # our own output
+        archives.extend(os.path.join(dirpath, x) for x in filenames if os.path.splitext(x)[1].lower() in DAT_EXTENSIONS)
+    archives.sort()
+    return archives
+
+def bulk_extract(root, extract_dir, workers=None, force=False, archives=None) -> Dict[str, str]:
+    """
+    Unpack every DAT/DTT under `root` into the same folder structure under
+    `extract_dir`, `workers` archives at a time (None = the pool's default).
+    It's nearly all disk and zlib, both let go of the GIL, so threads do fine
+    and it also works inside Blender. Returns {archive: error} for the failures.
+    """
+    if archives is None:
+        archives = find_archives(root)
+    if os.path.isfile(root):
+        root = os.path.dirname(root)
+
+    errors = {}
+    extractedFiles = skippedFiles = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {
+            pool.submit(extract_to, archive, os.path.join(extract_dir, os.path.relpath(archive, root)), force): archive
+            for archive in archives
+        }
+        for done, job in enumerate(as_completed(jobs), 1):
+            archive = jobs[job]
+            try:
+                extracted, skipped = job.result()
+                extractedFiles += extracted
+                skippedFiles += skipped
+                status = f"{extracted} extracted" + (f", {skipped} unchanged" if skipped else "")
+            except Exception as e:
+                errors[archive] = f"{type(e).__name__}: {e}"
+                status = "FAILED"
+            print(f"[{done}/{len(archives)}] {os.path.relpath(archive, root)}: {status}")
+
+    print(f"[+] {len(archives) - len(errors)} of {len(archives)} archives unpacked, {extractedFiles} files extracted, {skippedFiles} unchanged")
+    if errors:
+        print(f"[-] {len(errors)} archives failed:")
+        for archive in sorted(errors):
+            print(f"    {archive}: {errors[archive]}")
+    return errors
+
+
 if __name__ == '__main__':
-    extract_dir = ''
-    dirname = ''
-    usage = "\nUsage:\npython dat_unpacker.py your_dat_path your_extract_path"
-    usage1 = "\nUsage:\nblender --background --python dat_unpacker.py your_dat_path your_extract_path"
-    if len(sys.argv) < 3:
-        print(usage)
-        exit()
-    if len(sys.argv) > 2:
-        dir_name = sys.argv[1]
-        extract_dir = sys.argv[2]
-        print()
-        if os.path.split(sys.argv[0])[-1].lower().find("blender") >-1:
-            if len(sys.argv) < 6:
-                print(usage1)
-                exit()
-            dir_name = sys.argv[4]
-            extract_dir = sys.argv[5]
-        if not os.path.exists(extract_dir):
-            create_dir(extract_dir)
-    ROOT_DIR = dir_name
-    for dirpath,dirnames,filename in os.walk(dir_name):
-        for file in filename:
-            filename = os.path.join(dirpath,file)
-            main(filename, extract_dir, ROOT_DIR)
+    import argparse
+    # blender --background --python dat_unpacker.py -- ... passes its own arguments first
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        prog="dat_unpacker.py",
+        description="Unpack a DAT/DTT, or every one under a folder, no Blender needed."
+    )
+    parser.add_argument("source", help="a DAT/DTT file or a folder to search for them")
+    parser.add_argument("extract_dir", help="where to put the extracted folders")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="archives to unpack at the same time (default: the thread pool's default)")
+    parser.add_argument("-f", "--force", action="store_true", help="extract everything, even archives unchanged since the last run")
+    args = parser.parse_args(argv)
+
+    errors = bulk_extract(args.source, args.extract_dir, args.workers, args.force)
+    sys.exit(1 if errors else 0)
@@ -20,10 +20,13 @@ class ImportSCR(bpy.types.Operator, ImportHelper):
 
     def execute(self, context):
         from . import scr_importer
+        from ...wmb.importer import wmb_importer
         if self.reset_blend:
             scr_importer.reset_blend()    
 
         setExportFieldsFromImportFile(self.filepath, False)
         enableVisibilitySelector()
         
-        return scr_importer.ImportSCR.main(self.filepath, self.only_extract)
+        with wmb_importer.import_session(): # one name registry for every model and prop
+            return scr_importer.ImportSCR.main(self.filepath, self.only_extract)
+
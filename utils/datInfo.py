@@ -0,0 +1,22 @@
+# dat_info.json helpers, kept free of bpy so the DAT unpacker also runs outside Blender
+import json
+import os
+from typing import List
+
+
+def getFileSortingKey(file: str):
+    base, ext = os.path.splitext(file)
+    return (base.lower(), ext.lower())
+
+def saveDatInfo(filepath: str, files: List[str], filename: str):
+    files = list(set(files))
+    files.sort(key=getFileSortingKey)
+    base, ext = os.path.splitext(filename)
+    with open(filepath, 'w') as f:
+        jsonFiles = {
+            "version": 1,
+            "files": files,
+            "basename": base,
+            "ext": ext[1:]
+        }
+        json.dump(jsonFiles, f, indent=4)
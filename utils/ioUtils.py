@@ -1,4 +1,5 @@
 from __future__ import annotations
+import mmap
 import struct
 from typing import Any, List, Tuple
 
@@ -77,6 +78,206 @@ class SmartIO:
     def write(self, file, values: Any):
         file.write(struct.pack(self.format, *values))
 
+    def read_from(self, view: BinaryView, offset: int) -> Tuple[Any]:
+        return struct.unpack_from(self.format, view.buffer, view.base + offset)
+
+    def write_into(self, writer: BinaryWriter, offset: int, values: Any):
+        writer.pack_into(self.format, offset, *values)
+
+
+class BinaryView:
+    """
+    Read-only little endian view over a file or an in-memory buffer.
+    Fields are unpacked with struct.unpack_from at absolute offsets, straight
+    from the mmap/bytes, so parsers never seek or copy the data. read/seek/tell
+    keep a cursor on top so the read_* helpers above still accept a view.
+    """
+    buffer: Any
+    base: int
+    size: int
+
+    def __init__(self, buffer, base: int = 0, size: int = -1, file=None):
+        self.buffer = buffer
+        self.base = base
+        self.size = len(buffer) - base if size == -1 else size
+        self.pos = 0
+        self._file = file
+
+    @classmethod
+    def from_path(cls, path: str) -> BinaryView:
+        file = open(path, "rb")
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # mmap refuses empty files
+            data = b""
+        return cls(data, file=file)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap) and self._file is not None:
+            try:
+                self.buffer.close()
+            except BufferError: # a memoryview is still alive, let gc unmap it
+                pass
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> BinaryView:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def view(self, offset: int, size: int) -> BinaryView:
+        """Sub-view sharing the same buffer, offsets relative to `offset`."""
+        return BinaryView(self.buffer, self.base + offset, size)
+
+    def slice(self, offset: int, size: int) -> memoryview:
+        start = self.base + offset
+        return memoryview(self.buffer)[start : start + size]
+
+    def unpack_from(self, format: str, offset: int) -> Tuple[Any]:
+        return struct.unpack_from(format, self.buffer, self.base + offset)
+
+    def records(self, smartIO: SmartIO, offset: int, count: int):
+        """Iterate over `count` consecutive SmartIO records at `offset`."""
+        return struct.iter_unpack(smartIO.format, self.slice(offset, smartIO.count * count))
+
+    def array(self, format: str, offset: int, count: int) -> Tuple[Any]:
+        """`count` values of a single struct type, e.g. array("H", ptr, n)."""
+        return struct.unpack_from("<%d%s" % (count, format), self.buffer, self.base + offset)
+
+    def int8(self, offset: int) -> int:
+        return struct.unpack_from("<b", self.buffer, self.base + offset)[0]
+
+    def uint8(self, offset: int) -> int:
+        return struct.unpack_from("<B", self.buffer, self.base + offset)[0]
+
+    def int16(self, offset: int) -> int:
+        return struct.unpack_from("<h", self.buffer, self.base + offset)[0]
+
+    def uint16(self, offset: int) -> int:
+        return struct.unpack_from("<H", self.buffer, self.base + offset)[0]
+
+    def int32(self, offset: int) -> int:
+        return struct.unpack_from("<i", self.buffer, self.base + offset)[0]
+
+    def uint32(self, offset: int) -> int:
+        return struct.unpack_from("<I", self.buffer, self.base + offset)[0]
+
+    def float(self, offset: int) -> float:
+        return struct.unpack_from("<f", self.buffer, self.base + offset)[0]
+
+    def string(self, offset: int, encoding: str = "utf-8") -> str:
+        """Null terminated string starting at `offset`."""
+        start = self.base + offset
+        limit = self.base + self.size
+        if isinstance(self.buffer, memoryview): # no find() on memoryview
+            end = bytes(self.buffer[start:limit]).find(b"\x00")
+            end = limit if end == -1 else start + end
+        else:
+            end = self.buffer.find(b"\x00", start, limit)
+            if end == -1:
+                end = limit
+        return bytes(self.buffer[start:end]).decode(encoding)
+
+    # file-like compatibility
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = self.size - self.pos
+        start = self.base + self.pos
+        size = max(0, min(size, self.size - self.pos))
+        self.pos += size
+        return bytes(self.buffer[start : start + size])
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.size
+        self.pos = offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+
+class BinaryWriter:
+    """
+    In-memory little endian output, the write side of BinaryView. Chunks are
+    packed at absolute offsets with struct.pack_into, growing the buffer as
+    needed; write/seek/tell keep a cursor so the write_* helpers below still
+    accept a writer. Goes to disk in a single write with save().
+    """
+    buffer: bytearray
+
+    def __init__(self, size: int = 0):
+        self.buffer = bytearray(size)
+        self.pos = 0
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def reserve(self, end: int):
+        if end > len(self.buffer):
+            self.buffer.extend(bytes(end - len(self.buffer)))
+
+    def pack_into(self, format: str, offset: int, *values):
+        self.reserve(offset + struct.calcsize(format))
+        struct.pack_into(format, self.buffer, offset, *values)
+
+    def records(self, smartIO: SmartIO, offset: int, rows) -> int:
+        """Pack consecutive SmartIO records at `offset`, returns the offset after them."""
+        rows = list(rows)
+        self.reserve(offset + smartIO.count * len(rows))
+        for row in rows:
+            struct.pack_into(smartIO.format, self.buffer, offset, *row)
+            offset += smartIO.count
+        return offset
+
+    def array(self, format: str, offset: int, values) -> int:
+        """Pack values of a single struct type, e.g. array("H", ptr, batches)."""
+        values = list(values)
+        return self.write_at(offset, struct.pack("<%d%s" % (len(values), format), *values))
+
+    def write_at(self, offset: int, data) -> int:
+        data = memoryview(data).cast("B")
+        self.reserve(offset + len(data))
+        self.buffer[offset : offset + len(data)] = data
+        return offset + len(data)
+
+    def getvalue(self) -> bytes:
+        return bytes(self.buffer)
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(self.buffer)
+
+    # file-like compatibility
+
+    def write(self, data) -> int:
+        start = self.pos
+        self.pos = self.write_at(self.pos, data)
+        return self.pos - start
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.buffer)
+        self.pos = offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def flush(self):
+        pass
+
 
 signMask = 0x8000
 expoMask = 0x7e00
@@ -206,20 +407,6 @@ def write_float16(file, val):
 
 # WMB
 
-def create_wmb(filepath):
-    print('Creating wmb file: ', filepath)
-    wmb_file = open(filepath, 'wb')
-    return wmb_file
-
-
-def close_wmb(wmb_file, generated_data):
-    if hasattr(generated_data, "lods_Offset"):
-        wmb_file.seek(generated_data.lods_Offset-52)
-    else:
-        wmb_file.seek(0, 2)
-    wmb_file.flush()
-    wmb_file.close()
-
 # String
 
 def to_string(bs, encoding = 'utf8'):
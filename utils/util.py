@@ -1,5 +1,7 @@
 from __future__ import annotations
+from contextlib import contextmanager
 from functools import wraps
+import hashlib
 import json
 import os
 import textwrap
@@ -13,6 +15,7 @@ from mathutils import Vector
 from zlib import crc32 as zcrc32
 
 from .ioUtils import read_uint32
+from .datInfo import getFileSortingKey, saveDatInfo
 from ..consts import ADDON_NAME, DAT_EXTENSIONS
 
 
@@ -106,26 +109,42 @@ def getObjectCenter(obj):
     #obj_global_bbox_center = obj.matrix_world @ obj_local_bbox_center
     return obj_local_bbox_center
 
-def getGlobalBoundingBox():
-    xVals = []
-    yVals = []
-    zVals = []
-
-    for obj in (x for x in bpy.data.collections['WMB'].all_objects if x.type == "MESH"):
-        xVals.extend([getObjectCenter(obj)[0] - obj.dimensions[0]/2, getObjectCenter(obj)[0] + obj.dimensions[0]/2])
-        yVals.extend([getObjectCenter(obj)[1] - obj.dimensions[1]/2, getObjectCenter(obj)[1] + obj.dimensions[1]/2])
-        zVals.extend([getObjectCenter(obj)[2] - obj.dimensions[2]/2, getObjectCenter(obj)[2] + obj.dimensions[2]/2])
+def getObjectAABBs(objs) -> tuple:
+    """
+    Centers and half sizes of every object's bounding box as (n, 3) arrays,
+    same numbers as getObjectCenter(obj) and obj.dimensions / 2.
+    """
+    count = len(objs)
+    corners = np.empty((count, 8, 3), dtype=np.float32)
+    dimensions = np.empty((count, 3), dtype=np.float32)
+    for i, obj in enumerate(objs):
+        corners[i] = obj.bound_box
+        dimensions[i] = obj.dimensions
+    # summed corner by corner in float32 like getObjectCenter's Vectors
+    centers = (corners.sum(axis=1) * np.float32(0.125)).astype(np.float64)
+    return centers, dimensions.astype(np.float64) / 2
+
+_boundingBoxCache: Dict[tuple, tuple] = {}
+
+def clearBoundingBoxCache():
+    _boundingBoxCache.clear()
 
-    minX = min(xVals)
-    maxX = max(xVals)
-    minY = min(yVals)
-    maxY = max(yVals)
-    minZ = min(zVals)
-    maxZ = max(zVals)
-
-    midPoint = [(minX + maxX)/2, (minY + maxY)/2, (minZ + maxZ)/2]
-    scale = [maxX - midPoint[0], maxY - midPoint[1], maxZ - midPoint[2]]
-    return midPoint, scale
+def getGlobalBoundingBox():
+    meshObjs = [x for x in bpy.data.collections['WMB'].all_objects if x.type == "MESH"]
+    key = tuple(obj.as_pointer() for obj in meshObjs)
+    cached = _boundingBoxCache.get(key)
+    if cached is None:
+        centers, halfSizes = getObjectAABBs(meshObjs)
+        minXYZ = (centers - halfSizes).min(axis=0)
+        maxXYZ = (centers + halfSizes).max(axis=0)
+
+        midPoint = (minXYZ + maxXYZ)/2
+        scale = maxXYZ - midPoint
+        cached = (midPoint.tolist(), scale.tolist())
+        _boundingBoxCache.clear() # only ever one export at a time
+        _boundingBoxCache[key] = cached
+    midPoint, scale = cached
+    return list(midPoint), list(scale)
 
 def getObjKey(obj):
     p1 = obj.name.split('-')
@@ -143,7 +162,7 @@ def allObjectsInCollectionInOrder(collectionName):
 def getChildrenInOrder(obj: bpy.types.Object) -> List[bpy.types.Object]:
     return sorted(obj.children, key=getObjKey)
 
-def getAllBonesInOrder(collectionName):
+def getArmatureInCollection(collectionName):
     if collectionName == "WMB": # get active sub-collection
         wmbLayerCollection = bpy.context.view_layer.layer_collection.children['WMB']
         subCollection = [x for x in wmbLayerCollection.children if x.is_visible][0]
@@ -151,12 +170,41 @@ def getAllBonesInOrder(collectionName):
 
     for obj in bpy.data.collections[collectionName].all_objects:
         if obj.type == 'ARMATURE':
-            return list(obj.data.bones)
+            return obj
+
+def getAllBonesInOrder(collectionName):
+    armature = getArmatureInCollection(collectionName)
+    if armature is not None:
+        return list(armature.data.bones)
+
+# armature data pointer -> (bone count, {bone name: index in getAllBonesInOrder})
+_boneIndexCache: Dict[int, tuple] = {}
+
+def clearBoneIndexCache():
+    _boneIndexCache.clear()
+
+def getBoneIndexMap(armature) -> Dict[str, int]:
+    """Bone name -> bone index for an armature object, built once and reused."""
+    bones = armature.data.bones
+    key = armature.data.as_pointer()
+    cached = _boneIndexCache.get(key)
+    if cached is None or cached[0] != len(bones):
+        boneIndexMap = {}
+        for i, bone in enumerate(bones):
+            boneIndexMap.setdefault(bone.name, i)
+        cached = (len(bones), boneIndexMap)
+        _boneIndexCache[key] = cached
+    return cached[1]
 
 def getBoneIndexByName(collectionName, name):
-    for i, bone in enumerate(getAllBonesInOrder(collectionName)):
-        if bone.name == name:
-            return i
+    armature = getArmatureInCollection(collectionName)
+    if armature is None:
+        return None
+    boneIndex = getBoneIndexMap(armature).get(name)
+    if boneIndex is not None and armature.data.bones[boneIndex].name != name: # renamed since, start over
+        _boneIndexCache.pop(armature.data.as_pointer(), None)
+        boneIndex = getBoneIndexMap(armature).get(name)
+    return boneIndex
 
 def create_dir(dirpath):
     if not os.path.exists(dirpath):
@@ -222,31 +270,141 @@ class custom_ColTreeNode:
     def getVolume(self):
         return np.prod(self.scale)
 
-def triangulate_meshes(collection: str):
-    if bpy.context.object is not None:
-        bpy.ops.object.mode_set(mode='OBJECT')
-    for obj in bpy.data.collections[collection].all_objects:
-        if obj.type == 'MESH':
-            # Triangulate
-            me = obj.data
-            bm = bmesh.new()
-            bm.from_mesh(me)
-            bmesh.ops.triangulate(bm, faces=bm.faces[:])
-            bm.to_mesh(me)
-            bm.free()
-
-def centre_origins(collection: str):
-    if bpy.context.object is not None:
-        bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.object.select_all(action='DESELECT')
-    bpy.context.scene.cursor.location = [0, 0, 0]
-    for subCollection in bpy.context.view_layer.layer_collection.children[collection].children:
-        if not subCollection.is_visible:
-            continue
-        for obj in [x for x in subCollection.collection.all_objects if x.type == 'MESH']:
-            obj.select_set(True)
-            bpy.ops.object.origin_set(type='ORIGIN_CURSOR')
-            obj.select_set(False)
+# Custom props c_generate_data (re)writes or fills in during every export, after
+# the hash was taken. Hashing them would make the next export see every mesh as
+# changed, and none of them go into a mesh's vertex data anyway.
+exporterOwnedProps = {"ID", "meshGroupIndex", "Materials", "boneSetIndex", "batchGroup", "colTreeNodeIndex"}
+
+def getObjectExportHash(obj) -> str:
+    """
+    Content hash of everything the WMB exporter reads from a mesh object:
+    geometry, UVs, colours, vertex groups and weights, materials, custom
+    properties and transform (centring the origin bakes that into the mesh).
+    Inside exportSnapshot this is the hash of the user's mesh, not the copy.
+    """
+    snapshot = _exportSnapshot.get(obj.name)
+    if snapshot is not None and snapshot[2] == obj.data:
+        return snapshot[3]
+    mesh = obj.data
+    objHash = hashlib.blake2b(digest_size=16)
+    def addArray(items, attribute, dtype, width=1):
+        values = np.empty(len(items) * width, dtype=dtype)
+        items.foreach_get(attribute, values)
+        objHash.update(values.tobytes())
+    def plain(value): # ID property groups and arrays repr as pointers, not contents
+        if hasattr(value, "to_dict"):
+            return value.to_dict()
+        if hasattr(value, "to_list"):
+            return value.to_list()
+        return value
+    def addValue(value):
+        objHash.update(repr(value).encode())
+
+    addArray(mesh.vertices, "co", np.float32, 3)
+    addArray(mesh.polygons, "loop_total", np.int32)
+    addArray(mesh.loops, "vertex_index", np.int32)
+    addArray(mesh.loops, "normal", np.float32, 3)
+    for uvLayer in mesh.uv_layers:
+        addValue(uvLayer.name)
+        addArray(uvLayer.data, "uv", np.float32, 2)
+    for colorLayer in mesh.vertex_colors:
+        addValue((colorLayer.name, colorLayer.active))
+        addArray(colorLayer.data, "color", np.float32, 4)
+
+    addValue([group.name for group in obj.vertex_groups])
+    weights = [(groupRef.group, groupRef.weight) for vertex in mesh.vertices for groupRef in vertex.groups]
+    objHash.update(np.array(weights, dtype=np.float64).tobytes())
+    groupCounts = np.array([len(vertex.groups) for vertex in mesh.vertices], dtype=np.int32)
+    objHash.update(groupCounts.tobytes())
+
+    addValue([slot.material.name if slot.material else "" for slot in obj.material_slots])
+    addValue([(key, plain(obj[key])) for key in sorted(obj.keys()) if key not in exporterOwnedProps])
+    addValue((obj.name, mesh.name))
+    objHash.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    return objHash.hexdigest()
+
+def getObjectExportHashes(collectionName: str) -> Dict[str, str]:
+    """getObjectExportHash of every mesh in the collection, by object name."""
+    return {
+        obj.name: getObjectExportHash(obj)
+        for obj in bpy.data.collections[collectionName].all_objects if obj.type == 'MESH'
+    }
+
+def getDirtyExportObjects(collectionName: str, objectHashes: Dict[str, str] = None) -> List[bpy.types.Object]:
+    """
+    Meshes that changed since the last export of this collection (all of them if there wasn't one).
+    Pass in getObjectExportHashes if you have them already, hashing every vertex isn't free.
+    """
+    collection = bpy.data.collections[collectionName]
+    if objectHashes is None:
+        objectHashes = getObjectExportHashes(collectionName)
+    exportHashes = collection.get("exportHashes", {})
+    return [
+        obj for obj in collection.all_objects
+        if obj.type == 'MESH' and exportHashes.get(obj.name) != objectHashes[obj.name]
+    ]
+
+# object name -> (object, original mesh, snapshot mesh, original export hash) while exporting
+_exportSnapshot: Dict[str, tuple] = {}
+_exportSnapshotOptions = None
+
+def getExportSnapshotOptions():
+    return _exportSnapshotOptions
+
+@contextmanager
+def exportSnapshot(collection: str, triangulate: bool = True, centreOrigins: bool = True, deleteLoose: bool = False,
+                   objectHashes: Dict[str, str] = None):
+    """
+    Swaps every mesh object in the collection over to a prepared copy of its
+    mesh for the duration of the with block, then puts the original back.
+    The copies get triangulated, their origins centred and loose vertexes
+    deleted, in bmesh and matrix math instead of operators, so the user's
+    meshes, the scene and the undo stack stay as they were.
+    Uses the mesh data, not the evaluated object.
+    objectHashes are export hashes the caller already took of unchanged meshes,
+    the rest get hashed here.
+    """
+    global _exportSnapshotOptions
+    meshObjs = [obj for obj in bpy.data.collections[collection].all_objects if obj.type == 'MESH']
+    bm = bmesh.new()
+    try:
+        _exportSnapshotOptions = (triangulate, centreOrigins, deleteLoose)
+        snapshotStart = time()
+        for obj in meshObjs:
+            original = obj.data
+            if objectHashes is not None and obj.name in objectHashes:
+                originalHash = objectHashes[obj.name]
+            else:
+                originalHash = getObjectExportHash(obj)
+            bm.from_mesh(original)
+            if deleteLoose: # verts with no linked faces
+                bmesh.ops.delete(bm, geom=[v for v in bm.verts if not v.link_faces], context='VERTS')
+            if triangulate:
+                bmesh.ops.triangulate(bm, faces=bm.faces[:])
+            if centreOrigins: # origin to the world origin, keeping the world space positions
+                worldMatrix = obj.matrix_world
+                offset = worldMatrix.to_3x3().inverted_safe() @ worldMatrix.translation
+                bmesh.ops.translate(bm, vec=offset, verts=bm.verts[:])
+            snapshot = original.copy()
+            bm.to_mesh(snapshot)
+            bm.clear()
+            obj.data = snapshot
+            _exportSnapshot[obj.name] = (obj, original, snapshot, originalHash)
+        bpy.context.view_layer.update() # bound_box and dimensions of the copies
+        setTiming(["snapshot"], time() - snapshotStart)
+        yield
+    finally:
+        bm.free()
+        for obj, original, snapshot, originalHash in _exportSnapshot.values():
+            try:
+                if obj.data == snapshot:
+                    obj.data = original
+            except ReferenceError: # removed during export
+                pass
+            bpy.data.meshes.remove(snapshot)
+        _exportSnapshot.clear()
+        _exportSnapshotOptions = None
+        bpy.context.view_layer.update()
 
 def setExportFieldsFromImportFile(filepath: str, isDatImport: bool) -> None:
     dir = os.path.dirname(filepath)
@@ -312,6 +470,15 @@ def timing(path: List[str]):
         return wrap
     return decorator
 
+@contextmanager
+def timed(path: List[str]):
+    """Adds the wall-clock time of the with block to timings[path...]."""
+    t1 = time()
+    try:
+        yield
+    finally:
+        setTiming(list(path), time() - t1)
+
 def printTimingsSection(total: float, inner: Dict, indent: int = 0):
     for key in inner:
         if type(inner[key]) is dict:
@@ -354,10 +521,6 @@ def importContentsFileFromFolder(folderPath: str, contentsList: bpy.types.Collec
         return False
     return True
 
-def getFileSortingKey(file: str):
-    base, ext = os.path.splitext(file)
-    return (base.lower(), ext.lower())
-
 def readJsonDatInfo(filepath: str, contentsList: bpy.types.CollectionProperty):
     with open(filepath, "r") as f:
         filesData = json.load(f)
@@ -407,19 +570,6 @@ def readFileOrderMetadata(filepath: str, contentsList: bpy.types.CollectionPrope
         bpy.context.scene.DatExtension = ext[1:]
         bpy.context.scene.ExportFileName = os.path.basename(filepath)[:-4]
 
-def saveDatInfo(filepath: str, files: List[str], filename: str):
-    files = list(set(files))
-    files.sort(key=getFileSortingKey)
-    base, ext = os.path.splitext(filename)
-    with open(filepath, 'w') as f:
-        jsonFiles = {
-            "version": 1,
-            "files": files,
-            "basename": base,
-            "ext": ext[1:]
-        }
-        json.dump(jsonFiles, f, indent=4)
-
 class throttle(object):
     leading: bool
     trailing: bool
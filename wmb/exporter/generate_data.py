@@ -9,6 +9,7 @@ import mathutils as mu
 from .materials.material import c_material
 from .materials.create_materials import c_materials
 from ..slice_data import *
+from ..importer.wmb import wmb4_vertex, wmb4_vertexExData
 
 def getRealName(name):
     splitname = name.split('-')
@@ -172,10 +173,11 @@ class c_boneIndexTranslateTable(object):
 
 
         # Generate empty table
-        fullLookup = [0xfff] * 0x1000
+        fullLookup = np.full(0x1000, 0xfff, dtype=np.int16)
         
         # Populate the third level
-        for i, bone in enumerate(getAllBonesInOrder("WMB")):
+        allBones = getAllBonesInOrder("WMB")
+        for i, bone in enumerate(allBones):
             if 'ID' not in bone: # generate later
                 continue
             if not 0 <= bone['ID'] < 0x1000: # force re-generate
@@ -184,59 +186,41 @@ class c_boneIndexTranslateTable(object):
             fullLookup[bone['ID']] = i
 
         newBones = []
-        # Add new bones that dont have ID
-        for i, bone in enumerate(getAllBonesInOrder("WMB")):
+        # Add new bones that dont have ID, taking the highest free IDs first
+        freeID = 0x1000 - 1
+        for i, bone in enumerate(allBones):
             if 'ID' in bone:
                 continue
-            for k in range(0x1000 - 1, 0, -1):
-                if fullLookup[k] == 0xfff:
-                    fullLookup[k] = i
-                    bone['ID'] = k
-                    print("Added new bone to table", bone.name, "assigning ID", bone['ID'])
-                    newBones.append(bone)
-                    break
+            while freeID > 0 and fullLookup[freeID] != 0xfff:
+                freeID -= 1
+            if freeID == 0: # table's full
+                continue
+            fullLookup[freeID] = i
+            bone['ID'] = freeID
+            print("Added new bone to table", bone.name, "assigning ID", bone['ID'])
+            newBones.append(bone)
 
         # Generate levels from fullLookup
         # The boneIndexTranslateTable is a compressed reverse lookup for bone IDs.
-        self.firstLevel = [-1] * 0x10
-        self.secondLevel = []
-        self.thirdLevel = []
+        # Every level points 0x10 entries further for each used chunk before it,
+        # counting from the start of the first level.
+        chunks = fullLookup.reshape(0x10, 0x10, 0x10) # [0x100 block][0x10 chunk][entry]
+        usedChunks = (chunks != 0xfff).any(axis=2)
+        usedBlocks = usedChunks.any(axis=1)
 
         # firstLevel -- skip ranges of 0x100 that are completely empty
-        curIndex = 0x10
-        for i in range(0x10):
-            partialLookup = fullLookup[0x100 * i : 0x100 * (i + 1)]
-            if all([x == 0xfff for x in partialLookup]):
-                continue
-            self.firstLevel[i] = curIndex
-            curIndex += 0x10
+        blockCount = int(usedBlocks.sum())
+        self.firstLevel = np.full(0x10, -1, dtype=np.int16)
+        self.firstLevel[usedBlocks] = 0x10 + 0x10 * np.arange(blockCount)
 
         # secondLevel -- skip ranges of 0x10 that are completely empty
-        for i in range(0x10):
-            if self.firstLevel[i] == -1:
-                continue
-            # i corresponds to the start of a chunk of 0x100 bone indexes
-            partialLookup = fullLookup[0x100 * i : 0x100 * (i + 1)]
-            newSecondLevel = [-1] * 0x10
-            for j in range(0x10):
-                partialPartialLookup = partialLookup[0x10 * j : 0x10 * (j + 1)]
-                if all([x == 0xfff for x in partialPartialLookup]):
-                    continue
-                newSecondLevel[j] = curIndex
-                curIndex += 0x10
-
-            self.secondLevel.extend(newSecondLevel)
+        blockChunks = usedChunks[usedBlocks] # (blockCount, 0x10)
+        self.secondLevel = np.full(blockChunks.shape, -1, dtype=np.int16)
+        self.secondLevel[blockChunks] = 0x10 + 0x10 * (blockCount + np.arange(int(blockChunks.sum())))
+        self.secondLevel = self.secondLevel.ravel()
 
         # thirdLevel -- just chunks from fullLookup according to secondLevel
-        for i, firstLevelItem in enumerate(self.firstLevel):
-            if firstLevelItem == -1:
-                continue
-            # -0x10 because the first level is considered under the same index system
-            secondLevelPortion = self.secondLevel[firstLevelItem - 0x10 : firstLevelItem]
-            for j, secondLevelItem in enumerate(secondLevelPortion):
-                if secondLevelItem == -1:
-                    continue
-                self.thirdLevel.extend(fullLookup[i * 0x100 + j * 0x10 : i * 0x100 + (j + 1) * 0x10])
+        self.thirdLevel = chunks[usedChunks & usedBlocks[:, None]].ravel()
 
 
         self.firstLevel_Size = len(self.firstLevel)
@@ -308,6 +292,7 @@ class c_b_boneSets(object):
         
         # Get boneSets
         b_boneSets = []
+        b_boneSetIndices = {} # tuple(boneSet) -> index in b_boneSets
         allmeshes = [x for x in bpy.data.collections['WMB'].all_objects if x.type == 'MESH']
         allmeshes = sorted(allmeshes, key=lambda x: x['boneSetIndex'])
         for obj in allmeshes:
@@ -320,7 +305,7 @@ class c_b_boneSets(object):
                 vertex_group_bones = sorted(vertex_group_bones)
                 print(obj.name, vertex_group_bones)
                 assert len(vertex_group_bones) > 0 # This mesh has no bone weights, it should have a boneSetIndex of -1
-                if vertex_group_bones not in b_boneSets:
+                if tuple(vertex_group_bones) not in b_boneSetIndices:
                     #if wmb4:
                     #    if len(b_boneSets) <= obj["boneSetIndex"]:
                     #        b_boneSets.append(vertex_group_bones)
@@ -328,15 +313,75 @@ class c_b_boneSets(object):
                     #        b_boneSets[obj["boneSetIndex"]].extend(vertex_group_bones)
                     #else:
                     b_boneSets.append(vertex_group_bones)
+                    b_boneSetIndices[tuple(vertex_group_bones)] = len(b_boneSets)-1
                     obj["boneSetIndex"] = len(b_boneSets)-1
                 else:#if not wmb4:
-                    obj["boneSetIndex"] = b_boneSets.index(vertex_group_bones)
+                    obj["boneSetIndex"] = b_boneSetIndices[tuple(vertex_group_bones)]
         
         #if wmb4:
         #    b_boneSets = [sorted(list(set(boneSet))) for boneSet in b_boneSets] # removing duplicates trick
         
         amt.data['boneSetArray'] = b_boneSets
 
+class c_boneSetLookup(object):
+    """
+    The armature's boneSetArray, read once per export, with a global bone
+    index -> set-local index array for every set. Bones a mesh uses outside
+    its set get appended here and written back to the armature by store().
+    """
+    def __init__(self, collectionName='WMB'):
+        self.armature = None
+        for obj in bpy.data.collections[collectionName].all_objects:
+            if obj.type == 'ARMATURE':
+                self.armature = obj
+                break
+        self.boneSets = []
+        if self.armature is not None and 'boneSetArray' in self.armature.data:
+            self.boneSets = [list(boneSet) for boneSet in self.armature.data['boneSetArray']]
+        self.lookups = {}
+        self.changed = False
+
+    def get_lookup(self, boneSetIndex):
+        if boneSetIndex < 0: # -1 means the last one, like the list did
+            boneSetIndex += len(self.boneSets)
+        if boneSetIndex not in self.lookups:
+            boneSet = np.asarray(self.boneSets[boneSetIndex], dtype=np.int64)
+            lookup = np.full(int(boneSet.max()) + 1 if len(boneSet) else 0, -1, dtype=np.int64)
+            uniqueBones, firstIndices = np.unique(boneSet, return_index=True) # first occurrence wins, like list.index
+            lookup[uniqueBones] = firstIndices
+            self.lookups[boneSetIndex] = lookup
+        return self.lookups[boneSetIndex]
+
+    def get_localIndices(self, boneSetIndex, boneIDs, validBones):
+        """(n, 4) global bone indices to set-local ones, 0 where not validBones."""
+        usedBones = boneIDs[validBones]
+        if len(usedBones) == 0:
+            return np.zeros(boneIDs.shape, dtype=np.int64)
+        if len(self.boneSets) == 0:
+            print("No bone sets to put bones %s in" % sorted(set(usedBones.tolist())))
+            return np.zeros(boneIDs.shape, dtype=np.int64)
+        lookup = self.get_lookup(boneSetIndex) if boneSetIndex != -1 else np.zeros(0, dtype=np.int64)
+        _, firstUse = np.unique(usedBones, return_index=True)
+        usedBones = usedBones[np.sort(firstUse)] # in order of first use
+        inSet = usedBones < len(lookup)
+        inSet[inSet] = lookup[usedBones[inSet]] >= 0
+        if not inSet.all(): # bone not in set? well fuck that
+            boneSet = self.boneSets[boneSetIndex] # i swear to god # !!!
+            for boneID in usedBones[~inSet].tolist():
+                if boneID not in boneSet:
+                    boneSet.append(boneID)
+            self.lookups.pop(boneSetIndex if boneSetIndex >= 0 else boneSetIndex + len(self.boneSets), None)
+            self.changed = True
+            lookup = self.get_lookup(boneSetIndex)
+        lookup = np.append(lookup, -1) # so out of range (and -1) bone IDs land on -1
+        boneIDs = np.where(validBones & (boneIDs < len(lookup) - 1), boneIDs, -1)
+        return np.where(validBones, np.take(lookup, boneIDs), 0)
+
+    def store(self):
+        if self.changed and self.armature is not None:
+            self.armature.data['boneSetArray'] = self.boneSets
+            self.changed = False
+
 def get_bone_tPosition(bone):
     if 'TPOSE_worldPosition' in bone:
         return Vector3(bone['TPOSE_worldPosition'][0], bone['TPOSE_worldPosition'][1], bone['TPOSE_worldPosition'][2])
@@ -369,7 +414,7 @@ class c_bones(object):
                     ID = bone['ID']
                     
                     if bone.parent:
-                        parentIndex = getAllBonesInOrder(collectionName).index(bone.parent)
+                        parentIndex = getBoneIndexByName(collectionName, bone.parent.name)
                     else:
                         parentIndex = -1
 
@@ -1155,10 +1200,226 @@ class c_unknownWorldData(object):
         self.unknownWorldDataSize = get_unknownWorldDataSize(self.unknownWorldData)
         self.unknownWorldDataCount = len(self.unknownWorldData)
 
+def pack_normals(normals):
+    """(n, 3) unit normals into the 11+11+10 bit two's complement layout."""
+    nx = np.round(normals[:, 0].astype(np.float64) * float((1<<10)-1)).astype(np.int64)
+    ny = np.round(normals[:, 1].astype(np.float64) * float((1<<10)-1)).astype(np.int64)
+    nz = np.round(normals[:, 2].astype(np.float64) * float((1<<9 )-1)).astype(np.int64)
+    return ((nx & 0x7ff) | ((ny & 0x7ff) << 11) | ((nz & 0x3ff) << 22)).astype(np.uint32)
+
+def get_loop_uvs(obj, uvName, loopCount):
+    """Per loop [u, 1-v] of a named UV map, zeros (and a complaint) if it's missing."""
+    uvs = np.zeros((loopCount, 2), dtype=np.float64)
+    if uvName not in obj.data.uv_layers:
+        print(" - UV Maps Error: Object %s has no UV map named %s, writing zeros" % (obj.name, uvName))
+        return uvs
+    loopUVs = np.empty(loopCount * 2, dtype=np.float32)
+    obj.data.uv_layers[uvName].data.foreach_get("uv", loopUVs)
+    uvs[:] = loopUVs.reshape(-1, 2)
+    uvs[:, 1] = 1 - uvs[:, 1]
+    return uvs
+
+def get_vertex_bones(obj, usedVertices, vertexCount, collectionName, boneSetLookup):
+    """
+    (n, 4) boneSet local indices and byte weights of the used vertices.
+    Vertex groups are resolved to bones once per object instead of per
+    vertex. Weights are normalized to bytes summing to 255 like before.
+    """
+    vertices = obj.data.vertices
+    groupLists = [vertices[i].groups for i in usedVertices.tolist()]
+    groupCounts = np.array([len(groups) for groups in groupLists], dtype=np.int64)
+    maxGroups = max(4, int(groupCounts.max()) if len(groupCounts) else 0)
+    groupIndices = np.full((len(groupLists), maxGroups), -1, dtype=np.int64)
+    groupWeights = np.zeros((len(groupLists), maxGroups), dtype=np.float64)
+    for row, groups in enumerate(groupLists):
+        for column, groupRef in enumerate(groups):
+            groupIndices[row, column] = groupRef.group
+            groupWeights[row, column] = groupRef.weight
+
+    # Bone Indices
+    missingBones = set()
+    groupBoneIDs = np.full(len(obj.vertex_groups) + 1, -1, dtype=np.int64) # last one for the padding
+    for group in obj.vertex_groups:
+        boneID = getBoneIndexByName(collectionName, group.name)
+        if boneID is None: # nonexistent group epic fail
+            missingBones.add(group.name)
+            continue
+        groupBoneIDs[group.index] = boneID
+    boneIDs = groupBoneIDs[groupIndices]
+    if len(missingBones) > 0:
+        usedGroups = set(groupIndices[groupIndices >= 0].tolist())
+        missingBones = [group.name for group in obj.vertex_groups if group.index in usedGroups and group.name in missingBones]
+        if len(missingBones) > 0:
+            print("The following bones were not found on the armature: %s" % ', '.join(missingBones))
+    # first four groups that are actual bones
+    firstFour = np.argsort(boneIDs < 0, axis=1, kind="stable")[:, :4]
+    boneIDs = np.take_along_axis(boneIDs, firstFour, axis=1)
+    validBones = boneIDs >= 0
+
+    boneIndexes = boneSetLookup.get_localIndices(obj["boneSetIndex"], boneIDs, validBones)
+    if boneIndexes.size and (boneIndexes.min() < 0 or boneIndexes.max() > 255):
+        print("Hmm, boneID of", boneIndexes.max(), "could be a problem...")
+        print(boneSetLookup.boneSets[obj["boneSetIndex"]])
+    for row in np.flatnonzero(~validBones.any(axis=1)).tolist():
+        print(vertexCount + row ,"- Vertex Weights Error: Vertex has no assigned groups. At least 1 required. Try using Blender's [Select -> Select All By Trait > Ungrouped Verts] function to find them.")
+
+    # Bone Weights
+    for row in np.flatnonzero(groupCounts > 4).tolist():
+        print(vertexCount + row, "- Vertex Weights Error: Vertex has weights assigned to more than 4 groups. Try using Blender's [Weights -> Limit Total] function.")
+    weights = groupWeights[:, :4]
+    usable = np.minimum(groupCounts, 4)
+    for row in np.flatnonzero((weights < 0).any(axis=1)).tolist():
+        print(vertexCount + row, "- Vertex Weights Error: Vertex has negative bone weights.")
+    weights = np.maximum(weights, 0)
+    weightsSum = weights.sum(axis=1, keepdims=True)
+    # Force normalize the weights as Blender's normalization sometimes get some rounding issues.
+    normalized = np.divide(weights, weightsSum, out=np.zeros_like(weights), where=weights > 0)
+    boneWeights = np.minimum(np.floor(normalized * 256.0), 255).astype(np.int64)
+    boneWeights[usable == 0, 0] = 255
+
+    # MOAR checks to make sure weights are normalized but in bytes. (A bit cheating but these values should make such a minor impact.)
+    # spread what's missing over the usable weights, one at a time from the first
+    total = boneWeights.sum(axis=1)
+    short = (total < 255) & (usable > 0)
+    if short.any():
+        deficit = 255 - total[short]
+        spread = usable[short]
+        columns = np.arange(4)
+        boneWeights[short] += np.where(columns < spread[:, None],
+            deficit[:, None] // spread[:, None] + (columns < (deficit % spread)[:, None]), 0)
+    # and take the excess away the same way, skipping weights stuck at 0
+    currentShiftWeight = np.zeros(len(boneWeights), dtype=np.int64)
+    stuckBones = np.zeros(boneWeights.shape, dtype=bool)
+    active = (boneWeights.sum(axis=1) > 255) & (usable > 0)
+    while active.any():
+        rows = np.flatnonzero(active)
+        columns = currentShiftWeight[rows]
+        boneWeights[rows, columns] -= 1
+        stuck = boneWeights[rows, columns] < 0
+        boneWeights[rows[stuck], columns[stuck]] = 0
+        stuckBones[rows[stuck], columns[stuck]] = True
+        currentShiftWeight[rows] = (columns + 1) % usable[rows]
+        active[rows] = (boneWeights[rows].sum(axis=1) > 255) & (stuckBones[rows].sum(axis=1) < usable[rows]) # ok what the fuck, but just avoid the infinite loop
+
+    # If EVEN the FORCED normalization doesn't work, say something :/
+    for row in np.flatnonzero(boneWeights.sum(axis=1) != 255).tolist():
+        print(vertexCount + row, "- Vertex Weights Error: Vertex has a total weight not equal to 1.0. Try using Blender's [Weights -> Normalize All] function.")
+    return boneIndexes, boneWeights
+
+# encoded vertex blocks of the last export, by object name. An object whose
+# export hash (and bone set) hasn't changed since gets its block back as is.
+_vertexBlockCache: Dict[str, tuple] = {}
+
+def clearVertexBlockCache():
+    _vertexBlockCache.clear()
+
+def get_boneSetKey(boneSetLookup, boneSetIndex):
+    if boneSetLookup is None or boneSetIndex is None or len(boneSetLookup.boneSets) == 0:
+        return None
+    return tuple(boneSetLookup.boneSets[boneSetIndex])
+
+def boneSetStillFits(cachedBoneSet, boneSet):
+    """
+    Cached local bone indices stay valid while the set still starts with the
+    bones it had back then, later objects only ever append to it.
+    """
+    if cachedBoneSet is None or boneSet is None:
+        return cachedBoneSet == boneSet
+    return boneSet[:len(cachedBoneSet)] == cachedBoneSet
+
+def prepare_exportLayers(obj, vertexFormat, exDtype):
+    """Everything get_objectVertexData would otherwise add to the object halfway through."""
+    mesh = obj.data
+    if 'boneSetIndex' not in obj:
+        obj["boneSetIndex"] = -1
+
+    # Whats up guys its gaming with portals, and for my next trick I add named UVs
+
+    # Backwards Compatibility Better Than Playstation
+    if "Float2" in mesh.uv_layers:
+        mesh.uv_layers["Float2"].name = "UVMap1"
+
+    if vertexFormat >= 0x337 and len(mesh.vertex_colors) == 0:
+        print("Object had no vertex colour layer when one was expected - creating one.")
+        mesh.vertex_colors.new()
+
+    if exDtype is not None and "texture2" in exDtype.names and len(mesh.uv_layers) < 2:
+        print(" - UV Maps Error: Not enough UV Map layers! (Tried accessing UV layer number", 2, "of object", obj.name, "but it does not exist. Adding one!")
+        mesh.uv_layers.new()
+
+def get_objectVertexData(obj, dtype, exDtype, vertexFormat, vertexCount, collectionName, boneSetLookup):
+    """
+    One object's used vertexes packed as dtype (and exDtype), plus the bone
+    of its first vertex's first group for formats without bone indices.
+    """
+    mesh = obj.data
+    mesh.calc_tangents()
+    loopCount = len(mesh.loops)
+    # one vertex per used vertex index, its data taken from the first loop using it
+    loopVertices = np.empty(loopCount, dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+    usedVertices, firstLoops = np.unique(loopVertices, return_index=True)
+    
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    normals = np.empty(loopCount * 3, dtype=np.float32)
+    mesh.loops.foreach_get("normal", normals)
+    tangents = np.empty(loopCount * 3, dtype=np.float32)
+    mesh.loops.foreach_get("tangent", tangents)
+    bitangentSigns = np.empty(loopCount, dtype=np.float32)
+    mesh.loops.foreach_get("bitangent_sign", bitangentSigns)
+
+    vertexData = np.zeros(len(usedVertices), dtype=dtype)
+    vertexData["position"] = positions.reshape(-1, 3)[usedVertices]
+    # Tangents
+    tangents = tangents.reshape(-1, 3)[firstLoops] * np.float32(127)
+    vertexData["tangent"][:, :3] = np.clip(np.trunc(tangents.astype(np.float64) + 127.0), 0, 255)
+    vertexData["tangent"][:, 3] = np.where(bitangentSigns[firstLoops] == -1, 0xff, 0)
+    # Normal
+    vertexData["normal"] = pack_normals(normals.reshape(-1, 3)[firstLoops])
+
+    # UVs
+    vertexData["texture"] = get_loop_uvs(obj, "UVMap1", loopCount)[firstLoops]
+    if "texture2" in dtype.names:
+        vertexData["texture2"] = get_loop_uvs(obj, "LightMap", loopCount)[firstLoops]
+
+    # Bones
+    firstBoneIndex = None
+    if vertexFormat & 0x30 == 0x30:
+        boneIndexes, boneWeights = get_vertex_bones(obj, usedVertices, vertexCount, collectionName, boneSetLookup)
+        vertexData["boneIndices"] = boneIndexes
+        vertexData["boneWeights"] = boneWeights
+    elif len(usedVertices) > 0:
+        for groupRef in mesh.vertices[int(usedVertices[0])].groups:
+            firstBoneIndex = getBoneIndexByName(collectionName, obj.vertex_groups[groupRef.group].name)
+            break
+
+    loopColors = None
+    if vertexFormat >= 0x337:
+        loopColors = np.empty(loopCount * 4, dtype=np.float32)
+        mesh.vertex_colors.active.data.foreach_get("color", loopColors)
+        loopColors = np.trunc(loopColors.reshape(-1, 4)[firstLoops].astype(np.float64) * 255)
+        if "color" in dtype.names:
+            vertexData["color"] = loopColors
+    
+    ##################################################
+    ###### Now lets do the extra data shit ###########
+    ##################################################
+    vertexExData = None
+    if exDtype is not None:
+        vertexExData = np.zeros(len(usedVertices), dtype=exDtype)
+        vertexExData["color"] = loopColors
+        if "texture2" in exDtype.names:
+            vertexExData["texture2"] = get_loop_uvs(obj, mesh.uv_layers[1].name, loopCount)[firstLoops]
+    
+    return vertexData, vertexExData, firstBoneIndex
+
 class c_vertexGroup(object):
-    def __init__(self, vertexGroupIndex, vertexesStart, collectionName='WMB'):
+    def __init__(self, vertexGroupIndex, vertexesStart, collectionName='WMB', boneSetLookup=None):
         self.vertexGroupIndex = vertexGroupIndex
         self.vertexGroupStart = vertexesStart
+        self.boneSetLookup = boneSetLookup
+        self.exportHashes = {} # object name -> getObjectExportHash, see wmb_exporter.main
 
         def get_blenderObjects(self):
             objs = {}
@@ -1169,7 +1430,6 @@ class c_vertexGroup(object):
                 if int(obj_name[0]) == vertexGroupIndex:
                     if len(obj.data.uv_layers) == 0:
                         obj.data.uv_layers.new()
-                    obj.data.calc_tangents()
                     #if len(obj_name) == 2:
                     #    objs[0] = obj # didn't put a number on the first one
                     #else:
@@ -1197,38 +1457,6 @@ class c_vertexGroup(object):
                 numIndexes += len(obj.data.polygons)
             return numIndexes * 3
         
-        def get_blenderVertices(self):
-            blenderVertices = []
-            blenderObjects = self.blenderObjects
-
-            for obj in blenderObjects:
-                blenderVertices.append([obj.data.vertices, obj])
-            return blenderVertices
-            
-        blenderVertices = get_blenderVertices(self)
-
-        def get_blenderLoops(self, objOwner):
-            blenderLoops = []
-            blenderLoops += objOwner.data.loops
-
-            return blenderLoops
-
-        def get_blenderUVCoords(self, objOwner, loopIndex, uvSlot):
-            if uvSlot > len(objOwner.data.uv_layers)-1:
-                print(" - UV Maps Error: Not enough UV Map layers! (Tried accessing UV layer number", uvSlot + 1, "of object", objOwner.name, "but it does not exist. Adding one!")
-                objOwner.data.uv_layers.new()
-            uv_coords = objOwner.data.uv_layers[uvSlot].data[loopIndex].uv
-            return [uv_coords.x, 1-uv_coords.y]
-        
-        def get_blenderUVCoordsEx(self, objOwner, loopIndex, uvName):
-            uv_layers = objOwner.data.uv_layers
-
-            if uvName not in uv_layers:
-                return None
-
-            uv_coords = uv_layers[uvName].data[loopIndex].uv
-            return [uv_coords.x, 1 - uv_coords.y]
-
         # Has bones = TODO: new listing for these
         
         #print(len(self.blenderObjects[0].data.uv_layers))
@@ -1254,270 +1482,78 @@ class c_vertexGroup(object):
 
         self.boneMap = None
 
-        def get_boneSet(self, boneSetIndex):
-            boneSet = []
-            if boneSetIndex == -1:
-                return boneSet
-            for obj in bpy.data.collections[collectionName].all_objects:
-                if obj.type == 'ARMATURE':
-                    boneSetArrayRef = obj.data["boneSetArray"][boneSetIndex]
-                    #print(boneSetArrayRef)
-                    #print(obj.data["boneSetArray"])
-                    for val in boneSetArrayRef:
-                        boneSet.append(val)
-                    #print(boneSet)
-                    return boneSet
-
         def get_vertexesData(self):
+            # whole buffers at once: foreach_get everything, pack with array ops
+            dtype = wmb4_vertex.dtype(vertexFormat)
+            if dtype is None:
+                print("Unknown vertexFormat %s, only writing position, UV, normal and tangent" % hex(vertexFormat))
+                dtype = wmb4_vertex.dtype00107
+            exDtype = None
+            if vertexFormat in {0x10337, 0x00337}:
+                exDtype = wmb4_vertexExData.dtype337
+            elif vertexFormat == 0x10137:
+                exDtype = wmb4_vertexExData.dtype10137
+
             vertexes = []
             vertexesExData = []
-            # used for child constraints, define here to optimize
-            possibleArmatures = [x for x in allObjectsInCollectionInOrder(collectionName) if x.type == "ARMATURE"]
-            amt = possibleArmatures[0] if len(possibleArmatures) > 0 else None
-            for bvertex_obj in blenderVertices:
-                bvertex_obj_obj = bvertex_obj[1]
-                print('   [>] Generating vertex data for object', bvertex_obj_obj.name)
-                loops = get_blenderLoops(self, bvertex_obj_obj)
-                sorted_loops = sorted(loops, key=lambda loop: loop.vertex_index)
-                
-                if 'boneSetIndex' in bvertex_obj_obj:
-                    boneSet = get_boneSet(self, bvertex_obj_obj["boneSetIndex"])
+            vertexCount = 0 # for the error messages
+            boneSetLookup = self.boneSetLookup
+            hasBones = vertexFormat & 0x30 == 0x30
+            ownBoneSetLookup = boneSetLookup is None and hasBones
+            if ownBoneSetLookup: # not shared by c_generate_data, write ours back when done
+                boneSetLookup = c_boneSetLookup(collectionName)
+            armature = getArmatureInCollection(collectionName)
+            armatureKey = tuple(getBoneIndexMap(armature)) if armature is not None else None
+            self.referenceBoneIndex = -1
+            for obj in self.blenderObjects:
+                prepare_exportLayers(obj, vertexFormat, exDtype)
+                objHash = getObjectExportHash(obj)
+                self.exportHashes[obj.name] = objHash
+                boneSetIndex = obj["boneSetIndex"] if hasBones else None
+
+                cacheKey = (objHash, vertexFormat, armatureKey, getExportSnapshotOptions())
+                cached = _vertexBlockCache.get(obj.name)
+                if cached is not None and cached[0] == cacheKey and boneSetStillFits(cached[1], get_boneSetKey(boneSetLookup, boneSetIndex)):
+                    print('   [>] Reusing vertex data of unchanged object', obj.name)
+                    vertexData, vertexExData, firstBoneIndex = cached[2:]
                 else:
-                    bvertex_obj_obj["boneSetIndex"] = -1
-                    boneSet = get_boneSet(self, -1)
-
-                
-                previousIndex = -1
-                
-                missingBones = set()
-                
-                for loop in sorted_loops:
-                    if loop.vertex_index == previousIndex:
-                        continue
-
-                    previousIndex = loop.vertex_index
-            
-                    bvertex = bvertex_obj[0][loop.vertex_index]
-                    # XYZ Position
-                    position = [bvertex.co.x, bvertex.co.y, bvertex.co.z]
-
-                    # Tangents
-                    loopTangent = loop.tangent * 127
-                    tx = int(loopTangent[0] + 127.0)
-                    ty = int(loopTangent[1] + 127.0)
-                    tz = int(loopTangent[2] + 127.0)
-                    sign = 0xff if loop.bitangent_sign == -1 else 0
-
-                    tangents = [tx, ty, tz, sign]
-
-                    # Normal
-                    normal = [loop.normal[0], loop.normal[1], loop.normal[2], 0]
-                    #print(normal)
-                    # what the fuck is this, 11 bit values?
-                    """
-                    if (normal[0] < 0):
-                        normal[0] = -(0x400-normal[0])
-                        normal[0] ^= 0x400
-                    if (normal[1] < 0):
-                        normal[1] = -(0x400-normal[1])
-                        normal[1] ^= 0x400
-                    if (normal[2] < 0):
-                        normal[2] = -(0x200-normal[2])
-                        normal[2] ^= 0x200
-                    true_normal = normal[0] # bits 0-11
-                    true_normal |= normal[1]<<11
-                    true_normal |= normal[2]<<22
-                    normal = true_normal
-                    """
-                    # help me chatgpt, you're my only hope
-                    nx = int(round(normal[0] * float((1<<10)-1)))
-                    ny = int(round(normal[1] * float((1<<10)-1)))
-                    nz = int(round(normal[2] * float((1<<9 )-1)))
-                    if nx < 0:
-                        nx += (1 << 10)
-                        nx ^= 1 << 10
-                    if ny < 0:
-                        ny += (1 << 10)
-                        ny ^= 1 << 10
-                    if nz < 0:
-                        nz += (1 << 9)
-                        nz ^= 1 << 9
-                    normal = nx | (ny << 11) | (nz << 22)
-                        
-
-                    # Whats up guys its gaming with portals, and for my next trick I add named UVs
-
-                    # Backwards Compatibility Better Than Playstation
-                    if "Float2" in bvertex_obj_obj.data.uv_layers:
-                        bvertex_obj_obj.data.uv_layers["Float2"].name = "UVMap1"
-
-                    # UVs
-                    uv_maps = []
-                    uv1 = get_blenderUVCoordsEx(self, bvertex_obj_obj, loop.index, "UVMap1")
-                    uv_maps.append(uv1)
-                    
-                    if vertexFormat == 0x10307:
-                        uv2 = get_blenderUVCoordsEx(self, bvertex_obj_obj, loop.index, "LightMap")
-                        uv_maps.append(uv2)
-
-                    # Bones
-                    boneIndexes = []
-                    boneWeights = []
-                    if vertexFormat & 0x30 == 0x30:
-                        # Bone Indices
-                        for groupRef in bvertex.groups:
-                            if len(boneIndexes) >= 4:
-                                break
-                            boneGroupName = bvertex_obj_obj.vertex_groups[groupRef.group].name
-                            boneID = getBoneIndexByName(collectionName, boneGroupName)
-                            if boneID is None: # nonexistent group epic fail
-                                missingBones.add(boneGroupName)
-                                continue
-                            if boneID in boneSet:
-                                boneSetIndx = boneSet.index(boneID)
-                            else: # bone not in set? well fuck that
-                                for obj in bpy.data.collections[collectionName].all_objects:
-                                    if obj.type != 'ARMATURE':
-                                        continue
-                                    allbonesets = list(obj.data["boneSetArray"])
-                                    boneSet = list(allbonesets[bvertex_obj_obj["boneSetIndex"]])
-                                    if boneID not in boneSet:
-                                        boneSet.append(boneID)
-                                    allbonesets[bvertex_obj_obj["boneSetIndex"]] = boneSet
-                                    obj.data["boneSetArray"] = allbonesets
-                                    boneSetIndx = boneSet.index(boneID) # i swear to god # !!!
-                                    break
-                            
-                            if boneSetIndx < 0 or boneSetIndx > 255:
-                                print("Hmm, boneID of", boneSetIndx, "could be a problem...")
-                                print(boneSet)
-                            
-                            boneIndexes.append(boneSetIndx)
-                        
-                        if len(boneIndexes) == 0:
-                            print(len(vertexes) ,"- Vertex Weights Error: Vertex has no assigned groups. At least 1 required. Try using Blender's [Select -> Select All By Trait > Ungrouped Verts] function to find them.")
-
-                        while len(boneIndexes) < 4:
-                            boneIndexes.append(0)
-                        
-                        # Bone Weights
-                        weights = [group.weight for group in bvertex.groups]
-
-                        if len(weights) >  4:
-                            print(len(vertexes), "- Vertex Weights Error: Vertex has weights assigned to more than 4 groups. Try using Blender's [Weights -> Limit Total] function.")
-                            weights = weights[:4]
-                        
-                        if any([x < 0 for x in weights]):
-                            print(len(vertexes), "- Vertex Weights Error: Vertex has negative bone weights.")
-                            weights = [x if x > 0 else 0 for x in weights]
-                        
-                        weightsSum = sum(weights)
-
-                        normalized_weights = []                                             # Force normalize the weights as Blender's normalization sometimes get some rounding issues.
-                        for val in weights:
-                            if val > 0:
-                                normalized_weights.append(float(val)/weightsSum)
-                            else:
-                                normalized_weights.append(0)
-
-                        for val in normalized_weights:
-                            if len(boneWeights) >= 4:
-                                break
-                            weight = math.floor(val * 256.0)
-                            if weight > 255:
-                                weight = 255
-                            boneWeights.append(weight)
-                        
-                        usableBoneWeightCount = len(boneWeights)
-                        if usableBoneWeightCount == 0:
-                            boneWeights.append(255)
-                        
-                        while len(boneWeights) < 4:
-                            boneWeights.append(0)
-                        
-                        currentShiftWeight = 0
-                        stuckBones = set()
-
-                        while sum(boneWeights) < 255:                     # MOAR checks to make sure weights are normalized but in bytes. (A bit cheating but these values should make such a minor impact.)
-                            boneWeights[currentShiftWeight] += 1
-                            if boneWeights[currentShiftWeight] > 255:
-                                boneWeights[currentShiftWeight] = 255
-                                stuckBones.add(currentShiftWeight)
-                                if len(stuckBones) == usableBoneWeightCount: # ok what the fuck, but just avoid the infinite loop
-                                    break
-                            currentShiftWeight = (currentShiftWeight + 1) % usableBoneWeightCount # minimize impact on one particular weight with this stuff
-
-                        stuckBones = set()
-                        
-                        while sum(boneWeights) > 255:                     
-                            boneWeights[currentShiftWeight] -= 1
-                            if boneWeights[currentShiftWeight] < 0:
-                                boneWeights[currentShiftWeight] = 0
-                                stuckBones.add(currentShiftWeight)
-                                if len(stuckBones) == usableBoneWeightCount: # ok what the fuck, but just avoid the infinite loop
-                                    break
-                            currentShiftWeight = (currentShiftWeight + 1) % usableBoneWeightCount # minimize impact on one particular weight with this stuff
-
-                        if sum(boneWeights) != 255:                       # If EVEN the FORCED normalization doesn't work, say something :/
-                            print(len(vertexes), "- Vertex Weights Error: Vertex has a total weight not equal to 1.0. Try using Blender's [Weights -> Normalize All] function.")
-                        if not all([0 <= x < 256 for x in boneWeights]):
-                            print(len(vertexes), "- Vertex Weights Error: Vertex weight is outside the standard byte range, absolutely giving up now, enjoy your writing error")
-                    else:
-                        for groupRef in bvertex.groups:
-                            boneGroupName = bvertex_obj_obj.vertex_groups[groupRef.group].name
-                            boneIndexes.append(getBoneIndexByName(collectionName, boneGroupName))
-                            break
-
-                    color = []
-                    if vertexFormat >= 0x337:
-                        if len (bvertex_obj_obj.data.vertex_colors) == 0:
-                            print("Object had no vertex colour layer when one was expected - creating one.")
-                            new_vertex_colors = bvertex_obj_obj.data.vertex_colors.new()
-                        loop_color = bvertex_obj_obj.data.vertex_colors.active.data[loop.index].color
-                        color = [int(loop_color[0]*255), int(loop_color[1]*255), int(loop_color[2]*255), int(loop_color[3]*255)]
-
-                    vertexes.append([position, tangents, normal, uv_maps, boneIndexes, boneWeights, color])
-                    
-                    ##################################################
-                    ###### Now lets do the extra data shit ###########
-                    ##################################################
-                    normal = []
-                    uv_maps = []
-                    color = []
-                    if vertexFormat in {0x10337, 0x10137, 0x00337}:
-                        if vertexFormat != 0x10137:
-                            uv2 = get_blenderUVCoords(self, bvertex_obj_obj, loop.index, 1)
-                            uv_maps.append(uv2)
-                        loop_color = bvertex_obj_obj.data.vertex_colors.active.data[loop.index].color
-                        color = [int(loop_color[0]*255), int(loop_color[1]*255), int(loop_color[2]*255), int(loop_color[3]*255)]
-                    
-                    vertexExData = [normal, uv_maps, color]
+                    print('   [>] Generating vertex data for object', obj.name)
+                    vertexData, vertexExData, firstBoneIndex = get_objectVertexData(obj, dtype, exDtype, vertexFormat, vertexCount, collectionName, boneSetLookup)
+                    # bones appended to the set while generating are in it from now on
+                    _vertexBlockCache[obj.name] = (cacheKey, get_boneSetKey(boneSetLookup, boneSetIndex), vertexData, vertexExData, firstBoneIndex)
+
+                if vertexCount == 0 and firstBoneIndex is not None: # header wants the first vertex's bone
+                    self.referenceBoneIndex = firstBoneIndex
+                vertexes.append(vertexData)
+                if exDtype is not None:
                     vertexesExData.append(vertexExData)
-                
-                if len(missingBones) > 0:
-                    print("The following bones were not found on the armature: %s" % ', '.join(list(missingBones)))
-            #print(hex(len(vertexes)))
+                vertexCount += len(vertexData)
+            #print(hex(vertexCount))
+            if ownBoneSetLookup:
+                boneSetLookup.store()
             
-            return vertexes, vertexesExData
+            vertexes = np.concatenate(vertexes) if vertexes else np.zeros(0, dtype=dtype)
+            if exDtype is None:
+                return vertexes, None
+            return vertexes, np.concatenate(vertexesExData) if vertexesExData else np.zeros(0, dtype=exDtype)
 
         def get_indexes(self):
-            indexesOffset = 0
             indexes = []
             for obj in self.blenderObjects:
-                for loop in obj.data.loops:
-                    indexes.append(loop.vertex_index + indexesOffset)
+                loopVertices = np.empty(len(obj.data.loops), dtype=np.int64)
+                obj.data.loops.foreach_get("vertex_index", loopVertices)
+                indexes.append(loopVertices)
+            indexes = np.concatenate(indexes) if indexes else np.zeros(0, dtype=np.int64)
 
             # Reverse this loop order
-            flip_counter = 0
-            for i, index in enumerate(indexes):
-                if flip_counter == 2:
-                    # 2, 1, 0 -> 0, 1, 2
-                    indexes[i], indexes[i-2] = indexes[i-2], index
-                    flip_counter = 0
-                    continue
-                flip_counter += 1
+            # 2, 1, 0 -> 0, 1, 2
+            triangleCount = len(indexes) // 3
+            indexes[:triangleCount * 3] = indexes[:triangleCount * 3].reshape(-1, 3)[:, ::-1].ravel()
             
-            return indexes
+            # WMB4 index buffers are always 16 bit, there's no flag for anything wider
+            if len(indexes) > 0 and indexes.max() > 0xffff:
+                raise ValueError("Vertex group %d uses vertex index %d, but WMB index buffers only go up to %d. Split the mesh." % (vertexGroupIndex, indexes.max(), 0xffff))
+            return indexes.astype("<u2")
 
         self.vertexSize = 32
 
@@ -1546,7 +1582,7 @@ class c_vertexGroup(object):
         self.vertexGroupSize = (self.indexBufferOffset - self.vertexOffset) + (self.numIndexes * 2)
 
 class c_vertexGroups(object):
-    def __init__(self, offsetVertexGroups, collectionName='WMB'):
+    def __init__(self, offsetVertexGroups, collectionName='WMB', boneSetLookup=None):
         self.offsetVertexGroups = offsetVertexGroups
         
         # Alright, before we do anything, let's fix the mess that is object IDs
@@ -1650,7 +1686,7 @@ class c_vertexGroups(object):
             vertexGroups = []
             for index in vertexGroupIndex:
                 print('[+] Creating Vertex Group', index)
-                vertexGroups.append(c_vertexGroup(index, vertexesOffset, collectionName))
+                vertexGroups.append(c_vertexGroup(index, vertexesOffset, collectionName, boneSetLookup))
                 vertexesOffset += vertexGroups[index].vertexGroupSize
                 padAmount = 0
                 if vertexesOffset % 16 > 0:
@@ -1666,6 +1702,12 @@ class c_vertexGroups(object):
             return vertexGroups
 
         self.vertexGroups = get_vertexGroups(self, self.offsetVertexGroups)
+        self.exportHashes = {}
+        for vertexGroup in self.vertexGroups:
+            self.exportHashes.update(vertexGroup.exportHashes)
+        # only keep the blocks of what was exported now, not every mesh this session ever saw
+        for name in [x for x in _vertexBlockCache if x not in self.exportHashes]:
+            del _vertexBlockCache[name]
 
         def get_vertexGroupsSize(self, vertexGroups):
             vertexGroupsSize = len(vertexGroups) * 28
@@ -1697,10 +1739,14 @@ class c_generate_data(object):
             collectionName = bpy.data.collections['WMB'].children[0].name
             print("\n\n===== Exporting collection %s, please remove other collections to ensure stable export =====\n\n" % collectionName)
 
+        # bone name lookups (every vertex group of every mesh) go through one map per export
+        clearBoneIndexCache()
+        clearBoundingBoxCache()
         for obj in bpy.data.collections[collectionName].all_objects:
             if obj.type == 'ARMATURE':
                 print('Armature found, exporting bones structures.')
                 hasArmature = True
+                getBoneIndexMap(obj)
                 break
 
         if 'colTreeNodes' in bpy.context.scene:
@@ -1711,7 +1757,12 @@ class c_generate_data(object):
 
         # Generate custom boneSets from Blender vertex groups
         if hasArmature:
-            self.b_boneSets = c_b_boneSets(collectionName)
+            with timed(["export", "boneSets"]):
+                self.b_boneSets = c_b_boneSets(collectionName)
+                # read once, shared by every vertex group
+                self.boneSetLookup = c_boneSetLookup(collectionName)
+        else:
+            self.boneSetLookup = None
 
         currentOffset = 0
 
@@ -1802,7 +1853,10 @@ class c_generate_data(object):
             # YOU GET NO DOWN PAYMENT
 
         self.vertexGroups_Offset = currentOffset
-        self.vertexGroups = c_vertexGroups(self.vertexGroups_Offset, collectionName)
+        with timed(["export", "vertexGroups"]):
+            self.vertexGroups = c_vertexGroups(self.vertexGroups_Offset, collectionName, self.boneSetLookup)
+        if self.boneSetLookup is not None:
+            self.boneSetLookup.store() # before c_boneSet reads them
         self.vertexGroupsCount = len(self.vertexGroups.vertexGroups)
         self.vertexGroups_Size = self.vertexGroups.vertexGroups_StructSize
         currentOffset += self.vertexGroups_Size
@@ -1811,7 +1865,8 @@ class c_generate_data(object):
         #currentOffset += 16 - (currentOffset % 16)
         
         self.batches_Offset = currentOffset
-        self.batches = c_batches(self.vertexGroupsCount, collectionName)
+        with timed(["export", "batches"]):
+            self.batches = c_batches(self.vertexGroupsCount, collectionName)
         self.batches_Size = self.batches.batches_StructSize
         currentOffset += self.batches_Size
         print('batches_Size: ', self.batches_Size)
@@ -1819,7 +1874,8 @@ class c_generate_data(object):
         #currentOffset += 16 - (currentOffset % 16)
         
         self.batchDescPointer = currentOffset
-        self.batchDescriptions = c_batch_supplements(currentOffset, collectionName)
+        with timed(["export", "batches"]):
+            self.batchDescriptions = c_batch_supplements(currentOffset, collectionName)
         self.batchDescSize = self.batchDescriptions.supplementStructSize
         currentOffset += self.batchDescSize
         print('batchDescSize: ', self.batchDescSize)
@@ -1827,10 +1883,12 @@ class c_generate_data(object):
         #currentOffset += 16 - (currentOffset % 16)
         
         if hasArmature:
-            self.boneIndexTranslateTable = c_boneIndexTranslateTable(collectionName)
+            with timed(["export", "bones"]):
+                self.boneIndexTranslateTable = c_boneIndexTranslateTable(collectionName)
         
             self.bones_Offset = currentOffset
-            self.bones = c_bones(collectionName)
+            with timed(["export", "bones"]):
+                self.bones = c_bones(collectionName)
             self.numBones = len(self.bones.bones)
             self.bones_Size = self.bones.bones_StructSize
             currentOffset += self.bones_Size
@@ -1867,7 +1925,8 @@ class c_generate_data(object):
 
         if hasArmature:
             self.boneSets_Offset = currentOffset
-            self.boneSet = c_boneSet(self.boneMap, self.boneSets_Offset, collectionName)
+            with timed(["export", "boneSets"]):
+                self.boneSet = c_boneSet(self.boneMap, self.boneSets_Offset, collectionName)
             self.boneSet_Size = self.boneSet.boneSet_StructSize
             currentOffset += self.boneSet_Size
             print('boneSet_Size: ', self.boneSet_Size)
@@ -1878,7 +1937,8 @@ class c_generate_data(object):
             self.boneSets_Offset = 0
 
         self.materials_Offset = currentOffset
-        self.materials = c_materials(self.materials_Offset, True, collectionName)
+        with timed(["export", "materials"]):
+            self.materials = c_materials(self.materials_Offset, True, collectionName)
         self.materials_Size = self.materials.materials_StructSize
         currentOffset += self.materials_Size
         print('materials_Size: ', self.materials_Size)
@@ -1896,7 +1956,8 @@ class c_generate_data(object):
             currentOffset += 16 - (currentOffset % 16)
         
         self.meshes_Offset = currentOffset
-        self.meshes = c_meshes(self.meshes_Offset, collectionName, self.batchDescriptions)
+        with timed(["export", "meshes"]):
+            self.meshes = c_meshes(self.meshes_Offset, collectionName, self.batchDescriptions)
         self.meshes_Size = self.meshes.meshes_StructSize
         currentOffset += self.meshes_Size
         print('meshes_Size: ', self.meshes_Size)
@@ -1907,8 +1968,12 @@ class c_generate_data(object):
         
         if "mystery" in bpy.data.collections['WMB'] and bpy.data.collections['WMB']["mystery"]:
             self.mystery_Offset = currentOffset #0xf32a2 for Sundowner testing
-            self.mystery = c_mystery(self.mystery_Offset)
+            with timed(["export", "sliceData"]):
+                self.mystery = c_mystery(self.mystery_Offset)
             currentOffset += self.mystery.mystery_StructSize
         else:
             self.mystery_Offset = 0
             self.mystery = None
+        
+        # end of the layout, what the written file should come out to
+        self.fileSize = currentOffset
@@ -4,6 +4,7 @@ import bpy
 from bpy.props import StringProperty
 from bpy_extras.io_utils import ExportHelper
 from ...utils.utilOperators import RipMeshByUVIslands
+from ...utils.util import getDirtyExportObjects, getObjectExportHashes
 
 class ExportMGRRWmb(bpy.types.Operator, ExportHelper):
     '''Export WMB Data.'''
@@ -20,6 +21,8 @@ class ExportMGRRWmb(bpy.types.Operator, ExportHelper):
     rip_mesh_by_uv_islands: bpy.props.BoolProperty(name="Rip Mesh By UV Islands", description="Splits the mesh by 'island' UVs, which can fix texture issues (Recommended)", default=True)
     regenerate_slice_data: bpy.props.BoolProperty(name="Re-generate Slice Data", description="This attempts to modify the slice data (documented in custom properties of the WMB collection) to work with model modifications. Disable for minor texture edits that you wish to preserve the original data.", default=True)
     use_cut_info: bpy.props.BoolProperty(name="Export CutInfo.bxm", description="If Slice Data is exported, this also edits the ClsInfoList within the adjacent CutInfo.bxm file (if possible).", default=True)
+    only_changed_meshes: bpy.props.BoolProperty(name="Only Clean Up Changed Meshes", description="Skip vertex group cleanup for meshes that haven't changed since the last export", default=True)
+    dry_run: bpy.props.BoolProperty(name="Dry Run", description="Generate everything and print chunk sizes and stage timings to the console, without saving a file or deleting unused vertex groups", default=False)
     
     def execute(self, context):
         from . import wmb_exporter
@@ -30,35 +33,35 @@ class ExportMGRRWmb(bpy.types.Operator, ExportHelper):
         
         print("\n==== BEGIN WMB4 EXPORT ====")
         
+        # centring, triangulating and loose geometry happen on export copies, see exportSnapshot
+        cleanMeshes = set()
+        objectHashes = None # hashed once here, handed on to the export
+        if self.only_changed_meshes:
+            objectHashes = getObjectExportHashes(subCollection.collection.name)
+            dirtyMeshes = {x.name for x in getDirtyExportObjects(subCollection.collection.name, objectHashes)}
+            cleanMeshes = set(objectHashes) - dirtyMeshes
+            print("%d of %d meshes unchanged since the last export" % (len(cleanMeshes), len(objectHashes)))
         
         if self.rip_mesh_by_uv_islands:
             print("Ripping islands...")
             # TODO Add
         
-        if self.centre_origins:
-            print("Centering origins...")
-            wmb_exporter.centre_origins("WMB")
-
         """
         if self.purge_materials:
             print("Purging materials...")
             wmb_exporter.purge_unused_materials()
         """
 
-        if self.triangulate_meshes:
-            print("Triangulating meshes...")
-            wmb_exporter.triangulate_meshes("WMB")
-
-        if self.delete_loose_geometry:
-            print("Deleting loose geometry...")
-            bpy.ops.b2n.deleteloosegeometryall()
-
-        if self.delete_unused_vertexgroups:
+        if self.delete_unused_vertexgroups and self.dry_run:
+            print("Dry run, leaving the vertex groups alone.")
+        elif self.delete_unused_vertexgroups:
             print("Deleting unused vertex groups...")
-            for mesh in [x for x in subCollection.collection.all_objects if x.type == "MESH"]:
+            for mesh in [x for x in subCollection.collection.all_objects if x.type == "MESH" and x.name not in cleanMeshes]:
                 bpy.context.view_layer.objects.active = mesh
                 bpy.ops.b2n.removeunusedvertexgroups()
             subCollection.collection.all_objects[0].select_set(True)
+            if objectHashes is not None: # the cleaned up ones changed, the export hashes those again
+                objectHashes = {name: objHash for name, objHash in objectHashes.items() if name in cleanMeshes}
 
         for mesh in [x for x in subCollection.collection.all_objects if x.type == "MESH"]: # Check for vertex group exceeding 50
             if len(mesh.vertex_groups) > 50:
@@ -66,7 +69,12 @@ class ExportMGRRWmb(bpy.types.Operator, ExportHelper):
 
         try:
             print("Starting export...")
-            wmb_exporter.main(self.filepath, True, BALLIN=self.regenerate_slice_data, useCutInfo=self.use_cut_info)
+            snapshotOptions = dict(triangulate=self.triangulate_meshes, centreOrigins=self.centre_origins, deleteLoose=self.delete_loose_geometry, objectHashes=objectHashes)
+            if self.dry_run:
+                report = wmb_exporter.main(self.filepath, True, BALLIN=self.regenerate_slice_data, useCutInfo=self.use_cut_info, dryRun=True, **snapshotOptions)
+                self.report({'INFO'}, f"Dry run: {report['fileSize']} bytes, nothing written.")
+                return {'FINISHED'}
+            wmb_exporter.main(self.filepath, True, BALLIN=self.regenerate_slice_data, useCutInfo=self.use_cut_info, **snapshotOptions)
             return wmb_exporter.restore_blend()
         except:
             print(traceback.format_exc())
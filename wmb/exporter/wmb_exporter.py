@@ -1,8 +1,10 @@
 # basically a wrapper for generate_data.py and write_wmb/__init__.py
-from ...utils.ioUtils import create_wmb, close_wmb
+from ...utils.ioUtils import BinaryWriter
 from .generate_data import c_generate_data
 from ...bxm.common.bxm import bxmToXml, xmlToBxm
 from .write_wmb import *
+from ...utils.util import resetTimings, timed, printTimings, exportSnapshot
+from ...utils import util
 
 import time
 import os
@@ -27,8 +29,7 @@ def prepare_blend():
     for obj in bpy.data.collections['WMB'].all_objects:
         if obj.type not in ['MESH', 'ARMATURE', 'EMPTY']:
             print(obj.type, obj.name)
-            print('[-] Removed ', obj)
-            bpy.data.objects.remove(obj)
+            print('[-] Skipping ', obj) # everything only ever looks at those three types
 
 def restore_blend():
     print('Restoring .blend File:')
@@ -37,19 +38,9 @@ def restore_blend():
     return {'FINISHED'}
 
 
-def main(filepath, wmb4=True, collectionName="WMB", BALLIN=True, useCutInfo=True):
-    start_time = int(time.time())
-    prepare_blend()
-
-    wmb_file = create_wmb(filepath)
-
-    if collectionName == "WMB": # Get sub-collection, one that isn't disabled.
-        wmbLayerCollection = bpy.context.view_layer.layer_collection.children['WMB']
-        subCollection = [x for x in wmbLayerCollection.children if x.is_visible][0]
-        collectionName = subCollection.collection.name
-
-    generated_data = c_generate_data(collectionName, BALLER=BALLIN)
-    print('-=# All Data Generated. Writing WMB... #=-')
+def write_wmb_buffer(generated_data, collectionName="WMB", CutInfo=None) -> BinaryWriter:
+    """Lay every chunk out at its generated offset in memory. Nothing touches the disk here."""
+    wmb_file = BinaryWriter()
     create_wmb_header(wmb_file, generated_data, collectionName)
 
     print('Writing vertexGroups.')
@@ -85,17 +76,118 @@ def main(filepath, wmb4=True, collectionName="WMB", BALLIN=True, useCutInfo=True
     
     if generated_data.mystery is not None:
         print("God help us, writing that absurd slice data chunk.")
+        create_wmb_mystery(wmb_file, generated_data, CutInfo)
+    
+    return wmb_file
+
+def export_report(generated_data, wmb_file: BinaryWriter = None) -> dict:
+    """Chunk layout and counts of a generated WMB, without writing it anywhere."""
+    data = generated_data
+    chunks = [
+        ("header", data.header_Offset, data.header_Size),
+        ("vertexGroups", data.vertexGroups_Offset, data.vertexGroups_Size),
+        ("batches", data.batches_Offset, data.batches_Size),
+        ("batchDescriptions", data.batchDescPointer, data.batchDescSize),
+        ("bones", data.bones_Offset, data.bones_Size),
+        ("boneIndexTranslateTable", data.boneIndexTranslateTable_Offset, data.boneIndexTranslateTable_Size),
+        ("boneSets", data.boneSets_Offset, getattr(data, "boneSet_Size", 0)),
+        ("materials", data.materials_Offset, data.materials_Size),
+        ("textures", data.textures_Offset, data.textures_Size),
+        ("meshes", data.meshes_Offset, data.meshes_Size),
+        ("sliceData", data.mystery_Offset, data.mystery.mystery_StructSize if data.mystery is not None else 0),
+    ]
+    report = {
+        "vertexFormat": hex(data.vertexFormat),
+        "chunks": {name: {"offset": offset, "size": size} for name, offset, size in chunks},
+        "vertexGroups": [
+            {
+                "vertexes": vertexGroup.numVertexes,
+                "indexes": vertexGroup.numIndexes,
+                "vertexBytes": vertexGroup.vertexes.nbytes,
+                "vertexExDataBytes": vertexGroup.vertexesExData.nbytes if vertexGroup.vertexesExData is not None else 0,
+                "indexBytes": vertexGroup.indexes.nbytes,
+            }
+            for vertexGroup in data.vertexGroups.vertexGroups
+        ],
+        "batches": len(data.batches.batches),
+        "meshes": len(data.meshes.meshes),
+        "materials": len(data.materials.materials),
+        "textures": len(data.textures.textures),
+        "bones": data.numBones,
+        "boneSets": [len(boneSet[2]) for boneSet in data.boneSet.boneSet] if hasattr(data, "boneSet") else [],
+        "estimatedFileSize": data.fileSize,
+    }
+    if wmb_file is not None:
+        report["fileSize"] = len(wmb_file)
+    return report
+
+def print_export_report(report: dict):
+    print("WMB export report (vertexFormat %s):" % report["vertexFormat"])
+    for name, chunk in report["chunks"].items():
+        if chunk["size"] > 0:
+            print(" + %-24s %8s %10d bytes" % (name, hex(chunk["offset"]), chunk["size"]))
+    for i, vertexGroup in enumerate(report["vertexGroups"]):
+        print(" + vertexGroup %d: %d vertexes, %d indexes" % (i, vertexGroup["vertexes"], vertexGroup["indexes"]))
+    print(" + %d batches, %d meshes, %d materials, %d textures" % (report["batches"], report["meshes"], report["materials"], report["textures"]))
+    print(" + %d bones in %d boneSets (largest %d)" % (report["bones"], len(report["boneSets"]), max(report["boneSets"], default=0)))
+    print(" + estimated file size:", report["estimatedFileSize"])
+    if "fileSize" in report:
+        print(" + file size:          ", report["fileSize"])
+
+def main(filepath, wmb4=True, collectionName="WMB", BALLIN=True, useCutInfo=True, dryRun=False,
+         triangulate=False, centreOrigins=False, deleteLoose=False, objectHashes=None):
+    """
+    dryRun goes through every stage, writing included, but only in memory, then prints
+    the chunk sizes and stage timings instead of saving. Works headless, e.g.
+    blender -b model.blend --python-expr "import bpy; bpy.ops.export.wmb_data(filepath='x.wmb', dry_run=True)"
+    Returns the report dict on a dry run. It still runs the generation, so the
+    custom props the exporter owns (ID, meshGroupIndex, Materials, boneSetIndex,
+    batchGroup) get written to the objects like on a real export.
+    
+    The meshes are exported from copies (see exportSnapshot), triangulated,
+    origin-centred and cleaned of loose vertexes there if asked to.
+    objectHashes: getObjectExportHashes the caller already has, of meshes it
+    hasn't touched since, so they don't get hashed twice.
+    """
+    start_time = int(time.time())
+    resetTimings()
+    with timed(["prepare_blend"]):
+        prepare_blend()
+
+    if collectionName == "WMB": # Get sub-collection, one that isn't disabled.
+        wmbLayerCollection = bpy.context.view_layer.layer_collection.children['WMB']
+        subCollection = [x for x in wmbLayerCollection.children if x.is_visible][0]
+        collectionName = subCollection.collection.name
+
+    with exportSnapshot(collectionName, triangulate, centreOrigins, deleteLoose, objectHashes):
+        with timed(["export"]):
+            generated_data = c_generate_data(collectionName, BALLER=BALLIN)
+        print('-=# All Data Generated. Writing WMB... #=-')
+        
+        CutInfo = None
         cutinfopath = os.path.join(os.path.dirname(filepath), 'CutInfo.bxm')
-        if os.path.exists(cutinfopath) and useCutInfo:
+        if generated_data.mystery is not None and useCutInfo and not dryRun and os.path.exists(cutinfopath):
             CutInfo = bxmToXml(cutinfopath)
-            create_wmb_mystery(wmb_file, generated_data, CutInfo)
-            print("Exporting CutInfo.bxm")
-            xmlToBxm(CutInfo, cutinfopath)
-        else:
-            create_wmb_mystery(wmb_file, generated_data)
-
-    print('Finished writing. Closing file..')
-    close_wmb(wmb_file, generated_data)
+        
+        with timed(["writing"]):
+            wmb_file = write_wmb_buffer(generated_data, collectionName, CutInfo)
+    
+    if dryRun:
+        report = export_report(generated_data, wmb_file)
+        report["timings"] = util.timings # reset rebinds it, read through the module
+        print_export_report(report)
+        printTimings()
+        return report
+    
+    if CutInfo is not None:
+        print("Exporting CutInfo.bxm")
+        xmlToBxm(CutInfo, cutinfopath)
+
+    print('Finished writing. Saving file:', filepath)
+    with timed(["writing"]):
+        wmb_file.save(filepath) # the one and only disk write
+    # what these meshes looked like, so the next export can tell which ones changed
+    bpy.data.collections[collectionName]["exportHashes"] = generated_data.vertexGroups.exportHashes
 
     end_time = int(time.time())
     export_duration = end_time - start_time
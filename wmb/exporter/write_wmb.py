@@ -1,79 +1,65 @@
 # write data from Python object to .wmb
-from ...utils.ioUtils import write_Int32, write_uInt32, write_Int16, write_xyz, write_float, write_char, write_string, write_uInt16, SmartIO, write_byte, write_float16
+from ...utils.ioUtils import write_Int32, write_uInt32, write_Int16, write_xyz, write_float, write_char, write_string, write_uInt16, SmartIO, write_byte, write_float16, BinaryWriter
 from ...utils.util import *
 from ...bxm.common.bxm import XmlNode
 import os
 from time import time
 import bpy
 
-def create_wmb_batches(wmb_file, data):
-    wmb_file.seek(data.batches_Offset)
+# record layouts, every chunk is packed straight into a BinaryWriter
+batchWrite = SmartIO.makeFormat(SmartIO.uint32 * 5)
+batchDataWrite = SmartIO.makeFormat(SmartIO.uint32, SmartIO.uint32, SmartIO.uint16, SmartIO.int16, SmartIO.uint32)
+pointerCountWrite = SmartIO.makeFormat(SmartIO.uint32 * 2)
+boneWrite = SmartIO.makeFormat(SmartIO.int16 * 4, SmartIO.float * 6)
+materialWrite = SmartIO.makeFormat(SmartIO.uint32 * 4, SmartIO.uint16 * 4)
+meshWrite = SmartIO.makeFormat(SmartIO.uint32, SmartIO.float * 6, SmartIO.uint32 * 10)
+vertexGroupWrite = SmartIO.makeFormat(SmartIO.uint32 * 4, SmartIO.int32 * 3)
 
-    for batch in data.batches.batches:
-        write_uInt32(wmb_file, batch.vertexGroupIndex)                  # vertexGroupIndex
-        write_uInt32(wmb_file, batch.vertexStart)                       # vertexStart
-        write_uInt32(wmb_file, batch.indexStart)                        # indexStart
-        write_uInt32(wmb_file, batch.numVertexes)                       # numVertexes
-        write_uInt32(wmb_file, batch.numIndexes)                        # numIndexes
+def create_wmb_batches(wmb_file: BinaryWriter, data):
+    wmb_file.records(batchWrite, data.batches_Offset, (
+        (batch.vertexGroupIndex, batch.vertexStart, batch.indexStart, batch.numVertexes, batch.numIndexes)
+        for batch in data.batches.batches
+    ))
 
-def create_wmb_batch_supplement(wmb_file, data):
-    wmb_file.seek(data.batchDescPointer)
+def create_wmb_batch_supplement(wmb_file: BinaryWriter, data):
+    batchOffsets = data.batchDescriptions.batchOffsets
+    batchData = data.batchDescriptions.batchData
+    wmb_file.records(pointerCountWrite, data.batchDescPointer, (
+        (0 if offset == -1 else offset, len(batchData[index])) # batch data group pointer, count
+        for index, offset in enumerate(batchOffsets)
+    ))
     
-    for index, offset in enumerate(data.batchDescriptions.batchOffsets):
-        if offset == -1:
-            write_uInt32(wmb_file, 0)
-        else:
-            write_uInt32(wmb_file, offset)   # batch data group pointer
-        
-        write_uInt32(wmb_file, len(data.batchDescriptions.batchData[index])) # batch data group count
-    
-    for index, group in enumerate(data.batchDescriptions.batchData):
+    for index, group in enumerate(batchData):
         if len(group) == 0:
             continue
-        wmb_file.seek(data.batchDescriptions.batchOffsets[index])
-        for batch in group:
-            #print(batch)
-            write_uInt32(wmb_file, batch[0]) # batchIndex
-            write_uInt32(wmb_file, batch[1]) # meshIndex
-            write_uInt16(wmb_file, batch[2]) # materialIndex
-            write_Int16(wmb_file, batch[3]) # boneSetsIndex
-            write_uInt32(wmb_file, 0x100)    # unknown10, hopefully just padding
-            # TODO fuck it wasn't padding, sometimes 0x100 sometimes not
+        # batchIndex, meshIndex, materialIndex, boneSetsIndex, unknown10
+        # TODO fuck unknown10 wasn't padding, sometimes 0x100 sometimes not
+        wmb_file.records(batchDataWrite, batchOffsets[index], (
+            (batch[0], batch[1], batch[2], batch[3], 0x100) for batch in group
+        ))
 
 def create_wmb_boneIndexTranslateTable(wmb_file, data):
     wmb_file.seek(data.boneIndexTranslateTable_Offset)
 
-    for entry in data.boneIndexTranslateTable.firstLevel:    # firstLevel
-        write_Int16(wmb_file, entry)
-
-    for entry in data.boneIndexTranslateTable.secondLevel:   # secondLevel
-        write_Int16(wmb_file, entry)
+    wmb_file.write(data.boneIndexTranslateTable.firstLevel.astype("<i2").tobytes())    # firstLevel
+    wmb_file.write(data.boneIndexTranslateTable.secondLevel.astype("<i2").tobytes())   # secondLevel
+    wmb_file.write(data.boneIndexTranslateTable.thirdLevel.astype("<i2").tobytes())    # thirdLevel
 
-    for entry in data.boneIndexTranslateTable.thirdLevel:    # thirdLevel
-        write_Int16(wmb_file, entry)
-
-def create_wmb_boneSet(wmb_file, data):
-    wmb_file.seek(data.boneSets_Offset)
-
-    for boneSet in data.boneSet.boneSet:
-        write_uInt32(wmb_file, boneSet[0])
-        write_uInt32(wmb_file, boneSet[1])
+def create_wmb_boneSet(wmb_file: BinaryWriter, data):
+    wmb_file.records(pointerCountWrite, data.boneSets_Offset, (
+        (boneSet[0], boneSet[1]) for boneSet in data.boneSet.boneSet
+    ))
     
     for boneSet in data.boneSet.boneSet:
-        wmb_file.seek(boneSet[0])
-        for entry in boneSet[2]:
-            write_byte(wmb_file, entry)
+        wmb_file.write_at(boneSet[0], bytes(boneSet[2]))
 
-def create_wmb_bones(wmb_file, data):
-    wmb_file.seek(data.bones_Offset)
-
-    for index, bone in enumerate(data.bones.bones):               # [ID, parentIndex, localPosition.xyz, localRotation.xyz, localScale.xyz, position.xyz, rotation.xyz, scale.xyz, tPosition.xyz]
-        write_Int16(wmb_file, bone[0])          # ID
-        write_Int16(wmb_file, index)       # wrong order probably fine todo
-        write_Int16(wmb_file, bone[1])   # parentIndex
-        write_Int16(wmb_file, 0)       # rotationOrder or something
-        write_xyz(wmb_file, bone[2])    # localPosition.xyz
-        write_xyz(wmb_file, bone[5])    # position.xyz
+def create_wmb_bones(wmb_file: BinaryWriter, data):
+    # [ID, parentIndex, localPosition.xyz, localRotation.xyz, localScale.xyz, position.xyz, rotation.xyz, scale.xyz, tPosition.xyz]
+    # ID, index (wrong order probably fine todo), parentIndex, rotationOrder or something, localPosition.xyz, position.xyz
+    wmb_file.records(boneWrite, data.bones_Offset, (
+        (bone[0], index, bone[1], 0, *bone[2], *bone[5])
+        for index, bone in enumerate(data.bones.bones)
+    ))
 
 def create_wmb_header(wmb_file, data, collectionName="WMB"):
 
@@ -93,7 +79,7 @@ def create_wmb_header(wmb_file, data, collectionName="WMB"):
     if data.vertexFormat > 0x107: # TODO more precise
         write_Int16(wmb_file, -1)
     else:
-        write_Int16(wmb_file, data.vertexGroups.vertexGroups[0].vertexes[0][4][0]) # bone index
+        write_Int16(wmb_file, data.vertexGroups.vertexGroups[0].referenceBoneIndex) # bone index
     
     boundingBoxXYZ, boundingBoxUVW = getGlobalBoundingBox()
     write_xyz(wmb_file, boundingBoxXYZ) # boundingBox: x y z 
@@ -177,80 +163,54 @@ def create_wmb_header(wmb_file, data, collectionName="WMB"):
     write_uInt32(wmb_file, offsetMystery)
     print(' + offsetMystery:                ', offsetMystery)
 
-def create_wmb_materials(wmb_file, data):
-    wmb_file.seek(data.materials_Offset)
-
-    for material in data.materials.materials:
-        write_uInt32(wmb_file, material.offsetShaderName) # offsetShaderName
-        write_uInt32(wmb_file, material.offsetTextures)
-        write_uInt32(wmb_file, 0) # unknown08. pointer?
-        write_uInt32(wmb_file, material.offsetParameterGroups)
-        write_uInt16(wmb_file, 8) # what even
-        write_uInt16(wmb_file, material.numTextures) # 5 or 4, usually
-        write_uInt16(wmb_file, 0) # mystery value
-        write_uInt16(wmb_file, material.numParameterGroups*4)
+def create_wmb_materials(wmb_file: BinaryWriter, data):
+    # offsetShaderName, offsetTextures, unknown08 (pointer?), offsetParameterGroups,
+    # 8 (what even), numTextures (5 or 4, usually), mystery value, parameter count
+    wmb_file.records(materialWrite, data.materials_Offset, (
+        (material.offsetShaderName, material.offsetTextures, 0, material.offsetParameterGroups,
+         8, material.numTextures, 0, material.numParameterGroups*4)
+        for material in data.materials.materials
+    ))
+    textureIndices = {}
+    for key, value in enumerate(data.textures.textures):
+        textureIndices.setdefault(value[1], key)
     for material in data.materials.materials:
         wmb_file.seek(material.offsetShaderName)
         write_string(wmb_file, material.shaderName)             # shaderName
-        wmb_file.seek(material.offsetTextures)
-        for i, texture in enumerate(material.textures):                       # [offsetName, texture, name]
-            worked = False
-            for key, value in enumerate(data.textures.textures):
-                print(f"{value[1]} : {texture[1]}")
-                if value[1] == texture[1]:
-                    write_uInt32(wmb_file, material.textures[i][2])
-                    write_uInt32(wmb_file, key)
-                    worked = True
-                    break
-            if not worked:
+        textureRows = []
+        for texture in material.textures:                       # [offsetName, texture, name]
+            key = textureIndices.get(texture[1])
+            if key is None:
                 print("WARNING! Could not find texture", texture[1])
+                continue
+            textureRows.append((texture[2], key))
+        wmb_file.records(pointerCountWrite, material.offsetTextures, textureRows)
         
-        wmb_file.seek(material.offsetParameterGroups)
-        for parameterGroup in material.parameterGroups:
-            for value in parameterGroup[3]:
-                write_float(wmb_file, value)
-
-def create_wmb_meshes(wmb_file, data):
-    wmb_file.seek(data.meshes_Offset)
+        wmb_file.array("f", material.offsetParameterGroups,
+            (value for parameterGroup in material.parameterGroups for value in parameterGroup[3]))
 
-    for mesh in data.meshes.meshes:
-        write_uInt32(wmb_file, mesh.nameOffset)             # nameOffset
-        for val in mesh.boundingBox:                        # boundingBox [x, y, z, u, v, m]
-            write_float(wmb_file, val)
-        
-        write_uInt32(wmb_file, mesh.batch0Pointer)
-        write_uInt32(wmb_file, len(mesh.batches0))
-        write_uInt32(wmb_file, mesh.batch1Pointer)
-        write_uInt32(wmb_file, len(mesh.batches1))
-        write_uInt32(wmb_file, mesh.batch2Pointer)
-        write_uInt32(wmb_file, len(mesh.batches2))
-        write_uInt32(wmb_file, mesh.batch3Pointer)
-        write_uInt32(wmb_file, len(mesh.batches3))
-        write_uInt32(wmb_file, mesh.offsetMaterials)        # offsetMaterials
-        write_uInt32(wmb_file, mesh.numMaterials)           # numMaterials
+def create_wmb_meshes(wmb_file: BinaryWriter, data):
+    wmb_file.records(meshWrite, data.meshes_Offset, (
+        (mesh.nameOffset, *mesh.boundingBox,                # nameOffset, boundingBox [x, y, z, u, v, m]
+         mesh.batch0Pointer, len(mesh.batches0),
+         mesh.batch1Pointer, len(mesh.batches1),
+         mesh.batch2Pointer, len(mesh.batches2),
+         mesh.batch3Pointer, len(mesh.batches3),
+         mesh.offsetMaterials, mesh.numMaterials)           # offsetMaterials, numMaterials
+        for mesh in data.meshes.meshes
+    ))
 
     for mesh in data.meshes.meshes:
         wmb_file.seek(mesh.nameOffset)
-        #print(wmb_file.tell(), mesh.name)
         write_string(wmb_file, mesh.name)                   # name
-        wmb_file.seek(mesh.batch0Pointer)
-        for batch in mesh.batches0:
-            write_uInt16(wmb_file, batch)
-        wmb_file.seek(mesh.batch1Pointer)
-        for batch in mesh.batches1:
-            write_uInt16(wmb_file, batch)
-        wmb_file.seek(mesh.batch2Pointer)
-        for batch in mesh.batches2:
-            write_uInt16(wmb_file, batch)
-        wmb_file.seek(mesh.batch3Pointer)
-        for batch in mesh.batches3:
-            write_uInt16(wmb_file, batch)
-        wmb_file.seek(mesh.offsetMaterials)
-        for material in mesh.materials:
-            write_uInt16(wmb_file, material)                # materials
+        wmb_file.array("H", mesh.batch0Pointer, mesh.batches0)
+        wmb_file.array("H", mesh.batch1Pointer, mesh.batches1)
+        wmb_file.array("H", mesh.batch2Pointer, mesh.batches2)
+        wmb_file.array("H", mesh.batch3Pointer, mesh.batches3)
+        # materials, then bones right behind them
+        end = wmb_file.array("H", mesh.offsetMaterials, mesh.materials)
         if mesh.numBones != 0:
-            for bone in mesh.bones:
-                write_uInt16(wmb_file, bone)                    # bones
+            wmb_file.array("H", end, mesh.bones)
 
 def create_wmb_mystery(wmb_file, data, CutInfo=None):
     def write_vector3(wmb_file, vec):
@@ -451,73 +411,27 @@ def create_wmb_mystery(wmb_file, data, CutInfo=None):
         write_Int16(wmb_file, mystery9["short_6"])
         write_uInt32(wmb_file, mystery9["int_8"])
 
-def create_wmb_textures(wmb_file, data):
-    wmb_file.seek(data.textures_Offset)
-    for tex in data.textures.textures:
-        write_uInt32(wmb_file, tex[0]) # flags
-        write_uInt32(wmb_file, int(tex[1])) # wta index/hash thing
+def create_wmb_textures(wmb_file: BinaryWriter, data):
+    # flags, wta index/hash thing
+    wmb_file.records(pointerCountWrite, data.textures_Offset, (
+        (tex[0], int(tex[1])) for tex in data.textures.textures
+    ))
 
-def create_wmb_vertexGroups(wmb_file, data):
-    wmb_file.seek(data.vertexGroups_Offset)
+def create_wmb_vertexGroups(wmb_file: BinaryWriter, data):
+    # vertexOffset, vertexExDataOffset, unknownOffset[2], numVertexes, indexBufferOffset, numIndexes
+    wmb_file.records(vertexGroupWrite, data.vertexGroups_Offset, (
+        (vertexGroup.vertexOffset, vertexGroup.vertexExDataOffset, *vertexGroup.unknownOffset,
+         vertexGroup.numVertexes, vertexGroup.indexBufferOffset, vertexGroup.numIndexes)
+        for vertexGroup in data.vertexGroups.vertexGroups
+    ))
     
     for vertexGroup in data.vertexGroups.vertexGroups:
-        write_uInt32(wmb_file, vertexGroup.vertexOffset)            # vertexOffset
-        write_uInt32(wmb_file, vertexGroup.vertexExDataOffset)      # vertexExDataOffset
-        for val in vertexGroup.unknownOffset:                       # unknownOffset
-            write_uInt32(wmb_file, val)
         print("NumVertexes:", hex(vertexGroup.numVertexes))
-        write_Int32(wmb_file, vertexGroup.numVertexes)              # numVertexes
-        write_Int32(wmb_file, vertexGroup.indexBufferOffset)        # indexBufferOffset
-        write_Int32(wmb_file, vertexGroup.numIndexes)               # numIndexes
-    
-    fourbytes = SmartIO.makeFormat(SmartIO.uint8, SmartIO.uint8, SmartIO.uint8, SmartIO.uint8)
-    writePos = SmartIO.makeFormat(SmartIO.float, SmartIO.float, SmartIO.float)
-    writeTangent = fourbytes
-    writeNormal = SmartIO.makeFormat(SmartIO.float16, SmartIO.float16, SmartIO.float16, SmartIO.float16)
-    #if wmb4:
-    #    writeNormal = SmartIO.makeFormat(SmartIO.uint32)
-    writeBoneIndexes = fourbytes
-    writeBoneWeights = fourbytes
-    writeUV = SmartIO.makeFormat(SmartIO.float16, SmartIO.float16)
-    writeColor = fourbytes
-    
-    for vertexGroup in data.vertexGroups.vertexGroups:
-        wmb_file.seek(vertexGroup.vertexOffset)
         print("Vertices:", len(vertexGroup.vertexes))
-        for vertex in vertexGroup.vertexes:                         # [position.xyz, tangents, normal, uv_maps, boneIndexes, boneWeights, color]
-            writePos.write(wmb_file, vertex[0]) # Position
-            writeUV.write(wmb_file, vertex[3][0]) # UVMap 1
+        # already packed in the file layout for data.vertexFormat
+        wmb_file.write_at(vertexGroup.vertexOffset, vertexGroup.vertexes)
             
-            write_uInt32(wmb_file, vertex[2]) # Normal
-            writeTangent.write(wmb_file, vertex[1]) # Tangent
-            
-            # bits that change based on flags
-            #if data.vertexFormat in {0x10337, 0x10137, 0x00337, 0x00137}:
-            if data.vertexFormat & 0x30 == 0x30: # hehe i'm clever
-                writeBoneIndexes.write(wmb_file, vertex[4])
-                writeBoneWeights.write(wmb_file, vertex[5])
-            if data.vertexFormat in {0x10307, 0x10107}:
-                writeColor.write(wmb_file, vertex[6])
-            if data.vertexFormat == 0x10307:
-                try:
-                    writeUV.write(wmb_file, vertex[3][1]) # UVMap 2
-                except:
-                    print("ERROR: Missing UVMap2, export will likely fail")
-            
-            
-        if vertexGroup.vertexExDataOffset > 0:
-            wmb_file.seek(vertexGroup.vertexExDataOffset)
-        for vertexExData in vertexGroup.vertexesExData:             # [normal, uv_maps, color]
-            if vertexGroup.vertexExDataOffset <= 0:
-                break
-            writeColor.write(wmb_file, vertexExData[2])
-            if data.vertexFormat in {0x10337, 0x00337}:
-                writeUV.write(wmb_file, vertexExData[1][0])
-            elif data.vertexFormat != 0x10137:
-                print("How the hell is there vertexExData with a vertexFormat of %s?" % hex(data.vertexFormat))
-            
-        
-        wmb_file.seek(vertexGroup.indexBufferOffset)
-        for index in vertexGroup.indexes:                           # indexes
-            write_uInt16(wmb_file, index)
+        if vertexGroup.vertexExDataOffset > 0 and vertexGroup.vertexesExData is not None:
+            wmb_file.write_at(vertexGroup.vertexExDataOffset, vertexGroup.vertexesExData)
         
+        wmb_file.write_at(vertexGroup.indexBufferOffset, vertexGroup.indexes)   # indexes
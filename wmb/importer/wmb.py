@@ -3,11 +3,13 @@ import os
 import json
 import bpy
 import struct # even for only two lines
+import numpy as np
 from time import time
 
 from ...utils.util import print_class, create_dir
-from ...utils.ioUtils import SmartIO, read_uint8_x4, to_string, read_float, read_float16, read_uint16, read_uint8, read_uint64, read_int16, read_int32, read_string
+from ...utils.ioUtils import SmartIO, BinaryView, to_string
 from ...wta_wtp.importer.wta import *
+from ...dat_dtt.importer import dat_unpacker
 from ..slice_data import *
 
 DEBUG_HEADER_PRINT = True
@@ -26,47 +28,37 @@ DEBUG_MYSTERY_PRINT = True
 class WMB_Header(object):
     """ fucking header    """
     size = 112 + 16 # apparently padding, can't be too safe
-    def __init__(self, wmb_fp):
+    smartRead = SmartIO.makeFormat(
+        "4s",                                  # ID
+        SmartIO.uint32,                        # version
+        SmartIO.uint32,                        # vertexFormat
+        SmartIO.uint16, SmartIO.int16,         # flags, referenceBone
+        SmartIO.float * 6,                     # bounding box
+        SmartIO.uint32 * 18                    # chunk pointers and counts
+    )
+    def __init__(self, wmb_view):
         super(WMB_Header, self).__init__()
-        if wmb_fp is None:
+        if wmb_view is None:
             return
-        self.magicNumber = wmb_fp.read(4)                               # ID
+        self.magicNumber, version, self.vertexFormat, \
+        self.flags, self.referenceBone, \
+        self.bounding_box1, self.bounding_box2, self.bounding_box3, \
+        self.bounding_box4, self.bounding_box5, self.bounding_box6, \
+        self.vertexGroupPointer, self.vertexGroupCount, \
+        self.batchPointer, self.batchCount, \
+        self.batchDescriptionPointer, \
+        self.bonePointer, self.boneCount, \
+        self.boneTranslateTablePointer, self.boneTranslateTableSize, \
+        self.boneSetPointer, self.boneSetCount, \
+        self.materialPointer, self.materialCount, \
+        self.texturePointer, self.textureCount, \
+        self.meshPointer, self.meshCount, \
+        self.unknownPointer \
+        = WMB_Header.smartRead.read_from(wmb_view, 0)
         assert(self.magicNumber == b'WMB4') # Invalid file or wrong WMB version
-        self.version = "%08x" % (read_uint32(wmb_fp))
-        self.vertexFormat = read_uint32(wmb_fp)             # Vertex data format, ex. 0x137
-        self.flags = read_uint16(wmb_fp)
-        self.referenceBone = read_int16(wmb_fp)             # flags & referenceBone
-        
-        self.bounding_box1 = read_float(wmb_fp)             # bounding_box pos 1
-        self.bounding_box2 = read_float(wmb_fp)                     
-        self.bounding_box3 = read_float(wmb_fp)
-        self.bounding_box4 = read_float(wmb_fp)             # bounding_box pos 2
-        
-        self.bounding_box5 = read_float(wmb_fp)
-        self.bounding_box6 = read_float(wmb_fp)
-        self.vertexGroupPointer = read_uint32(wmb_fp)
-        self.vertexGroupCount = read_uint32(wmb_fp)
-        
-        self.batchPointer = read_uint32(wmb_fp)
-        self.batchCount = read_uint32(wmb_fp)
-        self.batchDescriptionPointer = read_uint32(wmb_fp)  # No count on this one
-        self.bonePointer = read_uint32(wmb_fp)
-        
-        self.boneCount = read_uint32(wmb_fp)
-        self.boneTranslateTablePointer = read_uint32(wmb_fp)
-        self.boneTranslateTableSize = read_uint32(wmb_fp)   # This one isn't count, but size.
-        self.boneSetPointer = read_uint32(wmb_fp)
-        
-        self.boneSetCount = read_uint32(wmb_fp)
-        self.materialPointer = read_uint32(wmb_fp)
-        self.materialCount = read_uint32(wmb_fp)
-        self.texturePointer = read_uint32(wmb_fp)
-        
-        self.textureCount = read_uint32(wmb_fp)
-        self.meshPointer = read_uint32(wmb_fp)
-        self.meshCount = read_uint32(wmb_fp)
-        self.unknownPointer = read_uint32(wmb_fp)
-        
+        self.version = "%08x" % version
+        # batchDescription has no count, boneTranslateTable has a size instead of count
+
         if DEBUG_HEADER_PRINT:
             print("WMB4 header information")
             print(" version       %s" % self.version)
@@ -94,75 +86,75 @@ class WMB_Header(object):
 
 class wmb4_batch(object):
     """docstring for wmb4_batch"""
-    def read(self, wmb_fp):
+    smartRead = SmartIO.makeFormat(SmartIO.uint32, SmartIO.int32, SmartIO.int32, SmartIO.uint32, SmartIO.uint32)
+    def read(self, wmb_view, offset):
         self.batchGroup = -1 # overwritten later
-        self.vertexGroupIndex = read_uint32(wmb_fp)
-        self.vertexStart = read_int32(wmb_fp)
-        self.indexStart = read_int32(wmb_fp)
-        self.numVertexes = read_uint32(wmb_fp)
-        self.numIndexes = read_uint32(wmb_fp)
+        self.vertexGroupIndex, self.vertexStart, self.indexStart, \
+        self.numVertexes, self.numIndexes \
+        = wmb4_batch.smartRead.read_from(wmb_view, offset)
         if DEBUG_BATCHES_PRINT:
             print(" ",
               "%9d" % self.vertexGroupIndex,
               ("%d-%d" % (self.vertexStart, self.vertexStart + self.numVertexes)).ljust(11, " "),
               ("%d-%d" % (self.indexStart, self.indexStart + self.numIndexes))
             )
-        
+        return offset + wmb4_batch.smartRead.count
+
 
 class wmb4_batchDescription(object):
     """docstring for wmb4_batchDescription"""
-    def read(self, wmb_fp):
-        self.batchDataPointers = []
-        self.batchDataCounts = []
+    def read(self, wmb_view, offset):
+        pointersAndCounts = wmb_view.array(SmartIO.uint32, offset, 8)
+        self.batchDataPointers = list(pointersAndCounts[0::2])
+        self.batchDataCounts = list(pointersAndCounts[1::2])
         self.batchData = []
         #print("Iterating over 4, length %d" % 4)
         for dataNum in range(4):
             if DEBUG_BATCHSUPPLEMENT_PRINT:
                 print("Batch supplement for group", dataNum)
-            self.batchDataPointers.append(read_uint32(wmb_fp))
-            self.batchDataCounts.append(read_uint32(wmb_fp))
-            self.batchData.append(load_data_array(wmb_fp, self.batchDataPointers[-1], self.batchDataCounts[-1], wmb4_batchData))
+            self.batchData.append(load_data_array(wmb_view, self.batchDataPointers[dataNum], self.batchDataCounts[dataNum], wmb4_batchData))
         #print("Batch data pointers:", [hex(f) for f in self.batchDataPointers])
+        return offset + 32
 
 class wmb4_batchData(object):
     """docstring for wmb4_batchData"""
-    def read(self, wmb_fp):
-        self.batchIndex = read_uint32(wmb_fp)
-        self.meshIndex = read_uint32(wmb_fp)
-        self.materialIndex = read_uint16(wmb_fp)
-        self.boneSetsIndex = read_int16(wmb_fp)
-        self.unknown10 = read_uint32(wmb_fp) # again, maybe just padding
-        
+    smartRead = SmartIO.makeFormat(SmartIO.uint32, SmartIO.uint32, SmartIO.uint16, SmartIO.int16, SmartIO.uint32)
+    def read(self, wmb_view, offset):
+        self.batchIndex, self.meshIndex, self.materialIndex, self.boneSetsIndex, \
+        self.unknown10 \
+        = wmb4_batchData.smartRead.read_from(wmb_view, offset) # unknown10 again, maybe just padding
+
         if DEBUG_BATCHSUPPLEMENT_PRINT:
             print(" Batch: %s;   Mesh: %s;   Material: %s;   Bone set: %s" % (str(self.batchIndex).rjust(3, " "), str(self.meshIndex).rjust(3, " "), str(self.materialIndex).rjust(3, " "), str(self.boneSetsIndex).rjust(3, " ")))
+        return offset + wmb4_batchData.smartRead.count
 
 class wmb4_bone(object):
     """docstring for wmb4_bone"""
-    def read(self, wmb_fp, index):
+    smartRead = SmartIO.makeFormat(
+        SmartIO.int16,   # boneNumber
+        SmartIO.int16,   # unknown02, one is global index
+        SmartIO.int16,   # parentIndex
+        SmartIO.int16,   # unknownRotation, rotation order or smth
+        SmartIO.float * 3, # relative position
+        SmartIO.float * 3  # position
+    )
+    def read(self, wmb_view, offset, index):
         super(wmb4_bone, self).__init__()
         self.boneIndex = index
-        self.boneNumber = read_int16(wmb_fp)
-        self.unknown02 = read_int16(wmb_fp) # one is global index
-        self.parentIndex = read_int16(wmb_fp)
-        self.unknownRotation = read_int16(wmb_fp) # rotation order or smth
-
-        relativePositionX = read_float(wmb_fp)
-        relativePositionY = read_float(wmb_fp)
-        relativePositionZ = read_float(wmb_fp)
-        
-        positionX = read_float(wmb_fp)
-        positionY = read_float(wmb_fp)
-        positionZ = read_float(wmb_fp)
+        self.boneNumber, self.unknown02, self.parentIndex, self.unknownRotation, \
+        relativePositionX, relativePositionY, relativePositionZ, \
+        positionX, positionY, positionZ \
+        = wmb4_bone.smartRead.read_from(wmb_view, offset)
 
         self.local_position = (relativePositionX, relativePositionY, relativePositionZ)
         self.local_rotation = (0, 0, 0)
-        
+
         self.world_position = (positionX, positionY, positionZ)
         self.world_rotation = (relativePositionX, relativePositionY, relativePositionZ)
         #self.boneNumber = self.boneIndex
         # self... wait, why is world_rotation used twice?
         self.world_position_tpose = (0, 0, 0)
-        
+
         if DEBUG_BONE_PRINT:
             # there are lots of bones, so this should be compressed better
             print()
@@ -173,70 +165,65 @@ class wmb4_bone(object):
             print("Rotation(?):", self.unknownRotation)
             print("Position A: ", "(%s, %s, %s)" % self.local_position)
             print("Position B: ", "(%s, %s, %s)" % self.world_position)
-        
+        return offset + wmb4_bone.smartRead.count
+
 
 class wmb4_boneSet(object):
     """docstring for wmb4_boneSet"""
-    def read(self, wmb_fp):
+    def read(self, wmb_view, offset):
         super(wmb4_boneSet, self).__init__()
-        self.pointer = read_uint32(wmb_fp)
-        self.count = read_uint32(wmb_fp)
-        self.boneSet = load_data_array(wmb_fp, self.pointer, self.count, uint8)
+        self.pointer, self.count = wmb_view.array(SmartIO.uint32, offset, 2)
+        self.boneSet = load_data_array(wmb_view, self.pointer, self.count, uint8)
         if DEBUG_BONESET_PRINT:
             print("Count:", self.count, "Data:", self.boneSet)
+        return offset + 8
 
 class wmb4_boneTranslateTable(object):
     """docstring for wmb4_boneTranslateTable"""
-    def read(self, wmb_fp):
-        self.firstLevel = []
-        self.secondLevel = []
-        self.thirdLevel = []
-        for entry in range(16):
-            self.firstLevel.append(read_int16(wmb_fp))
-
-        firstLevel_Entry_Count = 0
-        for entry in self.firstLevel:
-            if entry != -1:
-                firstLevel_Entry_Count += 1
-
-        #print("Iterating over firstLevel_Entry_Count * 16, length %d" % firstLevel_Entry_Count * 16)
-        for entry in range(firstLevel_Entry_Count * 16):
-            self.secondLevel.append(read_int16(wmb_fp))
-
-        secondLevel_Entry_Count = 0
-        for entry in self.secondLevel:
-            if entry != -1:
-                secondLevel_Entry_Count += 1
-
-        #print("Iterating over secondLevel_Entry_Count * 16, length %d" % secondLevel_Entry_Count * 16)
-        for entry in range(secondLevel_Entry_Count * 16):
-            self.thirdLevel.append(read_int16(wmb_fp))
+    def read(self, wmb_view, offset):
+        firstLevel = np.frombuffer(wmb_view.buffer, "<i2", 16, wmb_view.base + offset)
+        offset += 16 * 2
+
+        firstLevel_Entry_Count = int(np.count_nonzero(firstLevel != -1))
+        secondLevel = np.frombuffer(wmb_view.buffer, "<i2", firstLevel_Entry_Count * 16, wmb_view.base + offset)
+        offset += firstLevel_Entry_Count * 16 * 2
+
+        secondLevel_Entry_Count = int(np.count_nonzero(secondLevel != -1))
+        thirdLevel = np.frombuffer(wmb_view.buffer, "<i2", secondLevel_Entry_Count * 16, wmb_view.base + offset)
+        # plain lists, these end up as custom properties on the armature
+        self.firstLevel = firstLevel.tolist()
+        self.secondLevel = secondLevel.tolist()
+        self.thirdLevel = thirdLevel.tolist()
+        return offset + secondLevel_Entry_Count * 16 * 2
 
 class wmb4_material(object):
     """docstring for wmb4_material"""
-    
-    def read(self, wmb_fp):
+    smartRead = SmartIO.makeFormat(
+        SmartIO.uint32, # shaderNamePointer
+        SmartIO.uint32, # texturesPointer
+        SmartIO.uint32, # unknown08, by context probably another offset
+        SmartIO.uint32, # parametersPointer
+        SmartIO.uint16, # texturesCount, wait so what's this
+        SmartIO.uint16, # trueTexturesCount, texture count, 4 or 5
+        SmartIO.uint16, # unknown14, and the mystery count.
+        SmartIO.uint16  # parametersCount
+    )
+
+    def read(self, wmb_view, offset):
         super(wmb4_material, self).__init__()
-        self.shaderNamePointer = read_uint32(wmb_fp)
-        self.texturesPointer = read_uint32(wmb_fp)
-        # by context, probably another offset.
+        self.shaderNamePointer, self.texturesPointer, self.unknown08, self.parametersPointer, \
+        self.texturesCount, self.trueTexturesCount, self.unknown14, self.parametersCount \
+        = wmb4_material.smartRead.read_from(wmb_view, offset)
         # check for unread data in the file.
-        self.unknown08 = read_uint32(wmb_fp)
-        self.parametersPointer = read_uint32(wmb_fp)
-        
-        self.texturesCount = read_uint16(wmb_fp) # wait so what's this
-        self.trueTexturesCount = read_uint16(wmb_fp) # texture count, 4 or 5
-        self.unknown14 = read_uint16(wmb_fp) # and the mystery count.
-        self.parametersCount = read_uint16(wmb_fp)
-        
-        texturesArray = load_data_array(wmb_fp, self.texturesPointer, self.trueTexturesCount*2, uint32)
-        
+
+        texturesArray = load_data_array(wmb_view, self.texturesPointer, self.trueTexturesCount*2, uint32)
+
         if self.parametersCount/4 % 1 != 0:
             print("Hey, idiot, you have incomplete parameters in your materials. It's gonna read some garbage data, since each one should have exactly four attributes: xyzw. Actually, I'm not sure if it'll read garbage or stop early. Idiot.")
-        
-        self.parameters = load_data_array(wmb_fp, self.parametersPointer, int(self.parametersCount/4), vector4)
-        
-        self.effectName = load_data(wmb_fp, self.shaderNamePointer, filestring)
+
+        self.parameters = load_data_array(wmb_view, self.parametersPointer, int(self.parametersCount/4), vector4)
+
+        self.effectName = load_data(wmb_view, self.shaderNamePointer, filestring)
         self.uniformArray = {}
         self.textureArray = {}
         self.textureFlagArray = []
@@ -244,7 +231,7 @@ class wmb4_material(object):
             if i % 2 == 0:
                 self.textureFlagArray.append(texture)
             else:
-                trueI = int((i - 1) / 2) # bad method, don't care tonight  
+                trueI = int((i - 1) / 2) # bad method, don't care tonight
                 self.textureArray[self.textureFlagArray[trueI]] = texture
 
         if DEBUG_MATERIAL_PRINT:
@@ -253,30 +240,30 @@ class wmb4_material(object):
         self.parameterGroups = self.parameters
         self.materialName = "UnusedMaterial" # mesh name overrides
         self.wmb4 = True
+        return offset + wmb4_material.smartRead.count
 
 class wmb4_mesh(object):
     """docstring for wmb4_mesh"""
-    def read(self, wmb_fp, scr_mode=None):
+    smartRead = SmartIO.makeFormat(
+        SmartIO.uint32,      # namePointer
+        SmartIO.float * 6,   # boundingBox
+        SmartIO.uint32 * 8,  # batch0-3 pointers and counts
+        SmartIO.uint32 * 2   # materials pointer and count
+    )
+    def read(self, wmb_view, offset, scr_mode=None):
         super(wmb4_mesh, self).__init__()
-        self.namePointer = read_uint32(wmb_fp)
-        self.boundingBox = []
-        #print("Iterating over 6, length %d" % 6)
-        for i in range(6):
-            self.boundingBox.append(read_float(wmb_fp))
-        
-        self.batch0Pointer = read_uint32(wmb_fp)
-        self.batch0Count = read_uint32(wmb_fp)
-        self.batch1Pointer = read_uint32(wmb_fp)
-        self.batch1Count = read_uint32(wmb_fp)
-        self.batch2Pointer = read_uint32(wmb_fp)
-        self.batch2Count = read_uint32(wmb_fp)
-        self.batch3Pointer = read_uint32(wmb_fp)
-        self.batch3Count = read_uint32(wmb_fp)
-        
-        self.materialsPointer = read_uint32(wmb_fp)
-        self.materialsCount = read_uint32(wmb_fp)
-        
-        self.name = load_data(wmb_fp, self.namePointer, filestring)
+        values = wmb4_mesh.smartRead.read_from(wmb_view, offset)
+        self.namePointer = values[0]
+        self.boundingBox = list(values[1:7])
+
+        self.batch0Pointer, self.batch0Count, \
+        self.batch1Pointer, self.batch1Count, \
+        self.batch2Pointer, self.batch2Count, \
+        self.batch3Pointer, self.batch3Count, \
+        self.materialsPointer, self.materialsCount \
+        = values[7:]
+
+        self.name = load_data(wmb_view, self.namePointer, filestring)
         if scr_mode is not None and scr_mode[0]:
             if self.name != "SCR_MESH":
                 print()
@@ -285,42 +272,47 @@ class wmb4_mesh(object):
                 self.name = scr_mode[1]
         if DEBUG_MESH_PRINT:
             print("\nMesh name: %s" % self.name)
-        
-        self.batches0 = load_data_array(wmb_fp, self.batch0Pointer, self.batch0Count, uint16)
-        self.batches1 = load_data_array(wmb_fp, self.batch1Pointer, self.batch1Count, uint16)
-        self.batches2 = load_data_array(wmb_fp, self.batch2Pointer, self.batch2Count, uint16)
-        self.batches3 = load_data_array(wmb_fp, self.batch3Pointer, self.batch3Count, uint16)
+
+        self.batches0 = load_data_array(wmb_view, self.batch0Pointer, self.batch0Count, uint16)
+        self.batches1 = load_data_array(wmb_view, self.batch1Pointer, self.batch1Count, uint16)
+        self.batches2 = load_data_array(wmb_view, self.batch2Pointer, self.batch2Count, uint16)
+        self.batches3 = load_data_array(wmb_view, self.batch3Pointer, self.batch3Count, uint16)
         if DEBUG_MESH_PRINT:
             print("Batches:", self.batches0, self.batches1, self.batches2, self.batches3)
-        
-        self.materials = load_data_array(wmb_fp, self.materialsPointer, self.materialsCount, uint16)
+
+        self.materials = load_data_array(wmb_view, self.materialsPointer, self.materialsCount, uint16)
         if DEBUG_MESH_PRINT:
             print("Materials:", self.materialsCount, self.materials)
         # if self.name == "lowerLeg_dam1_LBODY_DEC":
         #     self.materials = [8, 9, 10, 11, 12, 13, 14, 15, 16, 17]
+        return offset + wmb4_mesh.smartRead.count
 
 class wmb4_texture(object):
     """The WMB4 texture is delightfully simple."""
-    def read(self, wmb_fp):
+    def read(self, wmb_view, offset):
         super(wmb4_texture, self).__init__()
-        self.flags = read_uint32(wmb_fp)
-        self.id = str(read_uint32(wmb_fp))
+        self.flags, textureID = wmb_view.array(SmartIO.uint32, offset, 2)
+        self.id = str(textureID)
+        return offset + 8
 
 class wmb4_vertexGroup(object):
     """docstring for wmb4_vertexGroup"""
+    smartRead = SmartIO.makeFormat(SmartIO.uint32 * 7)
     def size(a):
         return 28 + 0
-    def read(self, wmb_fp, vertexFormat):
-        self.vertexesDataPointer = read_uint32(wmb_fp)
-        self.extraVertexesDataPointer = read_uint32(wmb_fp)
-        self.unknownPointer = read_uint32(wmb_fp)
-        self.unknownCount = read_uint32(wmb_fp) # might actually be another pointer lol idk
+    def read(self, wmb_view, offset, vertexFormat):
+        self.vertexesDataPointer, \
+        self.extraVertexesDataPointer, \
+        self.unknownPointer, \
+        self.unknownCount, \
+        self.vertexesCount, \
+        self.faceIndexesPointer, \
+        self.faceIndexesCount \
+        = wmb4_vertexGroup.smartRead.read_from(wmb_view, offset)
+        # unknownCount might actually be another pointer lol idk
         # or what if it's just padding?
-        self.vertexesCount = read_uint32(wmb_fp)
-        self.faceIndexesPointer = read_uint32(wmb_fp)
-        self.faceIndexesCount = read_uint32(wmb_fp)
-        
-        
+
+
         if DEBUG_VERTEXGROUP_PRINT:
             print()
             print("Vertex group information    Pointer Count")
@@ -328,261 +320,298 @@ class wmb4_vertexGroup(object):
             print(" extraVertexesData       " + hex(self.extraVertexesDataPointer).rjust(10, " "))
             print(" unknown                 " + hex(self.unknownPointer).rjust(10, " ") + str(self.unknownCount).rjust(6, " "))
             print(" faceIndexes             " + hex(self.faceIndexesPointer).rjust(10, " ") + str(self.faceIndexesCount).rjust(6, " "))
-        
-        
-        self.vertexArray = load_data_array(wmb_fp, self.vertexesDataPointer, self.vertexesCount, wmb4_vertex, vertexFormat)
-        
-        if vertexFormat in {0x10337, 0x10137, 0x00337}:
-            self.vertexesExDataArray = load_data_array(wmb_fp, self.extraVertexesDataPointer, self.vertexesCount, wmb4_vertexExData, vertexFormat)
+
+
+        arrays = {}
+        if self.vertexesDataPointer > 0:
+            arrays = wmb4_vertex.read_arrays(wmb_view, self.vertexesDataPointer, self.vertexesCount, vertexFormat) or {}
+        hasExData = vertexFormat in {0x10337, 0x10137, 0x00337}
+        if hasExData and self.extraVertexesDataPointer > 0:
+            arrays.update(wmb4_vertexExData.read_arrays(wmb_view, self.extraVertexesDataPointer, self.vertexesCount, vertexFormat))
+        self.vertexArrays = VertexGroupArrays(self.vertexesCount if arrays else 0, **arrays)
+
+        # legacy per-vertex access, the extra data columns live in the same arrays
+        self.vertexArray = self.vertexArrays
+        if hasExData:
+            self.vertexesExDataArray = self.vertexArrays
         else:
             self.vertexesExDataArray = [None] * self.vertexesCount
-        
-        self.unknownArray = load_data_array(wmb_fp, self.unknownPointer, self.unknownCount, uint32)
+
+        self.unknownArray = load_data_array(wmb_view, self.unknownPointer, self.unknownCount, uint32)
         # mercifully empty
-        
-        self.faceRawArray = load_data_array(wmb_fp, self.faceIndexesPointer, self.faceIndexesCount, uint16)
-        
+
+        self.faceRawArray = np.zeros(0, dtype=np.uint16)
+        if self.faceIndexesPointer > 0:
+            self.faceRawArray = np.frombuffer(wmb_view.buffer, "<u2", self.faceIndexesCount, wmb_view.base + self.faceIndexesPointer).copy()
+
         self.vertexFlags = None # <trollface>
+        return offset + wmb4_vertexGroup.smartRead.count
 
 class wmb4_vertex(object):
-    smartRead10337 = SmartIO.makeFormat( # 10137, 00337, 00137 same
-        SmartIO.float,   # x
-        SmartIO.float,   # y
-        SmartIO.float,   # z
-        SmartIO.float16, # texture u
-        SmartIO.float16, # texture v
-        SmartIO.uint32,  # normals (11+11+10 bits)
-        SmartIO.uint8,   # tangent x
-        SmartIO.uint8,   # tangent y
-        SmartIO.uint8,   # tangent z
-        SmartIO.uint8,   # tangent d
-        SmartIO.uint8, SmartIO.uint8, SmartIO.uint8, SmartIO.uint8, # boneIndexes
-        SmartIO.uint8, SmartIO.uint8, SmartIO.uint8, SmartIO.uint8  # boneWeights
-    )
-    smartRead10307 = SmartIO.makeFormat(
-        SmartIO.float,   # x
-        SmartIO.float,   # y
-        SmartIO.float,   # z
-        SmartIO.float16, # texture u
-        SmartIO.float16, # texture v
-        SmartIO.uint32,  # normals (11+11+10 bits)
-        SmartIO.uint8,   # tangent x
-        SmartIO.uint8,   # tangent y
-        SmartIO.uint8,   # tangent z
-        SmartIO.uint8,   # tangent d
-        SmartIO.uint32,  # color
-        SmartIO.float16, # texture2 u
-        SmartIO.float16  # texture2 v
-    )
-    smartRead10107 = SmartIO.makeFormat(
-        SmartIO.float,   # x
-        SmartIO.float,   # y
-        SmartIO.float,   # z
-        SmartIO.float16, # texture u
-        SmartIO.float16, # texture v
-        SmartIO.uint32,  # normals (11+11+10 bits)
-        SmartIO.uint8,   # tangent x
-        SmartIO.uint8,   # tangent y
-        SmartIO.uint8,   # tangent z
-        SmartIO.uint8,   # tangent d
-        SmartIO.uint32   # color
-    )
-    smartRead00107 = SmartIO.makeFormat(
-        SmartIO.float,   # x
-        SmartIO.float,   # y
-        SmartIO.float,   # z
-        SmartIO.float16, # texture u
-        SmartIO.float16, # texture v
-        SmartIO.uint32,  # normals (11+11+10 bits)
-        SmartIO.uint8,   # tangent x
-        SmartIO.uint8,   # tangent y
-        SmartIO.uint8,   # tangent z
-        SmartIO.uint8,   # tangent d
-    )
-    
-    """docstring for wmb4_vertex"""
-    def read(self, wmb_fp, vertexFormat):
+    # one structured dtype per vertex format, decoded with a single frombuffer
+    dtype10337 = np.dtype([ # 10137, 00337, 00137 same
+        ("position",    "<f4", (3,)), # x, y, z
+        ("texture",     "<f2", (2,)), # texture u, v
+        ("normal",      "<u4"),       # normals (11+11+10 bits)
+        ("tangent",     "u1", (4,)),  # tangent x, y, z, d
+        ("boneIndices", "u1", (4,)),
+        ("boneWeights", "u1", (4,))
+    ])
+    dtype10307 = np.dtype([
+        ("position",    "<f4", (3,)), # x, y, z
+        ("texture",     "<f2", (2,)), # texture u, v
+        ("normal",      "<u4"),       # normals (11+11+10 bits)
+        ("tangent",     "u1", (4,)),  # tangent x, y, z, d
+        ("color",       "u1", (4,)),
+        ("texture2",    "<f2", (2,))  # texture2 u, v
+    ])
+    dtype10107 = np.dtype([
+        ("position",    "<f4", (3,)), # x, y, z
+        ("texture",     "<f2", (2,)), # texture u, v
+        ("normal",      "<u4"),       # normals (11+11+10 bits)
+        ("tangent",     "u1", (4,)),  # tangent x, y, z, d
+        ("color",       "u1", (4,))
+    ])
+    dtype00107 = np.dtype([
+        ("position",    "<f4", (3,)), # x, y, z
+        ("texture",     "<f2", (2,)), # texture u, v
+        ("normal",      "<u4"),       # normals (11+11+10 bits)
+        ("tangent",     "u1", (4,))   # tangent x, y, z, d
+    ])
+
+    @staticmethod
+    def dtype(vertexFormat):
         if (vertexFormat & 0x137) == 0x137: # 10337, 10137, 00337, 00137, all match this
-            # everything I did with the indexes is horrible here todo fix
-            boneIndex = [0] * 4
-            boneWeight = [0] * 4
-            self.positionX, self.positionY, self.positionZ, \
-            self.textureU, self.textureV, \
-            normal, \
-            self.tangentX, self.tangentY, self.tangentZ, self.tangentD, \
-            boneIndex[0], boneIndex[1], boneIndex[2], boneIndex[3], \
-            boneWeight[0], boneWeight[1], boneWeight[2], boneWeight[3] \
-            = wmb4_vertex.smartRead10337.read(wmb_fp)
-            self.boneIndices = boneIndex
-            self.boneWeights = [weight/255 for weight in boneWeight]
-            # All these values are discarded??
-            # self.tangentX *= 2/255
-            # self.tangentY *= 2/255
-            # self.tangentZ *= 2/255
-            # self.tangentD *= 2/255
-            self.tangentX = (self.tangentX - 127) / 127
-            self.tangentY = (self.tangentY - 127) / 127
-            self.tangentZ = (self.tangentZ - 127) / 127
-            self.tangentD = (self.tangentD - 127) / 127
-        
-        elif vertexFormat == 0x10307:
-            self.positionX, self.positionY, self.positionZ, \
-            self.textureU, self.textureV, \
-            normal, \
-            self.tangentX, self.tangentY, self.tangentZ, self.tangentD, \
-            self.color, \
-            self.textureU2, self.textureV2 \
-            = wmb4_vertex.smartRead10307.read(wmb_fp)
-            
-            self.color = list(struct.unpack("<BBBB", struct.pack("<I", self.color))) # byte me
-            
-        elif vertexFormat == 0x10107:
-            self.positionX, self.positionY, self.positionZ, \
-            self.textureU, self.textureV, \
-            normal, \
-            self.tangentX, self.tangentY, self.tangentZ, self.tangentD, \
-            self.color \
-            = wmb4_vertex.smartRead10107.read(wmb_fp)
-            
-            self.color = list(struct.unpack("<BBBB", struct.pack("<I", self.color))) # byte me
-            
-        elif vertexFormat == 0x00107:
-            self.positionX, self.positionY, self.positionZ, \
-            self.textureU, self.textureV, \
-            normal, \
-            self.tangentX, self.tangentY, self.tangentZ, self.tangentD \
-            = wmb4_vertex.smartRead00107.read(wmb_fp)
-            
-        else:
+            return wmb4_vertex.dtype10337
+        return {
+            0x10307: wmb4_vertex.dtype10307,
+            0x10107: wmb4_vertex.dtype10107,
+            0x00107: wmb4_vertex.dtype00107
+        }.get(vertexFormat)
+
+    @staticmethod
+    def read_arrays(wmb_view, pointer, count, vertexFormat):
+        """Decode a whole vertex buffer into a dict of arrays, one per attribute."""
+        dtype = wmb4_vertex.dtype(vertexFormat)
+        if dtype is None:
             print("God fucking DAMMIT Kris, the vertex format is %s." % hex(vertexFormat))
-            return
+            return None
+        raw = np.frombuffer(wmb_view.buffer, dtype, count, wmb_view.base + pointer)
 
-        # split normal to self.normalX, Y, Z
-        self.normalX = normal & ((1 << 11) - 1)
-        self.normalY = (normal >> 11) & ((1 << 11) - 1)
-        self.normalZ = (normal >> 22)
-        if self.normalX & (1 << 10):
-            self.normalX &= ~(1 << 10)
-            self.normalX -= 1 << 10
-        if self.normalY & (1 << 10):
-            self.normalY &= ~(1 << 10)
-            self.normalY -= 1 << 10
-        if self.normalZ & (1 << 9):
-            self.normalZ &= ~(1 << 9)
-            self.normalZ -= 1 << 9
-        # normalize
-        self.normalX /= (1<<10)-1
-        self.normalY /= (1<<10)-1
-        self.normalZ /= (1<<9)-1
+        arrays = {
+            "positions": raw["position"].astype(np.float32),
+            "uvs": raw["texture"].astype(np.float32),
+            "normals": unpack_normals(raw["normal"])
+        }
+        if dtype is wmb4_vertex.dtype10337:
+            arrays["tangents"] = (raw["tangent"].astype(np.float32) - 127) / 127
+            arrays["boneIndices"] = raw["boneIndices"].copy()
+            arrays["boneWeights"] = raw["boneWeights"] / np.float32(255)
+        else: # never rescaled for these, keep the raw bytes
+            arrays["tangents"] = raw["tangent"].astype(np.float32)
+        if "color" in dtype.names:
+            arrays["colors"] = raw["color"].copy()
+        if "texture2" in dtype.names:
+            arrays["uvs2"] = raw["texture2"].astype(np.float32)
+        return arrays
+
+def unpack_normals(packed):
+    """Split the 11+11+10 bit normals and sign extend each part, normalized."""
+    normals = np.empty((len(packed), 3), dtype=np.float32)
+    x = (packed & 0x7ff).astype(np.int32)
+    y = ((packed >> 11) & 0x7ff).astype(np.int32)
+    z = (packed >> 22).astype(np.int32)
+    x[x & (1 << 10) != 0] -= 1 << 11
+    y[y & (1 << 10) != 0] -= 1 << 11
+    z[z & (1 << 9) != 0] -= 1 << 10
+    normals[:, 0] = x / ((1<<10)-1)
+    normals[:, 1] = y / ((1<<10)-1)
+    normals[:, 2] = z / ((1<<9)-1)
+    return normals
 
 class wmb4_vertexExData(object):
     """docstring for wmb4_vertexExData"""
-    def read(self, wmb_fp, vertexFormat):
-        if (vertexFormat & 0x337) == 0x337: # both 10337 and 00337
-            self.color = list(read_uint8_x4(wmb_fp))
-            self.textureU2 = read_float16(wmb_fp)
-            self.textureV2 = read_float16(wmb_fp)
-            return
-            
+    dtype337 = np.dtype([ # both 10337 and 00337
+        ("color",       "u1", (4,)),
+        ("texture2",    "<f2", (2,))  # texture2 u, v
+    ])
+    dtype10137 = np.dtype([
+        ("color",       "u1", (4,))
+    ])
+
+    @staticmethod
+    def read_arrays(wmb_view, pointer, count, vertexFormat):
+        if (vertexFormat & 0x337) == 0x337:
+            dtype = wmb4_vertexExData.dtype337
         elif vertexFormat == 0x10137:
-            self.color = list(read_uint8_x4(wmb_fp))
-            return
-        
+            dtype = wmb4_vertexExData.dtype10137
         else:
             print("How the FUCK did you get here, the function call is *directly* inside a check for vertexFormat matching... Somehow, it's", hex(vertexFormat))
-            return
+            return None
+        raw = np.frombuffer(wmb_view.buffer, dtype, count, wmb_view.base + pointer)
 
+        arrays = {"colors": raw["color"].copy()}
+        if "texture2" in dtype.names:
+            arrays["uvs2"] = raw["texture2"].astype(np.float32)
+        return arrays
 
-def read_vector3(wmb_fp):
-    X = read_float(wmb_fp)
-    Y = read_float(wmb_fp)
-    Z = read_float(wmb_fp)
-    return [X, Y, Z]
+class VertexGroupArrays(object):
+    """
+    Columnar storage for one vertex group: every attribute is a contiguous
+    array indexed by vertex, so memory follows the raw buffer size.
+    Indexing gives a read-only wmb4_vertexView, slicing gives another
+    VertexGroupArrays sharing the same memory.
+    """
+    columns = ("positions", "uvs", "normals", "tangents", "boneIndices", "boneWeights", "colors", "uvs2")
+
+    def __init__(self, count, **arrays):
+        self.count = count
+        self.positions = None   # (n, 3) float32
+        self.uvs = None         # (n, 2) float32
+        self.normals = None     # (n, 3) float32
+        self.tangents = None    # (n, 4) float32
+        self.boneIndices = None # (n, 4) uint8, boneSet local
+        self.boneWeights = None # (n, 4) float32
+        self.colors = None      # (n, 4) uint8, from vertex or extra data
+        self.uvs2 = None        # (n, 2) float32, from vertex or extra data
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.count)
+            return VertexGroupArrays(
+                len(range(start, stop, step)),
+                **{name: getattr(self, name)[key] for name in self.columns if getattr(self, name) is not None}
+            )
+        if key < 0:
+            key += self.count
+        if not 0 <= key < self.count:
+            raise IndexError("vertex index out of range")
+        return wmb4_vertexView(self, key)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield wmb4_vertexView(self, index)
+
+def _vertexComponent(column, component):
+    return property(lambda self: float(getattr(self._arrays, column)[self._index, component]))
+
+def _vertexList(column):
+    return property(lambda self: getattr(self._arrays, column)[self._index].tolist())
+
+class wmb4_vertexView(object):
+    """Read-only stand-in for the old per-vertex object, backed by VertexGroupArrays."""
+    __slots__ = ("_arrays", "_index")
+
+    def __init__(self, arrays, index):
+        self._arrays = arrays
+        self._index = index
+
+    positionX = _vertexComponent("positions", 0)
+    positionY = _vertexComponent("positions", 1)
+    positionZ = _vertexComponent("positions", 2)
+    textureU = _vertexComponent("uvs", 0)
+    textureV = _vertexComponent("uvs", 1)
+    normalX = _vertexComponent("normals", 0)
+    normalY = _vertexComponent("normals", 1)
+    normalZ = _vertexComponent("normals", 2)
+    tangentX = _vertexComponent("tangents", 0)
+    tangentY = _vertexComponent("tangents", 1)
+    tangentZ = _vertexComponent("tangents", 2)
+    tangentD = _vertexComponent("tangents", 3)
+    textureU2 = _vertexComponent("uvs2", 0)
+    textureV2 = _vertexComponent("uvs2", 1)
+    boneIndices = _vertexList("boneIndices")
+    boneWeights = _vertexList("boneWeights")
+    color = _vertexList("colors")
+
+
+def read_vector3(wmb_view, offset):
+    return list(wmb_view.array(SmartIO.float, offset, 3))
 
 class wmb4_mystery(object):
     """Probably for some form of cut info. Present on Sundowner."""
     class mystery1Template(object):
-        def read(self, wmb_fp):
-            namePointer = read_uint32(wmb_fp)
-            parent = read_int16(wmb_fp)
-            mysteryB = read_int16(wmb_fp)
-            name = load_data(wmb_fp, namePointer, filestring)
-            
+        smartRead = SmartIO.makeFormat(SmartIO.uint32, SmartIO.int16, SmartIO.int16)
+        def read(self, wmb_view, offset):
+            namePointer, parent, mysteryB = self.smartRead.read_from(wmb_view, offset)
+            name = load_data(wmb_view, namePointer, filestring)
+
             self.data = Slice1Data(name, parent, mysteryB)
-    
+            return offset + self.smartRead.count
+
     class mystery2Template(object):
-        def read(self, wmb_fp):
-            posA = read_vector3(wmb_fp)
-            flagA1 = read_int16(wmb_fp)
-            flagA2 = read_int16(wmb_fp)
-            
-            posB = read_vector3(wmb_fp)
-            flagB1 = read_int16(wmb_fp)
-            flagB2 = read_int16(wmb_fp)
-            
-            posC = read_vector3(wmb_fp)
-            flagC1 = read_int16(wmb_fp)
-            flagC2 = read_int16(wmb_fp)
-            
-            posD = read_vector3(wmb_fp)
-            
+        smartRead = SmartIO.makeFormat(
+            SmartIO.float * 3, SmartIO.int16 * 2, # posA, flagA1, flagA2
+            SmartIO.float * 3, SmartIO.int16 * 2, # posB, flagB1, flagB2
+            SmartIO.float * 3, SmartIO.int16 * 2, # posC, flagC1, flagC2
+            SmartIO.float * 3                     # posD
+        )
+        def read(self, wmb_view, offset):
+            values = self.smartRead.read_from(wmb_view, offset)
+
             self.data = Slice2Data(
-                SVector3(posA),
-                flagA1, flagA2,
-                SVector3(posB),
-                flagB1, flagB2,
-                SVector3(posC),
-                flagC1, flagC2,
-                SVector3(posD)
+                SVector3(list(values[0:3])),
+                values[3], values[4],
+                SVector3(list(values[5:8])),
+                values[8], values[9],
+                SVector3(list(values[10:13])),
+                values[13], values[14],
+                SVector3(list(values[15:18]))
             )
-    
+            return offset + self.smartRead.count
+
     class mystery3Template(object):
         class vectorsTemplate(object):
-            def read(self, wmb_fp):
+            smartRead = SmartIO.makeFormat(SmartIO.float * 15, SmartIO.uint32)
+            def read(self, wmb_view, offset):
                 # vectors, but lists are easier to use
-                mysteryA = read_vector3(wmb_fp)
-                mysteryB = read_vector3(wmb_fp)
-                mysteryC = read_vector3(wmb_fp)
-                mysteryD = read_vector3(wmb_fp)
-                mysteryE = read_vector3(wmb_fp)
-                
-                mat_ind = read_uint32(wmb_fp)
-                
+                values = self.smartRead.read_from(wmb_view, offset)
+
                 self.data = Slice3Data.Slice3DataData(
-                    SVector3(mysteryA),
-                    SVector3(mysteryB),
-                    SVector3(mysteryC),
-                    SVector3(mysteryD),
-                    SVector3(mysteryE),
-                    mat_ind
+                    SVector3(list(values[0:3])),    # mysteryA
+                    SVector3(list(values[3:6])),    # mysteryB
+                    SVector3(list(values[6:9])),    # mysteryC
+                    SVector3(list(values[9:12])),   # mysteryD
+                    SVector3(list(values[12:15])),  # mysteryE
+                    values[15]                      # mat_ind
                 )
-                
-        
-        def read(self, wmb_fp):
-            vectorsPointer = read_uint32(wmb_fp)
-            vectorsCount = read_uint32(wmb_fp)
-            vectors = load_data_array(wmb_fp, vectorsPointer, vectorsCount, self.vectorsTemplate)
-            
+                return offset + self.smartRead.count
+
+
+        def read(self, wmb_view, offset):
+            vectorsPointer, vectorsCount = wmb_view.array(SmartIO.uint32, offset, 2)
+            vectors = load_data_array(wmb_view, vectorsPointer, vectorsCount, self.vectorsTemplate)
+
             self.data = Slice3Data([x.data for x in vectors])
-    
+            return offset + 8
+
     class mystery4Template(object):
-        def read(self, wmb_fp):
-            posA = read_vector3(wmb_fp)
-            posB = read_vector3(wmb_fp)
-            chunk5_ind = read_uint32(wmb_fp)
-            mysteryD = read_uint32(wmb_fp)
-            mysteryE = read_uint16(wmb_fp)
-            mysteryE2 = read_uint16(wmb_fp)
-            mysteryF = read_uint32(wmb_fp) # always 0 or 1?
-            
-            twentyElementsPointer = read_uint32(wmb_fp)
-            faces = SFaceSet().from_wmb(wmb_fp)
-            
-            twentyElements = load_data_array(wmb_fp, twentyElementsPointer, 20, uint32)
-            
+        smartRead = SmartIO.makeFormat(
+            SmartIO.float * 3,  # posA
+            SmartIO.float * 3,  # posB
+            SmartIO.uint32,     # chunk5_ind
+            SmartIO.uint32,     # mysteryD
+            SmartIO.uint16,     # mysteryE
+            SmartIO.uint16,     # mysteryE2
+            SmartIO.uint32,     # mysteryF, always 0 or 1?
+            SmartIO.uint32,     # twentyElementsPointer
+            SmartIO.uint32 * 4  # faces
+        )
+        def read(self, wmb_view, offset):
+            values = self.smartRead.read_from(wmb_view, offset)
+            chunk5_ind, mysteryD, mysteryE, mysteryE2, mysteryF, twentyElementsPointer = values[6:12]
+            faces = SFaceSet(*values[12:16])
+
+            twentyElements = load_data_array(wmb_view, twentyElementsPointer, 20, uint32)
+
             self.data = Slice4Data(
-                SVector3(posA),
-                SVector3(posB),
+                SVector3(list(values[0:3])),
+                SVector3(list(values[3:6])),
                 chunk5_ind,
                 mysteryD,
                 mysteryE, mysteryE2,
@@ -590,82 +619,88 @@ class wmb4_mystery(object):
                 twentyElements,
                 faces
             )
-    
+            return offset + self.smartRead.count
+
     class mystery5Template(object):
         class mysteryDTemplate(object):
-            def read(self, wmb_fp):
-                contentPointer = read_uint32(wmb_fp)
-                contentCount = read_uint32(wmb_fp)
-                self.content = load_data_array(wmb_fp, contentPointer, contentCount, int16)
-    
-        def read(self, wmb_fp):
-            mysteryA = read_uint32(wmb_fp)  # Loopback ID
-            chunk1_ind = read_int16(wmb_fp)
-            mysteryB2 = read_int16(wmb_fp)
-            chunk3_ind = read_int16(wmb_fp)
-            mysteryC2 = read_int16(wmb_fp)
-            mysteryDPointer = read_uint32(wmb_fp)
-            mysteryDCount = read_uint32(wmb_fp)
-            
-            mysteryD = load_data_array(wmb_fp, mysteryDPointer, mysteryDCount, self.mysteryDTemplate)
-            
+            def read(self, wmb_view, offset):
+                contentPointer, contentCount = wmb_view.array(SmartIO.uint32, offset, 2)
+                self.content = load_data_array(wmb_view, contentPointer, contentCount, int16)
+                return offset + 8
+
+        smartRead = SmartIO.makeFormat(SmartIO.uint32, SmartIO.int16 * 4, SmartIO.uint32 * 2)
+        def read(self, wmb_view, offset):
+            mysteryA, \
+            chunk1_ind, mysteryB2, \
+            chunk3_ind, mysteryC2, \
+            mysteryDPointer, mysteryDCount \
+            = self.smartRead.read_from(wmb_view, offset) # mysteryA is the loopback ID
+
+            mysteryD = load_data_array(wmb_view, mysteryDPointer, mysteryDCount, self.mysteryDTemplate)
+
             self.data = Slice5Data(
                 mysteryA,
                 chunk1_ind, mysteryB2,
                 chunk3_ind, mysteryC2,
                 [x.content for x in mysteryD]
             )
-    
+            return offset + self.smartRead.count
+
     class mystery6Template(object):
-        def read(self, wmb_fp):
-            vertexPointer = read_uint32(wmb_fp)
-            facePointer = read_uint32(wmb_fp)
-            vertexCount = read_uint32(wmb_fp)
-            faceCount = read_uint32(wmb_fp)
-            
+        def read(self, wmb_view, offset):
+            vertexPointer, facePointer, vertexCount, faceCount = wmb_view.array(SmartIO.uint32, offset, 4)
+
             # immediately after those headers everything gets out of order.
             # next subchunk is 9, then 8, then 7, before getting back to this content.
             # not gonna bother to reproduce that unless i have to
-            
-            vertexes = load_data_array(wmb_fp, vertexPointer, vertexCount, vector4)
+
+            vertexes = load_data_array(wmb_view, vertexPointer, vertexCount, vector4)
             vertexes = [SVector4(k.x, k.y, k.z, k.w) for k in vertexes]
-            faces = load_data_array(wmb_fp, facePointer, faceCount, int16)
-            
+            faces = load_data_array(wmb_view, facePointer, faceCount, int16)
+
             self.data = Slice6Data(SGeometry(vertexes, faces))
-    
+            return offset + 16
+
     class mystery7Template(object):
-        def read(self, wmb_fp):
-            unknownA = read_vector3(wmb_fp)
-            unknownB = read_vector3(wmb_fp)
-            chunk6_ind = read_uint32(wmb_fp)
-            unknownD = read_float(wmb_fp)
-            
-            faces = SFaceSet().from_wmb(wmb_fp)
-            
+        smartRead = SmartIO.makeFormat(
+            SmartIO.float * 3,  # unknownA
+            SmartIO.float * 3,  # unknownB
+            SmartIO.uint32,     # chunk6_ind
+            SmartIO.float,      # unknownD
+            SmartIO.uint32 * 4  # faces
+        )
+        def read(self, wmb_view, offset):
+            values = self.smartRead.read_from(wmb_view, offset)
+
             self.data = Slice7Data(
-                SVector3(unknownA),
-                SVector3(unknownB),
-                chunk6_ind,
-                unknownD,
-                faces
+                SVector3(list(values[0:3])),
+                SVector3(list(values[3:6])),
+                values[6],
+                values[7],
+                SFaceSet(*values[8:12])
             )
-    
+            return offset + self.smartRead.count
+
     class mystery8Template(object):
-        def read(self, wmb_fp):
-            vectors = [vector4(), vector4(), vector4(), None]
-            vectors[0].read(wmb_fp)
-            vectors[1].read(wmb_fp)
-            vectors[2].read(wmb_fp)
-            vectors[3] = SVector3(read_vector3(wmb_fp))
-            chunk1_ind = read_uint32(wmb_fp)
-            mysteryBX = read_float(wmb_fp)
-            mysteryBY = read_float(wmb_fp)
-            mysteryC = read_int16(wmb_fp)
-            mysteryD = read_int16(wmb_fp)
-            mysteryE = read_uint32(wmb_fp)
-            chunk7_ind = read_uint32(wmb_fp)
-            mysteryG = read_uint32(wmb_fp)
-            
+        smartRead = SmartIO.makeFormat(
+            SmartIO.float * 12, # three vector4s
+            SmartIO.float * 3,  # one vector3
+            SmartIO.uint32,     # chunk1_ind
+            SmartIO.float * 2,  # mysteryBX, mysteryBY
+            SmartIO.int16 * 2,  # mysteryC, mysteryD
+            SmartIO.uint32,     # mysteryE
+            SmartIO.uint32,     # chunk7_ind
+            SmartIO.uint32      # mysteryG
+        )
+        def read(self, wmb_view, offset):
+            values = self.smartRead.read_from(wmb_view, offset)
+            vectors = [vector4(*values[0:4]), vector4(*values[4:8]), vector4(*values[8:12]), SVector3(list(values[12:15]))]
+            chunk1_ind, \
+            mysteryBX, mysteryBY, \
+            mysteryC, mysteryD, \
+            mysteryE, chunk7_ind, mysteryG \
+            = values[15:]
+
             self.data = Slice8Data(
                 vectors[0],
                 vectors[1],
@@ -678,58 +713,53 @@ class wmb4_mystery(object):
                 chunk7_ind,
                 mysteryG
             )
-    
+            return offset + self.smartRead.count
+
     class mystery9Template(object):
-        def read(self, wmb_fp):
-            mysteryA = read_int16(wmb_fp)
-            mysteryParent = read_int16(wmb_fp)
-            chunk8_ind = read_int16(wmb_fp)
-            mysteryD = read_int16(wmb_fp)
-            mysteryE = read_uint32(wmb_fp)
-            
+        smartRead = SmartIO.makeFormat(SmartIO.int16 * 4, SmartIO.uint32)
+        def read(self, wmb_view, offset):
+            mysteryA, mysteryParent, chunk8_ind, mysteryD, mysteryE = self.smartRead.read_from(wmb_view, offset)
+
             self.data = Slice9Data(
                 mysteryA, mysteryParent,
                 chunk8_ind, mysteryD,
                 mysteryE
             )
-    
-    def read(self, wmb_fp):
-        self.mystery1Pointer = read_uint32(wmb_fp)
-        self.mystery1Count = read_uint32(wmb_fp)
-        self.mystery2Pointer = read_uint32(wmb_fp)
-        self.mystery2Count = read_uint32(wmb_fp)
-        self.mystery3Pointer = read_uint32(wmb_fp)
-        self.mystery3Count = read_uint32(wmb_fp)
-        self.mystery4Pointer = read_uint32(wmb_fp)
-        self.mystery4Count = read_uint32(wmb_fp)
-        self.mystery5Pointer = read_uint32(wmb_fp)
-        self.mystery5Count = read_uint32(wmb_fp)
-        self.mystery6Pointer = read_uint32(wmb_fp)
-        self.mystery6Count = read_uint32(wmb_fp)
-        self.mystery7Pointer = read_uint32(wmb_fp)
-        self.mystery7Count = read_uint32(wmb_fp)
-        self.mystery8Pointer = read_uint32(wmb_fp)
-        self.mystery8Count = read_uint32(wmb_fp)
-        self.mystery9Pointer = read_uint32(wmb_fp)
-        self.mystery9Count = read_uint32(wmb_fp)
-        
-        self.mystery1 = load_data_array(wmb_fp, self.mystery1Pointer, self.mystery1Count, self.mystery1Template)
-        self.mystery2 = load_data_array(wmb_fp, self.mystery2Pointer, self.mystery2Count, self.mystery2Template)
-        self.mystery3 = load_data_array(wmb_fp, self.mystery3Pointer, self.mystery3Count, self.mystery3Template)
-        self.mystery4 = load_data_array(wmb_fp, self.mystery4Pointer, self.mystery4Count, self.mystery4Template)
-        self.mystery5 = load_data_array(wmb_fp, self.mystery5Pointer, self.mystery5Count, self.mystery5Template)
-        self.mystery6 = load_data_array(wmb_fp, self.mystery6Pointer, self.mystery6Count, self.mystery6Template)
-        self.mystery7 = load_data_array(wmb_fp, self.mystery7Pointer, self.mystery7Count, self.mystery7Template)
-        self.mystery8 = load_data_array(wmb_fp, self.mystery8Pointer, self.mystery8Count, self.mystery8Template)
-        self.mystery9 = load_data_array(wmb_fp, self.mystery9Pointer, self.mystery9Count, self.mystery9Template)
+            return offset + self.smartRead.count
+
+    def read(self, wmb_view, offset):
+        self.mystery1Pointer, self.mystery1Count, \
+        self.mystery2Pointer, self.mystery2Count, \
+        self.mystery3Pointer, self.mystery3Count, \
+        self.mystery4Pointer, self.mystery4Count, \
+        self.mystery5Pointer, self.mystery5Count, \
+        self.mystery6Pointer, self.mystery6Count, \
+        self.mystery7Pointer, self.mystery7Count, \
+        self.mystery8Pointer, self.mystery8Count, \
+        self.mystery9Pointer, self.mystery9Count \
+        = wmb_view.array(SmartIO.uint32, offset, 18)
+
+        self.mystery1 = load_data_array(wmb_view, self.mystery1Pointer, self.mystery1Count, self.mystery1Template)
+        self.mystery2 = load_data_array(wmb_view, self.mystery2Pointer, self.mystery2Count, self.mystery2Template)
+        self.mystery3 = load_data_array(wmb_view, self.mystery3Pointer, self.mystery3Count, self.mystery3Template)
+        self.mystery4 = load_data_array(wmb_view, self.mystery4Pointer, self.mystery4Count, self.mystery4Template)
+        self.mystery5 = load_data_array(wmb_view, self.mystery5Pointer, self.mystery5Count, self.mystery5Template)
+        self.mystery6 = load_data_array(wmb_view, self.mystery6Pointer, self.mystery6Count, self.mystery6Template)
+        self.mystery7 = load_data_array(wmb_view, self.mystery7Pointer, self.mystery7Count, self.mystery7Template)
+        self.mystery8 = load_data_array(wmb_view, self.mystery8Pointer, self.mystery8Count, self.mystery8Template)
+        self.mystery9 = load_data_array(wmb_view, self.mystery9Pointer, self.mystery9Count, self.mystery9Template)
+        return offset + 18 * 4
 
 class vector4(object):
     """originally used only for paramFunc, moved for mystery chunk"""
-    def read(self, wmb_fp):
-        self.x = read_float(wmb_fp)
-        self.y = read_float(wmb_fp)
-        self.z = read_float(wmb_fp)
-        self.w = read_float(wmb_fp)
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.w = w
+    def read(self, wmb_view, offset):
+        self.x, self.y, self.z, self.w = wmb_view.array(SmartIO.float, offset, 4)
+        return offset + 16
 
 class int16(object):
     """
@@ -737,10 +767,12 @@ class int16(object):
     returning to original location via load_data
     """
     type = "int"
+    format = SmartIO.int16
     def __init__(self):
         self.val = 0
-    def read(self, wmb_fp):
-        self.val = read_int16(wmb_fp)
+    def read(self, wmb_view, offset):
+        self.val = wmb_view.int16(offset)
+        return offset + 2
 
 class uint16(object):
     """
@@ -748,10 +780,12 @@ class uint16(object):
     returning to original location via load_data
     """
     type = "int"
+    format = SmartIO.uint16
     def __init__(self):
         self.val = 0
-    def read(self, wmb_fp):
-        self.val = read_uint16(wmb_fp)
+    def read(self, wmb_view, offset):
+        self.val = wmb_view.uint16(offset)
+        return offset + 2
 
 class uint8(object):
     """
@@ -759,10 +793,12 @@ class uint8(object):
     returning to original location via load_data
     """
     type = "int"
+    format = SmartIO.uint8
     def __init__(self):
         self.val = 0
-    def read(self, wmb_fp):
-        self.val = read_uint8(wmb_fp)
+    def read(self, wmb_view, offset):
+        self.val = wmb_view.uint8(offset)
+        return offset + 1
 
 class uint32(object):
     """
@@ -770,10 +806,12 @@ class uint32(object):
     returning to original location via load_data
     """
     type = "int"
+    format = SmartIO.uint32
     def __init__(self):
         self.val = 0
-    def read(self, wmb_fp):
-        self.val = read_uint32(wmb_fp)
+    def read(self, wmb_view, offset):
+        self.val = wmb_view.uint32(offset)
+        return offset + 4
 
 class filestring(object):
     """
@@ -783,20 +821,20 @@ class filestring(object):
     type = "string"
     def __init__(self):
         self.val = ""
-    def read(self, wmb_fp):
-        self.val = read_string(wmb_fp)
+    def read(self, wmb_view, offset):
+        self.val = wmb_view.string(offset)
+        return offset + len(self.val.encode("utf-8")) + 1
 
 class WMB(object):
     """docstring for WMB"""
     def __init__(self, wmb_file, only_extract):
         super(WMB, self).__init__()
-        wmb_fp = 0
         wta_fp = 0
         wtp_fp = 0
         self.wta = 0
 
         wmb_path = wmb_file
-        if not os.path.exists(wmb_path):
+        if not dat_unpacker.exists(wmb_path):
             wmb_path = wmb_file.replace('.dat','.dtt')
         wtp_path = wmb_file.replace('.dat','.dtt').replace('.wmb','.wtp')
         wta_path = wmb_file.replace('.dtt','.dat').replace('.wmb','.wta')
@@ -812,9 +850,9 @@ class WMB(object):
             # wtb is both wtp and wta
             wtp_path = os.path.join(split_path[0], "%s.dtt" % datdttname, "%sscr.wtb" % datdttname)
             wta_path = wtp_path
-            if os.path.exists(wtp_path.replace('scr.wtb', 'cmn.wtb')):
+            if dat_unpacker.exists(wtp_path.replace('scr.wtb', 'cmn.wtb')):
                 print("Loading %s..." % wtp_path.replace('scr.wtb', 'cmn.wtb'))
-                wtb_fp = open(wtp_path.replace('scr.wtb', 'cmn.wtb'), 'rb')
+                wtb_fp = dat_unpacker.open_file(wtp_path.replace('scr.wtb', 'cmn.wtb'))
                 wtb = WTA(wtb_fp)
 
                 wmbname = os.path.split(wmb_file)[-1]
@@ -842,43 +880,44 @@ class WMB(object):
                         bpy.data.images.load(texture_filepath)
 
 
-        if os.path.exists(wtp_path):
+        if dat_unpacker.exists(wtp_path):
             print('open wtp file')
-            self.wtp_fp = open(wtp_path,'rb')
-        if os.path.exists(wta_path):
+            self.wtp_fp = dat_unpacker.open_file(wtp_path)
+        if dat_unpacker.exists(wta_path):
             print('open wta file')
-            wta_fp = open(wta_path,'rb')
+            wta_fp = dat_unpacker.open_file(wta_path)
         
         self.wta = None
         if wta_fp:
             self.wta = WTA(wta_fp)
             wta_fp.close()
         
-        if os.path.exists(wmb_path):
+        if dat_unpacker.exists(wmb_path):
             print('open wmb file:', wmb_path)
-            wmb_fp = open(wmb_path, "rb")
+            wmb_view = dat_unpacker.open_file(wmb_path) # straight from a mounted DAT/DTT if there is one
         else:
             print("DTT/DAT does not contain WMB file.")
             print("Last attempted path:", wmb_path)
             return
-        
-        
-        
-        self.wmb_header = WMB_Header(wmb_fp)
+        with wmb_view:
+            self.read(wmb_view, scr_mode, wmbinscr_name)
+
+    def read(self, wmb_view, scr_mode, wmbinscr_name):
+        self.wmb_header = WMB_Header(wmb_view)
 
         if self.wmb_header.magicNumber == b'WMB4':
-            self.vertexGroupArray = load_data_array(wmb_fp, self.wmb_header.vertexGroupPointer, self.wmb_header.vertexGroupCount, wmb4_vertexGroup, self.wmb_header.vertexFormat)
+            self.vertexGroupArray = load_data_array(wmb_view, self.wmb_header.vertexGroupPointer, self.wmb_header.vertexGroupCount, wmb4_vertexGroup, self.wmb_header.vertexFormat)
             
             if DEBUG_BATCHES_PRINT:
                 print()
                 print("Batches:")
                 print("vertexGroup vertexRange indexRange")
-            self.batchArray = load_data_array(wmb_fp, self.wmb_header.batchPointer, self.wmb_header.batchCount, wmb4_batch)
+            self.batchArray = load_data_array(wmb_view, self.wmb_header.batchPointer, self.wmb_header.batchCount, wmb4_batch)
             
             if DEBUG_BATCHSUPPLEMENT_PRINT:
                 print()
                 print("Batch supplement data:")
-            self.batchDescription = load_data(wmb_fp, self.wmb_header.batchDescriptionPointer, wmb4_batchDescription)
+            self.batchDescription = load_data(wmb_view, self.wmb_header.batchDescriptionPointer, wmb4_batchDescription)
             self.batchDataArray = []
             for batchDataSubgroup in self.batchDescription.batchData:
                 self.batchDataArray.extend(batchDataSubgroup)
@@ -894,12 +933,12 @@ class WMB(object):
                 print("Bones?", self.hasBone)
                 if self.hasBone:
                     print("Enjoy the debug bone data:")
-            self.boneArray = load_data_array(wmb_fp, self.wmb_header.bonePointer, self.wmb_header.boneCount, wmb4_bone, None, True)
+            self.boneArray = load_data_array(wmb_view, self.wmb_header.bonePointer, self.wmb_header.boneCount, wmb4_bone, None, True)
             
             if DEBUG_BITT_PRINT:
                 print()
                 print("The boneIndexTranslateTable? I got no debug info besides what's in the header.")
-            boneTranslateTable = load_data(wmb_fp, self.wmb_header.boneTranslateTablePointer, wmb4_boneTranslateTable)
+            boneTranslateTable = load_data(wmb_view, self.wmb_header.boneTranslateTablePointer, wmb4_boneTranslateTable)
             if boneTranslateTable is not None:
                 self.firstLevel = boneTranslateTable.firstLevel
                 self.secondLevel = boneTranslateTable.secondLevel
@@ -908,7 +947,7 @@ class WMB(object):
             if DEBUG_BONESET_PRINT:
                 print()
                 print("Bonesets:")
-            boneSetArrayTrue = load_data_array(wmb_fp, self.wmb_header.boneSetPointer, self.wmb_header.boneSetCount, wmb4_boneSet)
+            boneSetArrayTrue = load_data_array(wmb_view, self.wmb_header.boneSetPointer, self.wmb_header.boneSetCount, wmb4_boneSet)
             # is this cheating
             self.boneSetArray = [item.boneSet for item in boneSetArrayTrue]
             #print(self.boneSetArray)
@@ -916,19 +955,19 @@ class WMB(object):
             if DEBUG_MATERIAL_PRINT:
                 print()
                 print("Material info:")
-            self.materialArray = load_data_array(wmb_fp, self.wmb_header.materialPointer, self.wmb_header.materialCount, wmb4_material)
+            self.materialArray = load_data_array(wmb_view, self.wmb_header.materialPointer, self.wmb_header.materialCount, wmb4_material)
             
             if DEBUG_TEXTURE_PRINT:
                 print()
                 print("Just have the textures array if you care so bad")
-            self.textureArray = load_data_array(wmb_fp, self.wmb_header.texturePointer, self.wmb_header.textureCount, wmb4_texture)
+            self.textureArray = load_data_array(wmb_view, self.wmb_header.texturePointer, self.wmb_header.textureCount, wmb4_texture)
             if DEBUG_TEXTURE_PRINT:
                 print("\n".join([str([item.id, hex(item.flags)]) for item in self.textureArray]))
             
             if DEBUG_MESH_PRINT:
                 print()
                 print("Meshes (batches separated by batchGroup, naturally):")
-            self.meshArray = load_data_array(wmb_fp, self.wmb_header.meshPointer, self.wmb_header.meshCount, wmb4_mesh, [scr_mode, wmbinscr_name])
+            self.meshArray = load_data_array(wmb_view, self.wmb_header.meshPointer, self.wmb_header.meshCount, wmb4_mesh, [scr_mode, wmbinscr_name])
             
             for mesh in self.meshArray:
                 for materialIndex, material in enumerate(mesh.materials):
@@ -940,7 +979,7 @@ class WMB(object):
                     self.meshArray[0].materials.append(materialIndex)
                     self.materialArray[materialIndex].materialName = self.meshArray[0].name + "-x-%d" % materialIndex
             
-            self.mystery = load_data(wmb_fp, self.wmb_header.unknownPointer, wmb4_mystery)
+            self.mystery = load_data(wmb_view, self.wmb_header.unknownPointer, wmb4_mystery)
             
             self.boneMap = None # <trollface>
             self.hasColTreeNodes = False # maybe this could be before the version check
@@ -955,146 +994,118 @@ class WMB(object):
     def clear_unused_vertex(self, meshArrayIndex,vertexGroupIndex, wmb4=False):
         mesh = self.meshArray[meshArrayIndex]
         vertexGroup = self.vertexGroupArray[vertexGroupIndex]
-        
+
         faceRawStart = mesh.faceStart
         faceRawCount = mesh.faceCount
         vertexStart = mesh.vertexStart
         vertexCount = mesh.vertexCount
 
-        vertexesExData = vertexGroup.vertexesExDataArray[vertexStart : vertexStart + vertexCount]
-
-        vertex_colors = []
-        
-        facesRaw = vertexGroup.faceRawArray[faceRawStart : faceRawStart + faceRawCount ]
+        facesRaw = np.asarray(vertexGroup.faceRawArray[faceRawStart : faceRawStart + faceRawCount], dtype=np.int64)
         if len(facesRaw) < faceRawCount:
             faceRawCount = len(facesRaw)
             print("\n\n===== ERROR: Insufficient faces found in faceRawArray, reducing faceCount to match =====\n\n")
+        faceRawCount -= faceRawCount % 3
+        facesRaw = facesRaw[:faceRawCount]
         if not wmb4:
-            facesRaw = [index - 1 for index in facesRaw]
-        usedVertexIndexArray = sorted(list(set(facesRaw))) # oneliner to remove duplicates
-        
+            facesRaw = facesRaw - 1
+        # sorted used vertices, plus every face index remapped into them
+        usedVertexIndexArray, facesRaw = np.unique(facesRaw, return_inverse=True)
+
         """
         print("Vertex group index:", vertexGroupIndex, "Face first index:", faceRawStart, "Face last index:", faceRawStart+faceRawCount)
-        print("Faces range from %d to %d" % (min(facesRaw), max(facesRaw)))
-        print([("[" if i%3==0 else "") + str(face).rjust(3, " ") + ("]" if i%3==2 else "") for i, face in enumerate(facesRaw)])
+        print("Faces range from %d to %d" % (facesRaw.min(), facesRaw.max()))
         """
-        # mappingDict is the reverse lookup for usedVertexIndexArray
-        mappingDict = {}
-        for newIndex, vertid in enumerate(usedVertexIndexArray):
-            mappingDict[vertid] = newIndex
-        #print(mappingDict)
-        # After this loop, facesRaw now points to indexes in usedVertices (below)
-        for i, vertex in enumerate(facesRaw):
-            facesRaw[i] = mappingDict[vertex]
-        faces = [0] * (faceRawCount // 3)
-        usedVertices = [None] * len(usedVertexIndexArray)
-        usedNormals = [None] * len(usedVertexIndexArray)
-        boneWeightInfos = [[],[]]
-        #print("Iterating over 0, faceRawCount, 3, length %d" % 0, faceRawCount, 3)
-        for i in range(0, faceRawCount, 3):
-            faces[i // 3] = ( facesRaw[i + 2], facesRaw[i + 1], facesRaw[i] )
-        meshVertices = vertexGroup.vertexArray[vertexStart : vertexStart + vertexCount]
+        faces = facesRaw.reshape(-1, 3)[:, ::-1] # flip winding
+        meshVertices = vertexGroup.vertexArrays[vertexStart : vertexStart + vertexCount]
+        usedVertices = meshVertices.positions[usedVertexIndexArray]
+        usedNormals = meshVertices.normals[usedVertexIndexArray]
+
+        vertex_colors = []
+        # Vertex_Colors are stored in VertexData or VertexExData, both end up in the same arrays
+        if vertexGroup.vertexFlags in {4, 5, 12, 14} or (wmb4 and self.wmb_header.vertexFormat in {0x10307, 0x10107}) or \
+           vertexGroup.vertexFlags in {10, 11} or (wmb4 and self.wmb_header.vertexFormat in {0x10337, 0x10137, 0x00337}):
+            vertex_colors = meshVertices.colors[usedVertexIndexArray]
 
+        boneWeightInfos = [[],[]]
         if self.hasBone:
-            boneWeightInfos = [0] * len(usedVertexIndexArray)
-        for newIndex, i in enumerate(usedVertexIndexArray):
-            usedVertices[newIndex] = (meshVertices[i].positionX, meshVertices[i].positionY, meshVertices[i].positionZ)
-            usedNormals[newIndex] = (meshVertices[i].normalX, meshVertices[i].normalY, meshVertices[i].normalZ)
-
-            # Vertex_Colors are stored in VertexData
-            if vertexGroup.vertexFlags in {4, 5, 12, 14} or (wmb4 and self.wmb_header.vertexFormat in {0x10307, 0x10107}):
-                vertex_colors.append(meshVertices[i].color)
-            # Vertex_Colors are stored in VertexExData
-            if vertexGroup.vertexFlags in {10, 11} or (wmb4 and self.wmb_header.vertexFormat in {0x10337, 0x10137, 0x00337}):
-                vertex_colors.append(vertexesExData[i].color)
-
-            if self.hasBone:
-                bonesetIndex = mesh.bonesetIndex
-                if bonesetIndex != -1:
-                    boneSet = self.boneSetArray[bonesetIndex]
-                    if not wmb4:
-                        boneIndices = [self.boneMap[boneSet[index]] for index in meshVertices[i].boneIndices]
-                    else:
-                        #boneIndices = meshVertices[i].boneIndices
-                        # this is really rather obvious
-                        try:
-                            boneIndices = [boneSet[index] for index in meshVertices[i].boneIndices]
-                        except:
-                            print()
-                            print("Hey! Something's wrong with the bone set. The mesh %s has these bone indices:" % mesh.name)
-                            #print([vertexes.boneIndices for vertexes in meshVertices])
-                            print("...nevermind that's way too much to print")
-                            print("(They go up to %d)" % max([max(vertexes.boneIndices) for vertexes in meshVertices]))
-                            print("But the bone set (#%d) only has %d bones." % (bonesetIndex, len(boneSet)))
-                            print("How terrible! Time to crash.\n")
-                            assert False # See console above about missing boneset elements
-                    boneWeightInfos[newIndex] = [boneIndices, meshVertices[i].boneWeights]
-                    s = sum(meshVertices[i].boneWeights)
-                    if s > 1.000000001 or s < 0.999999:
-                        print('[-] error weight detect %f' % s)
-                        print(meshVertices[i].boneWeights) 
-                else:
-                    self.hasBone = False
+            bonesetIndex = mesh.bonesetIndex
+            if bonesetIndex != -1 and vertexGroup.vertexArrays.boneIndices is not None:
+                boneSet = np.asarray(self.boneSetArray[bonesetIndex])
+                localIndices = meshVertices.boneIndices[usedVertexIndexArray]
+                if localIndices.size > 0 and localIndices.max() >= len(boneSet):
+                    print()
+                    print("Hey! Something's wrong with the bone set. The mesh %s has these bone indices:" % mesh.name)
+                    print("...nevermind that's way too much to print")
+                    print("(They go up to %d)" % meshVertices.boneIndices.max())
+                    print("But the bone set (#%d) only has %d bones." % (bonesetIndex, len(boneSet)))
+                    print("How terrible! Time to crash.\n")
+                    assert False # See console above about missing boneset elements
+                boneIndices = boneSet[localIndices]
+                if not wmb4:
+                    boneIndices = np.asarray(self.boneMap)[boneIndices]
+                boneWeights = meshVertices.boneWeights[usedVertexIndexArray]
+                boneWeightInfos = [list(info) for info in zip(boneIndices.tolist(), boneWeights.tolist())]
+                sums = boneWeights.sum(axis=1)
+                for i in np.flatnonzero((sums > 1.000000001) | (sums < 0.999999)):
+                    print('[-] error weight detect %f' % sums[i])
+                    print(boneWeights[i].tolist())
+            elif len(usedVertexIndexArray) > 0:
+                self.hasBone = False
         if wmb4:
             return usedVertices, faces, usedVertexIndexArray, boneWeightInfos, vertex_colors, vertexStart, vertexCount, usedNormals
         return usedVertices, faces, usedVertexIndexArray, boneWeightInfos, vertex_colors, vertexStart
 
-def load_data(wmb_fp, pointer, chunkClass, other=None):
-    pos = wmb_fp.tell()
+def load_data(wmb_view, pointer, chunkClass, other=None):
+    # every chunk reads at an absolute offset, nothing to seek back to
     final = None
     if pointer > 0:
-        wmb_fp.seek(pointer)
-        #print("Seeking to %sPointer: %s" % (chunkClass.__name__, hex(pointer)))
+        #print("Reading %s at: %s" % (chunkClass.__name__, hex(pointer)))
+        if chunkClass is filestring:
+            return wmb_view.string(pointer)
         final = chunkClass()
         if other is not None:
-            final.read(wmb_fp, other)
+            final.read(wmb_view, pointer, other)
         else:
-            final.read(wmb_fp)
-        wmb_fp.seek(pos)
+            final.read(wmb_view, pointer)
         if "type" in chunkClass.__dict__ and chunkClass.type in {"int", "string"}:
             return final.val
     return final
 
-def load_data_array(wmb_fp, pointer, count, chunkClass, other=None, useIndex=False):
+def load_data_array(wmb_view, pointer, count, chunkClass, other=None, useIndex=False):
     array = []
-    pos = wmb_fp.tell()
     if pointer > 0:
-        wmb_fp.seek(pointer)
-        #print("Seeking to %sPointer: %s" % (chunkClass.__name__, hex(pointer)))
-        
-        # putting the for in the if is, uh, maybe optimized idk
+        #print("Reading %s at: %s" % (chunkClass.__name__, hex(pointer)))
+        if "type" in chunkClass.__dict__ and chunkClass.type == "int":
+            # plain numbers, one unpack for the whole run
+            return list(wmb_view.array(chunkClass.format, pointer, count))
+
+        # each read returns the offset just past its item
+        offset = pointer
         if other is not None:
             #print("Iterating over %sCount, length %d" % (chunkClass.__name__, count))
             for itemIndex in range(count):
-                #print("This could be a print. %d" % itemIndex)
                 item = chunkClass()
-                item.read(wmb_fp, other)
-                if "type" in chunkClass.__dict__ and chunkClass.type in {"int", "string"}:
-                    item = item.val
+                offset = item.read(wmb_view, offset, other)
                 array.append(item)
         elif useIndex:
             #print("Iterating over %sCount, length %d" % (chunkClass.__name__, count))
             for itemIndex in range(count):
-                #print("This could be a print. %d" % itemIndex)
                 item = chunkClass()
-                item.read(wmb_fp, itemIndex)
-                if "type" in chunkClass.__dict__ and chunkClass.type in {"int", "string"}:
-                    item = item.val
+                offset = item.read(wmb_view, offset, itemIndex)
                 array.append(item)
         else:
             #print("Iterating over %sCount, length %d" % (chunkClass.__name__, count))
             for itemIndex in range(count):
-                #print("This could be a print. %d" % itemIndex)
                 item = chunkClass()
-                item.read(wmb_fp)
-                if "type" in chunkClass.__dict__ and chunkClass.type in {"int", "string"}:
+                offset = item.read(wmb_view, offset)
+                if "type" in chunkClass.__dict__ and chunkClass.type == "string":
                     item = item.val
                 array.append(item)
-        wmb_fp.seek(pos)
-        #print("Seeking to return position: %s" % hex(pos))
     return array
 
 
+
+
 def export_obj(wmb, wta, wtp_fp, obj_file):
     if not obj_file:
         obj_file = 'test'
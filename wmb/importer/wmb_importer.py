@@ -3,6 +3,8 @@ from time import time
 import bpy
 import bmesh
 import math
+import numpy as np
+from contextlib import contextmanager
 from typing import List, Tuple
 from mathutils import Vector, Matrix
 from .bonenames import wmb4_bonenames
@@ -31,6 +33,50 @@ def reset_blend():
         bpy.data.objects.remove(obj)
         obj.user_clear()
 
+class ImportNameRegistry:
+    """
+    Object count per base name, where the base is the name minus its last
+    "-N" when it has more than one hyphen. Filled from bpy.data.objects once,
+    then kept up to date as meshes are created, so naming is O(1).
+    """
+    def __init__(self):
+        self.counts = None
+
+    @staticmethod
+    def base_name(name):
+        parts = name.split("-")
+        if len(parts) > 2:
+            parts.pop()
+            return "-".join(parts) # i love loose typing
+        return name
+
+    def next_name(self, base):
+        if self.counts is None:
+            self.counts = {}
+            for obj in bpy.data.objects:
+                self.register(obj.name)
+        return "%s-%d" % (base, self.counts.get(base, 0))
+
+    def register(self, name):
+        if self.counts is not None:
+            base = self.base_name(name)
+            self.counts[base] = self.counts.get(base, 0) + 1
+
+_nameRegistry = None
+
+@contextmanager
+def import_session():
+    """Share one ImportNameRegistry between every main() call of an import."""
+    global _nameRegistry
+    if _nameRegistry is not None: # nested, the outer session owns it
+        yield _nameRegistry
+        return
+    _nameRegistry = ImportNameRegistry()
+    try:
+        yield _nameRegistry
+    finally:
+        _nameRegistry = None
+
 def construct_armature(name, bone_data_array, firstLevel, secondLevel, thirdLevel, boneMap, boneSetArray, collection_name, transform=None):            # bone_data =[boneIndex, boneName, parentIndex, parentName, bone_pos, optional, boneNumber, localPos, local_rotation, world_rotation, world_position_tpose]
     print('[+] importing armature')
     amt = bpy.data.armatures.new(name +'Amt')
@@ -82,22 +128,31 @@ def construct_armature(name, bone_data_array, firstLevel, secondLevel, thirdLeve
                     bone.parent.tail += Vector((0, 0.01, 0))
     
     # mot posing stuff
-    bpy.ops.object.mode_set(mode='POSE')
-
-    for pose_bone in ob.pose.bones:
-        #print("Posing", pose_bone.name)
-        rot_mat = Matrix.Rotation(pose_bone.bone["localRotation"][2], 4, 'Z') @ Matrix.Rotation(pose_bone.bone["localRotation"][1], 4, 'Y') @ Matrix.Rotation(pose_bone.bone["localRotation"][0], 4, 'X')
-
-        pose_bone.matrix_basis = rot_mat @ pose_bone.matrix_basis
-        bpy.context.view_layer.update()
-
-    bpy.ops.pose.armature_apply()
+    # the localRotation pose used to be applied one bone at a time in pose mode,
+    # baked with armature_apply, then undone again. Same result, straight from the
+    # edit bone matrices: posed = posedParent @ (restParent^-1 @ rest) @ localRotation
+    rotations = {bone_data[1]: local_rotation_matrix(bone_data[8]) for bone_data in bone_data_array}
+    parents = {bone_data[1]: bone_data[3] for bone_data in bone_data_array if bone_data[2] != -1}
+    rests = {bone.name: bone.matrix.copy() for bone in bones}
+    posed = {}
+    for name in rotations:
+        chain = [name]
+        while chain[-1] in parents and chain[-1] not in posed:
+            chain.append(parents[chain[-1]])
+        for boneName in reversed(chain):
+            if boneName in posed:
+                continue
+            if boneName in parents:
+                parentName = parents[boneName]
+                posed[boneName] = posed[parentName] @ rests[parentName].inverted() @ rests[boneName] @ rotations[boneName]
+            else:
+                posed[boneName] = rests[boneName] @ rotations[boneName]
+    for name, matrix in posed.items():
+        bones[name].matrix = matrix
 
+    bpy.ops.object.mode_set(mode='OBJECT')
     for pose_bone in ob.pose.bones:
-        rot_mat = Matrix.Rotation(pose_bone.bone["localRotation"][2], 4, 'Z') @ Matrix.Rotation(pose_bone.bone["localRotation"][1], 4, 'Y') @ Matrix.Rotation(pose_bone.bone["localRotation"][0], 4, 'X')
-
-        pose_bone.matrix_basis = rot_mat.inverted() @ pose_bone.matrix_basis
-        bpy.context.view_layer.update()
+        pose_bone.matrix_basis = rotations[pose_bone.name].inverted()
     
     #for bone in amt.edit_bones:
     #    if bone.tail == bone.head + Vector((0, 0.01, 0)):
@@ -108,7 +163,6 @@ def construct_armature(name, bone_data_array, firstLevel, secondLevel, thirdLeve
     #    if bone_data[6] > len(bones):
     #        bones[bone_data[1]].name = "fakeBone%d" % bone_data[6]
     
-    bpy.ops.object.mode_set(mode='OBJECT')
     ob.rotation_euler = (math.radians(90),0,0)
     if transform is not None:
         ob.location = Vector((transform[0], -transform[2], transform[1]))
@@ -118,6 +172,9 @@ def construct_armature(name, bone_data_array, firstLevel, secondLevel, thirdLeve
     # split armature
     return ob
 
+def local_rotation_matrix(localRotation):
+    return Matrix.Rotation(localRotation[2], 4, 'Z') @ Matrix.Rotation(localRotation[1], 4, 'Y') @ Matrix.Rotation(localRotation[0], 4, 'X')
+
 def split_armature(name):
     amt = bpy.data.armatures[name]
     name = name.replace('Amt','')
@@ -151,74 +208,122 @@ def copy_bone_tree(source_root, target_amt):
     for child in source_root.children:
         copy_bone_tree(child, target_amt)
 
-def construct_mesh(mesh_data, collection_name):
+def fill_mesh(objmesh, vertices, faces):
+    """from_pydata for triangles, but straight from (n, 3) arrays."""
+    loop_count = faces.size
+    objmesh.vertices.add(len(vertices))
+    objmesh.vertices.foreach_set("co", vertices.ravel())
+    objmesh.loops.add(loop_count)
+    objmesh.loops.foreach_set("vertex_index", faces.ravel())
+    objmesh.polygons.add(len(faces))
+    objmesh.polygons.foreach_set("loop_start", np.arange(0, loop_count, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0):
+        objmesh.polygons.foreach_set("loop_total", np.full(len(faces), 3, dtype=np.int32))
+    if hasattr(objmesh, "shade_flat"): # from_pydata shades flat too
+        objmesh.shade_flat()
+    objmesh.update(calc_edges=True)
+
+def final_bone_names(boneArray):
+    """
+    Bone index -> the name its bone and vertex groups are created with,
+    descriptive where wmb4_bonenames knows the ID, "bone<ID>" otherwise.
+    """
+    boneNames = {}
+    usedNames = set()
+    for bone in boneArray:
+        name = wmb4_bonenames.get(bone.boneNumber, "bone%d" % bone.boneNumber)
+        if name in usedNames: # same suffixes Blender would have added
+            suffix = 1
+            while "%s.%03d" % (name, suffix) in usedNames:
+                suffix += 1
+            name = "%s.%03d" % (name, suffix)
+        usedNames.add(name)
+        boneNames[bone.boneIndex] = name
+    return boneNames
+
+def bone_name(boneNames, boneIndex):
+    if boneNames is not None and boneIndex in boneNames:
+        return boneNames[boneIndex]
+    return "bone%d" % boneIndex
+
+def assign_vertex_weights(obj, boneIndices, boneWeights, boneNames=None):
+    """
+    Vertex groups from (n, 4) bone indices and weights. Influences are grouped
+    by (bone, weight) so every group only gets one add() per distinct weight.
+    """
+    groups = {}
+    for boneIndex in np.unique(boneIndices).tolist():
+        groups[boneIndex] = bone_name(boneNames, boneIndex)
+    for boneIndex, group_name in sorted(groups.items(), key=lambda item: item[1]):
+        groups[boneIndex] = obj.vertex_groups.new(name=group_name)
+
+    vertex = np.repeat(np.arange(len(boneIndices)), boneIndices.shape[1])
+    bone = boneIndices.ravel()
+    weight = boneWeights.ravel()
+    used = weight != 0
+    vertex, bone, weight = vertex[used], bone[used], weight[used]
+    if len(vertex) == 0:
+        return
+
+    # one influence at a time with REPLACE let the last one win if a bone was listed twice
+    key = vertex.astype(np.int64) * (int(bone.max()) + 1) + bone
+    _, lastReversed = np.unique(key[::-1], return_index=True)
+    keep = len(key) - 1 - lastReversed
+    vertex, bone, weight = vertex[keep], bone[keep], weight[keep]
+
+    order = np.lexsort((vertex, weight, bone))
+    vertex, bone, weight = vertex[order], bone[order], weight[order]
+    runStarts = np.flatnonzero(np.r_[True, (bone[1:] != bone[:-1]) | (weight[1:] != weight[:-1])])
+    runEnds = np.r_[runStarts[1:], len(vertex)]
+    for start, end in zip(runStarts.tolist(), runEnds.tolist()):
+        groups[int(bone[start])].add(vertex[start:end].tolist(), float(weight[start]), "REPLACE")
+
+def construct_mesh(mesh_data, collection_name, boneNames=None, referenceBoneName=None):
     # [meshName, vertices, faces, has_bone,
     #  boneWeightInfoArray, boneSetIndex, meshGroupIndex, vertex_colors,
     #  LOD_name, LOD_level, colTreeNodeIndex, unknownWorldDataIndex,
     #  boundingBox, vertexGroupIndex, batchID?, materialArray?,
     #  boneSet?, vertexStart?, batchGroup?, wmb4_transform?,
     #  vertexCount?, normals?], collection_name
-    name = mesh_data[0]
-    matched_objs = 0
-    for obj in bpy.data.objects:
-        if len(obj.name.split("-")) > 2:
-            truename = obj.name.split("-")
-            truename.pop()
-            truename = "-".join(truename) # i love loose typing
-        else:
-            truename = obj.name
-        if truename == name:
-            matched_objs += 1
+    nameRegistry = _nameRegistry if _nameRegistry is not None else ImportNameRegistry()
     # i'd prefer to avoid the numbers when there's only one mesh, but it's
     # basically impossible to tell once the names contain hyphens
-    name += "-%d" % matched_objs
-    vertices = mesh_data[1]
-    faces = mesh_data[2]
+    name = nameRegistry.next_name(mesh_data[0])
+    vertices = np.asarray(mesh_data[1], dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(mesh_data[2], dtype=np.int32).reshape(-1, 3)
     has_bone = mesh_data[3]
     normals = mesh_data[21] if len(mesh_data) > 21 else None
     weight_infos = [[[],[]]] # A real fan can recognize me even I am a 2 dimensional array
     print("[+] importing %s" % name)
     objmesh = bpy.data.meshes.new(name)
-    if not name in bpy.data.objects.keys(): 
+    obj = bpy.data.objects.get(name)
+    if obj is None:
         obj = bpy.data.objects.new(name, objmesh)
-    else:
-        obj = bpy.data.objects[name] # what??
+        nameRegistry.register(obj.name)
+    # else what??
     obj.location = Vector((0,0,0))
     bpy.data.collections.get(collection_name).objects.link(obj)
-    objmesh.from_pydata(vertices, [], faces)
+    fill_mesh(objmesh, vertices, faces)
     if normals is not None:
-        objmesh.normals_split_custom_set_from_vertices(normals)
-    objmesh.update(calc_edges=True)
+        objmesh.normals_split_custom_set_from_vertices(np.asarray(normals, dtype=np.float32).reshape(-1, 3))
 
     if len(mesh_data[7]) != 0:
         if objmesh.vertex_colors:
             vcol_layer = objmesh.vertex_colors.active
         else:
             vcol_layer = objmesh.vertex_colors.new()
-        
-        for loop_idx, loop in enumerate(objmesh.loops):
-            meshColor = vcol_layer.data[loop_idx]
-            dataColor = mesh_data[7][loop.vertex_index]
-            meshColor.color = [
-                dataColor[0]/255,
-                dataColor[1]/255,
-                dataColor[2]/255,
-                dataColor[3]/255
-            ]
-            
+        # loops were added in face order, so faces double as loop -> vertex
+        loop_colors = np.asarray(mesh_data[7], dtype=np.float32)[faces.ravel()] / 255
+        vcol_layer.data.foreach_set("color", loop_colors.ravel())
 
     if has_bone:
-        weight_infos = mesh_data[4]
-        group_names = sorted(list(set(["bone%d" % i  for weight_info in weight_infos for i in weight_info[0]])))
-        for group_name in group_names:
-            obj.vertex_groups.new(name=group_name)
-        for i, weightinfo in enumerate(weight_infos):
-            for index in range(4):
-                group_name = "bone%d"%weightinfo[0][index]
-                weight = weightinfo[1][index]
-                group = obj.vertex_groups[group_name]
-                if weight:
-                    group.add([i], weight, "REPLACE")
+        weight_infos = np.asarray(mesh_data[4], dtype=np.float32).reshape(-1, 2, 4)
+        assign_vertex_weights(obj, weight_infos[:, 0].astype(np.int32), weight_infos[:, 1], boneNames)
+    if referenceBoneName is not None: # everything follows the reference bone
+        referenceGroup = obj.vertex_groups.get(referenceBoneName)
+        if referenceGroup is None:
+            referenceGroup = obj.vertex_groups.new(name=referenceBoneName)
+        referenceGroup.add(np.arange(len(vertices)).tolist(), 1.0, "REPLACE")
     obj.rotation_euler = (math.radians(90),0,0)
     if mesh_data[5] != "None":
         obj['boneSetIndex'] = mesh_data[5]
@@ -545,52 +650,40 @@ def add_material_to_mesh(mesh, materials , uvs):
         #print('linking material %s to mesh object %s' % (material.name, mesh.name))
         mesh.data.materials.append(material)
     bpy.context.view_layer.objects.active = mesh
-    # bpy.ops.object.mode_set(mode="EDIT")
-    # bm = bmesh.from_edit_mesh(mesh.data)
-    bm = bmesh.new()
-    bm.from_mesh(mesh.data)
-    uv_layer = bm.loops.layers.uv.new("UVMap1")
-    #bm.faces.layers.tex.verify()
-    for face in bm.faces:
-        face.material_index = 0
-        for l in face.loops:
-            #luv = l[uv_layer]
-            ind = l.vert.index
-            #print(l.vert)
-            l[uv_layer].uv = Vector(uvs[0][ind])
-    
-    for i in range(1, 5): # 0 handled above
-        if len(uvs[i]) > 0:
-            #print("Creating UV layer for", material.name)
-            
-            new_uv_layer = None
-            if i == 1:
-                new_uv_layer = bm.loops.layers.uv.new("LightMap")
-            else:
-                new_uv_layer = bm.loops.layers.uv.new("UVMap" + str(i + 1))
-            
-            for face in bm.faces:
-                face.material_index = 0
-                for l in face.loops:
-                    #luv = l[new_uv_layer]
-                    ind = l.vert.index
-                    #print(ind)
-                    l[new_uv_layer].uv = Vector(uvs[i][ind])
+    # every face keeps material_index 0, new polygons already have it
+    loop_vertices = np.empty(len(mesh.data.loops), dtype=np.int32)
+    mesh.data.loops.foreach_get("vertex_index", loop_vertices)
+
+    for i in range(5):
+        if i > 0 and len(uvs[i]) == 0:
+            continue # 0 is always there
+        if i == 0:
+            uv_layer = mesh.data.uv_layers.new(name="UVMap1")
+        elif i == 1:
+            uv_layer = mesh.data.uv_layers.new(name="LightMap")
         else:
-            pass#print("Weird, no UV[%d] for %s" % (i, material.name))
+            uv_layer = mesh.data.uv_layers.new(name="UVMap" + str(i + 1))
+        loop_uvs = np.asarray(uvs[i], dtype=np.float32).reshape(-1, 2)[loop_vertices]
+        uv_layer.data.foreach_set("uv", loop_uvs.ravel())
 
-    #bpy.ops.object.mode_set(mode='OBJECT')
     #mesh.select_set(True)
     #bpy.ops.object.shade_smooth()
     #mesh.hide = True
     #mesh.select_set(False)
-    bm.to_mesh(mesh.data)
-    bm.free()
     if bpy.app.version < (4, 1):
         mesh.data.use_auto_smooth = True
 
-def format_wmb_mesh(wmb, collection_name, wmb4_transform=None):
+def flipped_uvs(uvs):
+    """(u, 1 - v) for a whole (n, 2) uv array."""
+    uvs = uvs.copy()
+    uvs[:, 1] = 1 - uvs[:, 1]
+    return uvs
+
+def format_wmb_mesh(wmb, collection_name, wmb4_transform=None, boneNames=None):
     meshes = []
+    referenceBoneName = None
+    if boneNames is not None and wmb.wmb_header.vertexFormat == 0x107: # wmb.wmb_header.referenceBone != -1
+        referenceBoneName = bone_name(boneNames, wmb.wmb_header.referenceBone)
     uvMaps = [[], [], [], [], []]
     usedVerticeIndexArrays = []
     mesh_array = wmb.meshArray
@@ -606,15 +699,18 @@ def format_wmb_mesh(wmb, collection_name, wmb4_transform=None):
             else:                                              # only one texture
                 vertex_flags = -3
         
-        if vertex_flags == -3:
-            uv = [(vertex.textureU, 1 - vertex.textureV) for vertex in wmb.vertexGroupArray[vertexGroupIndex].vertexArray]
-            uvMaps[0].append(uv)
-            uvMaps[1].append(None)
+        if vertex_flags < 0: # wmb4, both vertex and extra data uvs are in the arrays
+            vertexArrays = wmb.vertexGroupArray[vertexGroupIndex].vertexArrays
+            uvMaps[0].append(flipped_uvs(vertexArrays.uvs))
+            if vertex_flags == -3:
+                uvMaps[1].append(None)
+            else:
+                uvMaps[1].append(flipped_uvs(vertexArrays.uvs2))
             uvMaps[2].append(None)
             uvMaps[3].append(None)
             uvMaps[4].append(None)
 
-        elif vertex_flags in {-2, 0, 1, 4}:
+        elif vertex_flags in {0, 1, 4}:
             uv = [(vertex.textureU, 1 - vertex.textureV) for vertex in wmb.vertexGroupArray[vertexGroupIndex].vertexArray]
             uvMaps[0].append(uv)
             uv = [(vertex.textureU2, 1 - vertex.textureV2) for vertex in wmb.vertexGroupArray[vertexGroupIndex].vertexArray]
@@ -633,7 +729,7 @@ def format_wmb_mesh(wmb, collection_name, wmb4_transform=None):
             uvMaps[3].append(None)
             uvMaps[4].append(None)
 
-        elif vertex_flags in {-1, 7, 10}:
+        elif vertex_flags in {7, 10}:
             uv = [(vertex.textureU, 1 - vertex.textureV) for vertex in wmb.vertexGroupArray[vertexGroupIndex].vertexArray]
             uvMaps[0].append(uv)
             uv = [(vertexExData.textureU2, 1 - vertexExData.textureV2) for vertexExData in wmb.vertexGroupArray[vertexGroupIndex].vertexesExDataArray]
@@ -707,7 +803,7 @@ def format_wmb_mesh(wmb, collection_name, wmb4_transform=None):
                             if boneSetIndex == 0xffffffff:
                                 boneSetIndex = -1
                             boundingBox = meshGroup.boundingBox
-                            obj = construct_mesh([meshName, vertices, faces, has_bone, boneWeightInfoArray, boneSetIndex, meshGroupIndex, vertex_colors, LOD_name, LOD_level, colTreeNodeIndex, unknownWorldDataIndex, boundingBox, vertexGroupIndex], collection_name)
+                            obj = construct_mesh([meshName, vertices, faces, has_bone, boneWeightInfoArray, boneSetIndex, meshGroupIndex, vertex_colors, LOD_name, LOD_level, colTreeNodeIndex, unknownWorldDataIndex, boundingBox, vertexGroupIndex], collection_name, boneNames, referenceBoneName)
                             meshes.append(obj)
         
     if wmb.wmb_header.magicNumber == b'WMB4':
@@ -776,7 +872,7 @@ def format_wmb_mesh(wmb, collection_name, wmb4_transform=None):
                 wmb4_transform,  # header data for SCR transformations
                 meshInfo[6], # vertexCount
                 meshInfo[7]  # normals
-            ], collection_name)
+            ], collection_name, boneNames, referenceBoneName)
             meshes.append(obj)
     
     return meshes, uvMaps, usedVerticeIndexArrays
@@ -982,6 +1078,10 @@ def load_mysterychunk(chunk, collection_name):
     print("\n\n")
 
 def main(only_extract = False, wmb_file = os.path.join(os.path.split(os.path.realpath(__file__))[0], 'test', 'pl0000.dtt', 'pl0000.wmb'), wmb4_transform = None):
+    with import_session():
+        return import_wmb(only_extract, wmb_file, wmb4_transform)
+
+def import_wmb(only_extract, wmb_file, wmb4_transform):
     #reset_blend()
     wmb = WMB(wmb_file, only_extract)
     wmbname = os.path.split(wmb_file)[-1] # Split only splits into head and tail, but since we want the last part, we don't need to split the head with wmb_file.split(os.sep)
@@ -1010,12 +1110,15 @@ def main(only_extract = False, wmb_file = os.path.join(os.path.split(os.path.rea
     
     texture_dir = wmb_file.replace(wmbname, 'textures')
     armature_name = ""
+    boneNames = None
     if hasattr(wmb, 'hasBone') and wmb.hasBone:
+        # more descriptive bone names where possible, decided before any vertex group exists
+        boneNames = final_bone_names(wmb.boneArray)
         boneArray = [[
             bone.boneIndex,
-            "bone%d" % bone.boneIndex,
+            boneNames[bone.boneIndex],
             bone.parentIndex,
-            "bone%d" % bone.parentIndex,
+            bone_name(boneNames, bone.parentIndex),
             bone.world_position,
             bone.world_rotation,
             bone.boneNumber,
@@ -1028,7 +1131,7 @@ def main(only_extract = False, wmb_file = os.path.join(os.path.split(os.path.rea
         armature_name = armature_name_split[-1]
         construct_armature(armature_name, boneArray, wmb.firstLevel, wmb.secondLevel, wmb.thirdLevel, wmb.boneMap, wmb.boneSetArray, collection_name, wmb4_transform)
     
-    meshes, uvs, usedVerticeIndexArrays = format_wmb_mesh(wmb, collection_name, wmb4_transform)
+    meshes, uvs, usedVerticeIndexArrays = format_wmb_mesh(wmb, collection_name, wmb4_transform, boneNames)
     wmb_materials = get_wmb_material(wmb, texture_dir)
     materials = []
     bpy.context.scene.WTAMaterials.clear()
@@ -1041,11 +1144,10 @@ def main(only_extract = False, wmb_file = os.path.join(os.path.split(os.path.rea
         groupIndex = int(mesh.name.split('-')[0])
         uvMaps = [[], [], [], [], []]
         vertexStart = mesh['VertexIndexStart']
-        for VertexIndex in usedVerticeIndexArrays[meshIndex]:
-            for k in range(5):
-                if uvs[k][groupIndex] != None:
-                    #print("Found a UV!", k, groupIndex, VertexIndex, uvs[k][groupIndex][VertexIndex])
-                    uvMaps[k].append( uvs[k][groupIndex][vertexStart + VertexIndex])
+        usedVertexIndices = np.asarray(usedVerticeIndexArrays[meshIndex], dtype=np.int64) + vertexStart
+        for k in range(5):
+            if uvs[k][groupIndex] is not None:
+                uvMaps[k] = np.asarray(uvs[k][groupIndex], dtype=np.float32).reshape(-1, 2)[usedVertexIndices]
         # (the following comment is preserved for posterity)
         # sanity checks are for wimps
         add_material_to_mesh(mesh, [materials[materialIndex] for materialIndex in mesh['Materials']], uvMaps)
@@ -1060,28 +1162,7 @@ def main(only_extract = False, wmb_file = os.path.join(os.path.split(os.path.rea
         if obj['batchGroup'] > 0:
             obj.hide_set(True)
             obj.hide_render = True
-    # more descriptive bone names where possible
-    if amt is not None:
-        if wmb.wmb_header.vertexFormat == 0x107: # wmb.wmb_header.referenceBone != -1
-            #bpy.ops.object.mode_set(mode='EDIT')
-            for mesh in meshes:
-                mesh.vertex_groups.new(name="bone%d"%wmb.wmb_header.referenceBone)
-                mesh.vertex_groups["bone%d"%wmb.wmb_header.referenceBone].add(
-                    list(range(len(mesh.data.vertices))), 1.0, "REPLACE")
-            #bpy.ops.object.mode_set(mode='OBJECT')
-                
-        for bone in amt.data.bones:
-            oldBoneName = bone.name
-            if bone["ID"] in wmb4_bonenames:
-                #print("Renaming %s to %s" % (bone.name, wmb4_bonenames[bone["ID"]]))
-                bone.name = wmb4_bonenames[bone["ID"]]
-            else:
-                bone.name = "bone%d" % bone["ID"]
-            for mesh in [x for x in col.objects if x.type == "MESH"]:
-                for vertexGroup in [y for y in mesh.vertex_groups if y.name == oldBoneName]:
-                    vertexGroup.name = bone.name
-                
-    else:
+    if amt is None:
         print("Huh, no armature. hasBone is", wmb.hasBone)
             
     if wmb.hasColTreeNodes:
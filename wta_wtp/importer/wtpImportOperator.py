@@ -50,9 +50,12 @@ class WTAData:
             self.infos.append(info)
         """
 
-        self.data = wtpFile.read()
+        if isinstance(wtpFile, io.BinaryView):
+            self.data = wtpFile.slice(0, len(wtpFile)) # no copy of the whole wtp
+        else:
+            self.data = wtpFile.read()
 
-        self.wtaPath = f.name
+        self.wtaPath = getattr(f, "name", "")
 
     def extract_textures(self, extractionDir):
         count = 0
@@ -102,10 +105,12 @@ class ExtractNierWtaWtp(bpy.types.Operator, ImportHelper):
         return {'FINISHED'}
 
 def extractFromWta(wtaPath, wtpPath, extractDir) -> int:
+    # either can live in a mounted DAT/DTT instead of on disk
+    from ...dat_dtt.importer import dat_unpacker
     with (
-        open(wtaPath, "rb") as wtaFile,
-        open(wtpPath, "rb") as wtpFile
+        dat_unpacker.open_file(wtaPath) as wtaFile,
+        dat_unpacker.open_file(wtpPath) as wtpFile
     ):
         wta = WTAData(wtaFile, wtpFile)
-    extractedCount = wta.extract_textures(extractDir)
+        extractedCount = wta.extract_textures(extractDir)
     return extractedCount